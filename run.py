@@ -12,10 +12,13 @@ if LIBS_PATH not in sys.path:
 
 from unimobile.utils.config_loader import ConfigLoader
 from unimobile.core.runner import Runner
+from unimobile.core.trajectory import TrajectoryWriter
 from unimobile.config.loggerFile import setup_logging
 
 logger = logging.getLogger(__name__)
 
+TRAJECTORY_DIR = "temp/trajectories"
+
 def init_session(config_path):
     """
     Step 1: Initialize the system (Load Config, Device, Agent)
@@ -56,7 +59,7 @@ def init_session(config_path):
         print(f"❌ Initialization failed: {e}")
         return None, None
 
-def run_single_task(agent, device, instruction, max_steps=15):
+def run_single_task(agent, device, instruction, max_steps=15, trajectory_writer=None, trace_dir=None, task_timeout=None):
     """
     Step 2: Execute a specific task using the initialized agent.
     This can be called multiple times.
@@ -68,7 +71,7 @@ def run_single_task(agent, device, instruction, max_steps=15):
         print("="*40 + "\n")
 
         # Initialize Runner (Runner is usually lightweight and can be re-instantiated or reset)
-        runner = Runner(agent, device)
+        runner = Runner(agent, device, trajectory_writer=trajectory_writer, trace_dir=trace_dir, task_timeout=task_timeout)
 
         runner_input = {
             "instruction": instruction,
@@ -98,6 +101,41 @@ def run_single_task(agent, device, instruction, max_steps=15):
         traceback.print_exc()
         print(f"❌ An error occurred during this task: {e}")
 
+def run_task_file(config_path, task_file, max_steps=15, trace_dir=None, task_timeout=None):
+    """
+    Dispatch every line of `task_file` across all attached devices in parallel.
+    """
+    from unimobile.core.pool import DevicePool
+
+    task_id = int(time.time())
+    log_dir = "temp/log"
+    os.makedirs(log_dir, exist_ok=True)
+    setup_logging(f"{log_dir}/session_{task_id}.log")
+
+    with open(task_file, "r", encoding="utf-8") as f:
+        tasks = [line.strip() for line in f if line.strip()]
+
+    writer = TrajectoryWriter(TRAJECTORY_DIR)
+    pool = DevicePool.from_config(config_path, runner_kwargs={"trajectory_writer": writer, "trace_dir": trace_dir,
+                                                                   "task_timeout": task_timeout})
+    try:
+        leases = pool.lease_devices()
+        print(f"📱 Leased {len(leases)} device(s): {[lease.info.device_id for lease in leases]}")
+
+        start_time = time.time()
+        results = pool.run(tasks, max_steps=max_steps)
+        duration = time.time() - start_time
+
+        print("\n" + "-"*40)
+        for r in results:
+            status = "✅" if r.success else "❌"
+            print(f"{status} [{r.device_id}] {r.task} ({r.duration:.2f}s, attempts: {r.attempts}) {r.error or ''}")
+        print(f"⏱️ Time Consuming: {duration:.2f} seconds for {len(tasks)} task(s)")
+        print("-"*40)
+    finally:
+        pool.close()
+        writer.close()
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Zhi Xing System - Interactive Mode")
 
@@ -107,16 +145,26 @@ if __name__ == "__main__":
     # Optional: User can still provide a first task via CLI if they want
     parser.add_argument("--task", type=str, default=None, help="Optional: First task to run immediately")
     parser.add_argument("--max_steps", type=int, default=30, help="Max steps per task")
+    parser.add_argument("--task_file", type=str, default=None, help="Optional: run every line of this file in parallel on all attached devices, then exit")
+    parser.add_argument("--task_timeout", type=float, default=None, help="Optional: wall-clock budget in seconds per task; the task fails when it runs out")
+    parser.add_argument("--trace_dir", type=str, default=None, help="Optional: write a span trace (Chrome trace format) and latency histograms per task here")
 
     args = parser.parse_args()
 
+    if args.task_file:
+        run_task_file(args.config, args.task_file, args.max_steps, args.trace_dir, args.task_timeout)
+        sys.exit(0)
+
     # 1. Initialize once
     agent, device = init_session(args.config)
 
     if agent and device:
+        # Steps are streamed to temp/trajectories; see unimobile.core.trajectory.TrajectoryReader
+        writer = TrajectoryWriter(TRAJECTORY_DIR)
+
         # 2. Run the first task if provided via CLI
         if args.task:
-            run_single_task(agent, device, args.task, args.max_steps)
+            run_single_task(agent, device, args.task, args.max_steps, writer, args.trace_dir, args.task_timeout)
 
         # 3. Enter Interactive Loop
         print("\n✨ System Ready. Enter your next task below (or type 'exit'/'q' to quit).")
@@ -134,8 +182,9 @@ if __name__ == "__main__":
                     continue
                 
                 # Execute the new task
-                run_single_task(agent, device, user_input, args.max_steps)
+                run_single_task(agent, device, user_input, args.max_steps, writer, args.trace_dir, args.task_timeout)
                 
             except KeyboardInterrupt:
                 print("\n👋 Exiting...")
-                break
\ No newline at end of file
+                break
+        writer.close()
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import stat
+import shutil
+
+import pytest
+
+# The repository is not installed as a package: import unimobile from the checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STUB_ADB = """#!{python}
+import json, sys
+line = " ".join(sys.argv[1:])
+with open({log!r}, "a") as f:
+    f.write(json.dumps(line) + "\\n")
+with open({responses!r}) as f:
+    responses = json.load(f)
+# Later responses take priority, so a test can override the defaults
+for pattern, (output, exit_code) in reversed(list(responses.items())):
+    if pattern in line:
+        sys.stdout.write(output)
+        sys.exit(exit_code)
+"""
+
+
+class StubAdb:
+    """An `adb` executable that logs its command lines and answers from canned responses"""
+    def __init__(self, directory):
+        self.path = str(directory / "adb")
+        self._log = str(directory / "adb.log")
+        self._responses = str(directory / "adb.json")
+        self.responses = {"wm size": ["Physical size: 1080x2400\n", 0]}
+        self._save()
+        with open(self.path, "w") as f:
+            f.write(STUB_ADB.format(python=sys.executable, log=self._log, responses=self._responses))
+        os.chmod(self.path, os.stat(self.path).st_mode | stat.S_IXUSR)
+
+    def respond(self, pattern: str, output: str = "", exit_code: int = 0):
+        self.responses[pattern] = [output, exit_code]
+        self._save()
+
+    def _save(self):
+        with open(self._responses, "w") as f:
+            json.dump(self.responses, f)
+
+    @property
+    def calls(self):
+        if not os.path.exists(self._log):
+            return []
+        with open(self._log) as f:
+            return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def stub_adb(tmp_path, monkeypatch):
+    if shutil.which("sh") is None:
+        pytest.skip("needs a POSIX shell")
+    from unimobile.config.timing import TIMING_CONFIG
+    import unimobile.devices.android as android
+
+    stub = StubAdb(tmp_path)
+    # ADB_PATH is read from UNIMOBILE_ADB at import time
+    monkeypatch.setenv("UNIMOBILE_ADB", stub.path)
+    monkeypatch.setattr(android, "ADB_PATH", stub.path)
+    for name in ("default_tap_delay", "default_swipe_delay", "default_home_delay", "default_back_delay"):
+        monkeypatch.setattr(TIMING_CONFIG.device, name, 0.0)
+    return stub
@@ -0,0 +1,33 @@
+from unimobile.devices.android import AndroidDevice
+
+
+def device(stub_adb, serial="emulator-5554"):
+    return AndroidDevice(serial, persistent_shell=False, adb_path=stub_adb.path)
+
+
+def test_binds_the_first_listed_device(stub_adb):
+    stub_adb.respond("devices -l", "List of devices attached\nemulator-5556 device product:sdk model:Pixel_7\n")
+    android = AndroidDevice(persistent_shell=False)
+    assert android.serial == "emulator-5556"
+    assert android.display_size() == (1080, 2400)
+
+
+def test_reset_loads_the_emulator_snapshot(stub_adb):
+    stub_adb.respond("emu avd snapshot load", "OK\n")
+    assert device(stub_adb).reset(snapshot="clean", packages=["com.example"]) == "snapshot"
+
+    calls = stub_adb.calls
+    assert "-s emulator-5554 emu avd snapshot load clean" in calls
+    assert "-s emulator-5554 wait-for-device" in calls
+    assert not any("pm clear" in call for call in calls)
+
+
+def test_reset_clears_apps_when_the_snapshot_fails(stub_adb):
+    stub_adb.respond("emu avd snapshot load", "KO: snapshot not found\n")
+    assert device(stub_adb).reset(snapshot="missing", packages=["com.example"]) == "clear"
+    assert "-s emulator-5554 shell am force-stop com.example; pm clear com.example" in stub_adb.calls
+
+
+def test_physical_devices_never_try_snapshots(stub_adb):
+    assert device(stub_adb, "R58M123456").reset(snapshot="clean", packages=["com.example"]) == "clear"
+    assert not any("emu avd" in call for call in stub_adb.calls)
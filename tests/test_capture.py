@@ -0,0 +1,53 @@
+import struct
+
+import numpy as np
+import pytest
+
+from unimobile.devices.capture import parse_raw_screencap
+
+RGBA_8888, RGBX_8888, RGB_888 = 1, 2, 3
+
+
+def raw(width: int, height: int, pixel_format: int, bpp: int, color_space: bool) -> bytes:
+    header = struct.pack("<III", width, height, pixel_format)
+    if color_space:
+        header += struct.pack("<I", 1)
+    return header + bytes(range(width * height * bpp))
+
+
+@pytest.mark.parametrize("color_space", [False, True], ids=["12-byte header", "16-byte header"])
+@pytest.mark.parametrize("pixel_format", [RGBA_8888, RGBX_8888])
+def test_parses_both_header_sizes(pixel_format, color_space):
+    data = raw(3, 2, pixel_format, 4, color_space)
+    image = parse_raw_screencap(data)
+
+    assert image.shape == (2, 3, 4)
+    assert image[0, 0].tolist() == [0, 1, 2, 3]
+    assert image[1, 2].tolist() == [20, 21, 22, 23]
+
+
+def test_rgb_888_has_three_channels():
+    image = parse_raw_screencap(raw(2, 2, RGB_888, 3, color_space=True))
+    assert image.shape == (2, 2, 3)
+    assert image[1, 1].tolist() == [9, 10, 11]
+
+
+def test_returns_a_read_only_view_over_the_buffer():
+    data = raw(2, 2, RGBA_8888, 4, color_space=True)
+    image = parse_raw_screencap(data)
+    assert np.shares_memory(image, np.frombuffer(data, dtype=np.uint8))
+    assert not image.flags.writeable
+
+
+@pytest.mark.parametrize("data", [
+    b"\x00" * 8,
+    raw(3, 2, RGBA_8888, 4, color_space=True)[:-5],
+], ids=["shorter than the header", "truncated pixels"])
+def test_truncated_buffers_raise(data):
+    with pytest.raises(ValueError):
+        parse_raw_screencap(data)
+
+
+def test_unknown_pixel_format_raises():
+    with pytest.raises(ValueError, match="pixel format"):
+        parse_raw_screencap(raw(2, 2, 99, 4, color_space=False))
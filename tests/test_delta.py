@@ -0,0 +1,134 @@
+import re
+import struct
+import hashlib
+
+import numpy as np
+import pytest
+
+import unimobile.devices.delta as delta
+from unimobile.devices.base import CommandResult
+from unimobile.devices.delta import DeltaCapture
+
+WIDTH, HEIGHT, BPP = 4, 8, 4
+
+
+def raw_frame(pixels: np.ndarray) -> bytes:
+    # 16-byte header: the 32-byte chunks (band_rows=2) straddle row bands
+    height, width = pixels.shape[:2]
+    return struct.pack("<IIII", width, height, 1, 1) + pixels.tobytes()
+
+
+class FakeDevice:
+    """Emulates the device side of DeltaCapture: screencap to a file, dd | md5sum, dd"""
+    serial = "emulator-5554"
+
+    def __init__(self):
+        self.pixels = np.zeros((HEIGHT, WIDTH, BPP), dtype=np.uint8)
+        self.file = b""
+        self.fetched = []
+
+    def _adb_prefix(self):
+        return f"adb -s {self.serial}"
+
+    def _screencap(self):
+        self.file = raw_frame(self.pixels)
+
+    def shell(self, cmd):
+        self._screencap()
+        chunk = int(re.search(r"bs=(\d+)", cmd).group(1))
+        lines = [str(len(self.file))]
+        for skip in map(int, re.findall(r"skip=(\d+)", cmd)):
+            lines.append(f"{hashlib.md5(self.file[skip * chunk:(skip + 1) * chunk]).hexdigest()}  -")
+        return CommandResult("\n".join(lines) + "\n", "", 0)
+
+    def exec_out(self, cmd):
+        if "screencap" in cmd:
+            self._screencap()
+            return self.file, "", 0
+        chunk = int(re.search(r"bs=(\d+)", cmd).group(1))
+        skips = list(map(int, re.findall(r"skip=(\d+)", cmd)))
+        self.fetched.append(skips)
+        return b"".join(self.file[skip * chunk:(skip + 1) * chunk] for skip in skips), "", 0
+
+
+@pytest.fixture
+def device(monkeypatch):
+    device = FakeDevice()
+    monkeypatch.setattr(delta, "_execute_binary", lambda cmd, timeout=None: device.exec_out(cmd))
+    return device
+
+
+def test_first_capture_is_full_then_unchanged_frames_fetch_nothing(device):
+    capture = DeltaCapture(device, band_rows=2)
+    first = capture.capture()
+    assert first.full and first.rows.all()
+
+    second = capture.capture()
+    assert not second.full
+    assert not second.rows.any()
+    assert device.fetched == []
+    assert np.array_equal(second.image, device.pixels)
+
+
+def test_only_changed_bands_are_fetched_and_patched(device):
+    capture = DeltaCapture(device, band_rows=2)
+    capture.capture()
+    device.pixels[5, 1] = 255
+
+    frame = capture.capture()
+    assert np.array_equal(frame.image, device.pixels)
+    # Byte 96 (row 5 after the 16-byte header) is in chunk 3, which spans rows 5-6
+    assert device.fetched == [[3]]
+    assert np.flatnonzero(frame.rows).tolist() == [5, 6]
+    assert capture.stats.full_frames == 1
+
+
+def test_earlier_frames_are_not_altered_by_later_patches(device):
+    capture = DeltaCapture(device, band_rows=2)
+    capture.capture()
+    before = capture.capture().image.copy()
+    kept = capture.capture().image
+    device.pixels[0, 0] = 7
+    capture.capture()
+    assert np.array_equal(kept, before)
+
+
+def test_mask_accumulates_until_taken(device):
+    capture = DeltaCapture(device, band_rows=2)
+    capture.capture()
+    capture.take_mask()
+
+    device.pixels[1, 0] = 1
+    capture.capture()
+    device.pixels[7, 3] = 1
+    capture.capture()
+
+    mask = capture.take_mask()
+    assert mask.shape == (HEIGHT, WIDTH)
+    changed = np.flatnonzero(mask[:, 0]).tolist()
+    assert 1 in changed and 7 in changed
+    assert not mask[3:5].any()
+    assert capture.take_mask() is None
+
+
+def test_mask_is_resampled_to_the_requested_size(device):
+    capture = DeltaCapture(device, band_rows=2)
+    capture.capture()
+    capture.take_mask()
+    device.pixels[7, 0] = 1
+    capture.capture()
+
+    mask = capture.take_mask(width=2, height=4)
+    assert mask.shape == (4, 2)
+    assert mask[3].all() and not mask[:3].any()
+
+
+@pytest.mark.parametrize("shape", [(HEIGHT // 2, WIDTH, BPP), (WIDTH, HEIGHT, BPP)], ids=["resized", "rotated"])
+def test_geometry_change_falls_back_to_a_full_transfer(device, shape):
+    capture = DeltaCapture(device, band_rows=2)
+    capture.capture()
+    device.pixels = np.arange(np.prod(shape), dtype=np.uint8).reshape(shape)
+
+    frame = capture.capture()
+    assert frame.full
+    assert np.array_equal(frame.image, device.pixels)
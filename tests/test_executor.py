@@ -0,0 +1,34 @@
+import time
+
+from unimobile.config.timing import TIMING_CONFIG
+from unimobile.core.deadline import deadline_scope
+from unimobile.devices.executor import DEFAULT_EXECUTOR, CommandExecutor, CommandStats
+from unimobile.devices.shell_session import ShellSession
+
+
+def test_default_executor_is_bounded_without_a_deadline():
+    assert DEFAULT_EXECUTOR.timeout == TIMING_CONFIG.connection.shell_command_timeout
+    assert ShellSession(["sh"]).timeout == TIMING_CONFIG.connection.shell_command_timeout
+
+
+def test_timeout_kills_the_command():
+    executor = CommandExecutor(timeout=0.3, stats=CommandStats())
+    start = time.monotonic()
+    result = executor.run("sleep 5")
+    assert result.timed_out
+    assert time.monotonic() - start < 3
+
+
+def test_deadline_bounds_the_call():
+    executor = CommandExecutor(timeout=10, stats=CommandStats())
+    with deadline_scope(0.3):
+        result = executor.run("sleep 5")
+    assert result.timed_out
+
+
+def test_listeners_see_every_command():
+    executor = CommandExecutor(timeout=5, stats=CommandStats())
+    seen = []
+    executor.add_listener(lambda cmdline, result: seen.append((cmdline, result.exit_code)))
+    executor.run("echo hi")
+    assert seen == [("echo hi", 0)]
@@ -0,0 +1,26 @@
+import numpy as np
+
+from unimobile.core import frame as frame_module
+from unimobile.core.frame import FRAMES_PER_RUNNER, Frame, frame_for, frame_scope, register_frame
+
+
+def _frames(prefix: str, count: int):
+    return [register_frame(Frame.from_array(np.zeros((2, 2, 3), np.uint8), f"/tmp/{prefix}_{i}.png"))
+            for i in range(count)]
+
+
+def test_concurrent_runners_keep_their_frames():
+    frame_module._REGISTRY.clear()
+    with frame_scope(), frame_scope():
+        first = _frames("runner_a", FRAMES_PER_RUNNER)
+        _frames("runner_b", FRAMES_PER_RUNNER)
+        # Runner B's frames did not push runner A's out
+        assert all(frame_for(f.path) is f for f in first)
+
+
+def test_registry_shrinks_back_when_runners_finish():
+    frame_module._REGISTRY.clear()
+    with frame_scope():
+        with frame_scope():
+            _frames("busy", 2 * FRAMES_PER_RUNNER)
+        assert len(frame_module._REGISTRY) == FRAMES_PER_RUNNER
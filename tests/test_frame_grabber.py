@@ -0,0 +1,31 @@
+import time
+
+import numpy as np
+
+from unimobile.devices.frame_grabber import FrameGrabber, FrameSource
+
+
+class SlowSource(FrameSource):
+    """Each capture takes `delay` seconds and shows the screen as it was when the capture began"""
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.value = 0
+
+    def read(self):
+        value = self.value
+        time.sleep(self.delay)
+        return np.full((4, 4, 3), value, dtype=np.uint8), "BGR"
+
+
+def test_frame_started_before_the_action_is_not_post_action():
+    source = SlowSource(delay=0.3)
+    grabber = FrameGrabber(source, interval=0.0).start()
+    try:
+        time.sleep(0.1)                 # a capture of the old screen is in flight
+        source.value = 255              # the action changes the screen
+        action_done = time.monotonic()
+        frame = grabber.wait_for_stable(after=action_done, stable_duration=0.0, timeout=3)
+        assert frame.timestamp > action_done
+        assert frame.image[0, 0, 0] == 255
+    finally:
+        grabber.stop()
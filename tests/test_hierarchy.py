@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+pytest.importorskip("openai", reason="the components package imports every LLM backend")
+
+from unimobile.agents.components.perception.hierarchy import (
+    HierarchyPerception, _parse_bounds, iter_json_nodes, iter_xml_nodes,
+)
+from unimobile.core.protocol import PerceptionInput
+
+XML = b"""<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy rotation="0">
+  <node index="0" text="" class="android.widget.FrameLayout" clickable="false" enabled="true" bounds="[0,0][1080,2400]">
+    <node index="0" text="Wi-Fi" resource-id="android:id/title" class="android.widget.TextView" clickable="false" enabled="true" bounds="[40,200][400,260]" />
+    <node index="1" text="" content-desc="Toggle" class="android.widget.Switch" clickable="true" enabled="true" bounds="[900,200][1040,260]" />
+    <node index="2" text="" class="android.widget.Button" clickable="true" enabled="true" bounds="[40,400][1040,500]" />
+    <node index="3" text="Disabled" class="android.widget.Button" clickable="true" enabled="false" bounds="[40,600][1040,700]" />
+    <node index="4" text="Empty" class="android.widget.TextView" clickable="false" enabled="true" bounds="[40,800][40,900]" />
+    <node index="5" text="No bounds" class="android.widget.TextView" clickable="false" enabled="true" />
+  </node>
+</hierarchy>"""
+
+JSON = {
+    "attributes": {"type": "root", "bounds": "[0,0][1260,2720]"},
+    "children": [
+        {"attributes": {"type": "Text", "text": "Bluetooth", "id": "bt_title", "bounds": "[60,300][600,380]"},
+         "children": []},
+        {"attributes": {"type": "Toggle", "key": "bt_switch", "clickable": True, "bounds": "[1080,300][1220,380]"},
+         "children": []},
+    ],
+}
+
+
+def perceive(ui_data, width=1080, height=2400, **kwargs):
+    perception = HierarchyPerception(**kwargs)
+    return perception.perceive(PerceptionInput("screen.png", width, height, ui_data=ui_data)).elements
+
+
+def test_parse_bounds():
+    assert _parse_bounds("[40,200][400,260]") == [40, 200, 400, 260]
+    assert _parse_bounds("[-10,0][20,30]") == [-10, 0, 20, 30]
+    assert _parse_bounds("") is None
+    assert _parse_bounds(None) is None
+
+
+def test_xml_nodes_in_document_order():
+    nodes = list(iter_xml_nodes(XML))
+    assert [node.get("text") for node in nodes[:2]] == ["", "Wi-Fi"]
+    assert nodes[2]["content-desc"] == "Toggle"
+    assert len(nodes) == 7
+
+
+def test_json_nodes_map_harmony_attributes():
+    nodes = list(iter_json_nodes(JSON))
+    assert [node["class"] for node in nodes] == ["root", "Text", "Toggle"]
+    assert nodes[1]["resource-id"] == "bt_title"
+    assert nodes[2]["resource-id"] == "bt_switch"
+    assert nodes[2]["clickable"] == "true"
+
+
+def test_keeps_text_and_clickable_elements_only():
+    elements = perceive(XML)
+    assert [(e["text"], e["clickable"]) for e in elements] == [("Wi-Fi", False), ("Toggle", True), ("", True)]
+    assert elements[1]["type"] == "Switch"
+    assert elements[1]["bbox"] == [900, 200, 1040, 260]
+    assert elements[1]["coordinates"] == [970, 230]
+
+
+def test_coordinates_follow_a_downscaled_screenshot():
+    elements = perceive(XML, width=540, height=1200)
+    assert elements[0]["bbox"] == [20, 100, 200, 130]
+
+
+def test_clickable_only():
+    elements = perceive(XML, clickable_only=True)
+    assert [e["text"] for e in elements] == ["Toggle", ""]
+    assert [e["index"] for e in elements] == [0, 1]
+
+
+def test_max_elements_truncates():
+    assert [e["text"] for e in perceive(XML, max_elements=2)] == ["Wi-Fi", "Toggle"]
+
+
+def test_json_dump_as_dict_and_as_text():
+    from_dict = perceive(JSON, width=1260, height=2720)
+    from_text = perceive(json.dumps(JSON).encode("utf-8"), width=1260, height=2720)
+    assert from_dict == from_text
+    assert [e["text"] for e in from_dict] == ["Bluetooth", ""]
+    assert from_dict[0]["resource_id"] == "bt_title"
+
+
+def test_missing_or_empty_hierarchy_raises():
+    with pytest.raises(ValueError, match="No UI hierarchy"):
+        perceive(None)
+    with pytest.raises(ValueError, match="no usable elements"):
+        perceive(b"<hierarchy><node text='' clickable='false' bounds='[0,0][10,10]'/></hierarchy>")
@@ -0,0 +1,107 @@
+import pytest
+
+from unimobile.devices.android import AndroidDevice
+from unimobile.devices.injector import FakeInjectorServer, InjectorClient, InjectorError
+
+
+class FailingInjectorServer(FakeInjectorServer):
+    """Answers every gesture with `reply` (e.g. "ERR ..." or "PARTIAL ...")"""
+    def __init__(self, reply: str):
+        super().__init__()
+        self.reply = reply
+
+    def handle_line(self, line: str) -> str:
+        if line == "PING":
+            return "PONG"
+        self.events.append((line, ()))
+        return self.reply
+
+
+@pytest.fixture
+def server():
+    with FakeInjectorServer() as server:
+        yield server
+
+
+def test_client_sends_every_gesture(server):
+    client = InjectorClient("adb", port=server.port).start()
+    try:
+        client.tap(1, 2)
+        client.swipe(10, 20, 30, 40, 300)
+        client.key(67, 67)
+        client.text("héllo wörld")
+    finally:
+        client.close()
+
+    assert server.events == [
+        ("TAP", (1, 2)),
+        ("SWIPE", (10, 20, 30, 40, 300)),
+        ("KEY", (67, 67)),
+        ("TEXT", ("héllo wörld",)),
+    ]
+
+
+def test_client_reconnects_after_the_server_drops_it(server):
+    client = InjectorClient("adb", port=server.port).start()
+    client.close()
+    client.tap(5, 6)
+    client.close()
+    assert server.events == [("TAP", (5, 6))]
+
+
+@pytest.mark.parametrize("reply, sent", [("ERR bad request", False), ("PARTIAL injectInputEvent refused", True)])
+def test_rejections_say_whether_events_were_injected(reply, sent):
+    with FailingInjectorServer(reply) as server:
+        client = InjectorClient("adb", port=server.port).start()
+        with pytest.raises(InjectorError) as error:
+            client.tap(1, 2)
+        client.close()
+    assert error.value.sent is sent
+
+
+def test_device_falls_back_to_input_when_nothing_was_injected(stub_adb):
+    device = AndroidDevice("emulator-5554", persistent_shell=False, adb_path=stub_adb.path)
+    with FailingInjectorServer("ERR bad request") as server:
+        device.attach_injector(InjectorClient("adb", port=server.port).start())
+        device.tap(1, 2)
+    assert any(call.endswith("shell input tap 1 2") for call in stub_adb.calls)
+    # One rejected request does not turn the injector off
+    assert device._injector is not None
+
+
+def test_rejected_request_keeps_the_injector_for_later_gestures(stub_adb):
+    class NoTextServer(FakeInjectorServer):
+        def handle_line(self, line: str) -> str:
+            if line.startswith("TEXT"):
+                return "ERR text not representable with the virtual keyboard"
+            return super().handle_line(line)
+
+    device = AndroidDevice("emulator-5554", persistent_shell=False, adb_path=stub_adb.path)
+    with NoTextServer() as server:
+        device.attach_injector(InjectorClient("adb", port=server.port).start())
+        device._send("text", "你好")
+        device.tap(1, 2)
+    assert server.events == [("TAP", (1, 2))]
+    assert any("input text" in call for call in stub_adb.calls)
+    assert not any("input tap" in call for call in stub_adb.calls)
+
+
+def test_transport_failure_turns_the_injector_off(stub_adb):
+    device = AndroidDevice("emulator-5554", persistent_shell=False, adb_path=stub_adb.path)
+    with FakeInjectorServer() as server:
+        client = InjectorClient("adb", port=server.port).start()
+    client.close()
+    device.attach_injector(client)
+    device.tap(1, 2)
+    assert any(call.endswith("shell input tap 1 2") for call in stub_adb.calls)
+    assert device._injector is None
+
+
+def test_device_does_not_replay_a_partly_injected_gesture(stub_adb):
+    device = AndroidDevice("emulator-5554", persistent_shell=False, adb_path=stub_adb.path)
+    with FailingInjectorServer("PARTIAL injectInputEvent refused") as server:
+        device.attach_injector(InjectorClient("adb", port=server.port).start())
+        device.tap(1, 2)
+    assert server.events == [("TAP 1 2", ())]
+    assert not any("input tap" in call for call in stub_adb.calls)
+    assert device._injector is not None
@@ -0,0 +1,115 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("hmdriver2", reason="DevicePool imports every device backend")
+
+from unimobile.core.pool import DeviceLease, DevicePool
+from unimobile.core.protocol import ActionType
+from unimobile.devices.base import CommandResult, ConnectionType, DeviceInfo
+from unimobile.devices.replay import ReplayDevice, Session
+
+
+class FlakyDevice(ReplayDevice):
+    """A ReplayDevice whose health check fails once it is marked offline"""
+    online = True
+
+    def shell(self, cmd: str, error_raise=True) -> CommandResult:
+        if not self.online:
+            return CommandResult("", "device offline", -1)
+        return super().shell(cmd, error_raise)
+
+
+class ScriptedRunner:
+    """Completes every task, or takes the device offline mid-task when `drops` is set"""
+    def __init__(self, device: FlakyDevice, drops: bool = False, wait_for: threading.Event = None):
+        self.device = device
+        self.drops = drops
+        self.wait_for = wait_for
+        self.started = threading.Event()
+        self.tasks = []
+
+    def run(self, task, max_steps=15):
+        self.tasks.append(task)
+        self.started.set()
+        if self.wait_for is not None:
+            self.wait_for.wait(timeout=5)
+        if self.drops:
+            self.device.online = False
+            raise RuntimeError("device offline")
+        return [{"action": SimpleNamespace(type=ActionType.DONE)}]
+
+
+@pytest.fixture
+def session_dir(tmp_path):
+    Session().save(str(tmp_path))
+    return str(tmp_path)
+
+
+def lease(session_dir, device_id, online=True, drops=False):
+    device = FlakyDevice(session_dir, latency="none", device_id=device_id)
+    device.online = online
+    return DeviceLease(info=DeviceInfo(device_id, "replay", "device", ConnectionType.EMULATOR), device=device, agent=None,
+                       runner=ScriptedRunner(device, drops=drops))
+
+
+def run(pool, tasks):
+    # Guard against a pool that never returns
+    box = {}
+    thread = threading.Thread(target=lambda: box.setdefault("results", pool.run(tasks)), daemon=True)
+    thread.start()
+    thread.join(timeout=10)
+    assert not thread.is_alive(), "DevicePool.run did not return"
+    return box["results"]
+
+
+def test_task_on_a_device_that_drops_is_requeued_on_another(session_dir):
+    pool = DevicePool(agent_factory=None)
+    dead, healthy = lease(session_dir, "dead", drops=True), lease(session_dir, "healthy")
+    # The healthy device holds its first task until the other one has taken one too
+    healthy.runner.wait_for = dead.runner.started
+    pool.leases = [dead, healthy]
+
+    results = run(pool, ["Open settings", "Turn on wifi", "Open camera"])
+
+    assert all(result.success for result in results)
+    assert all(result.device_id == "healthy" for result in results)
+    assert sorted(healthy.runner.tasks) == ["Open camera", "Open settings", "Turn on wifi"]
+    assert len(dead.runner.tasks) == 1
+    assert dead.retired
+    assert not healthy.retired
+
+
+def test_device_failing_its_health_check_is_retired_without_running_tasks(session_dir):
+    pool = DevicePool(agent_factory=None, max_device_failures=2)
+    offline, healthy = lease(session_dir, "offline", online=False), lease(session_dir, "healthy")
+    pool.leases = [offline, healthy]
+
+    results = run(pool, ["a", "b", "c", "d"])
+
+    assert [result.success for result in results] == [True] * 4
+    assert offline.runner.tasks == []
+    assert offline.retired and offline.failures == 2
+
+
+def test_task_is_tried_on_at_most_max_attempts_devices(session_dir):
+    pool = DevicePool(agent_factory=None, max_attempts=2, max_device_failures=1)
+    pool.leases = [lease(session_dir, f"dropping-{i}", drops=True) for i in range(3)]
+
+    results = run(pool, ["Open settings"])
+
+    assert results[0].attempts == 2
+    assert not results[0].success
+    assert sum(len(leased.runner.tasks) for leased in pool.leases) == 2
+
+
+def test_pool_stops_when_every_device_is_retired(session_dir):
+    pool = DevicePool(agent_factory=None, max_device_failures=1)
+    pool.leases = [lease(session_dir, "a", online=False), lease(session_dir, "b", online=False)]
+
+    results = run(pool, ["x", "y"])
+
+    assert all(leased.retired for leased in pool.leases)
+    assert [result.error for result in results] == ["No healthy device left"] * 2
+    assert not any(result.success for result in results)
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from unimobile.devices.replay import ReplayDevice, Session, SessionRecorder
+
+PNG_A = b"\x89PNG\r\n\x1a\nframe-a"
+PNG_B = b"\x89PNG\r\n\x1a\nframe-b"
+
+
+class FakeDevice:
+    """Shows frame A until tapped, then frame B; every tap waits `settle` seconds like a real device"""
+    platform = "android"
+
+    def __init__(self, settle: float = 0.0):
+        self.settle = settle
+        self.frame = PNG_A
+
+    def display_size(self):
+        return 1080, 2400
+
+    def capture(self):
+        return self.frame
+
+    def tap(self, x, y):
+        self.frame = PNG_B
+        self.wait_for_settle(self.settle)
+
+    def wait_for_settle(self, fallback):
+        time.sleep(fallback)
+
+    def get_app(self):
+        return ["com.example"]
+
+
+def test_settle_wait_is_recorded_apart_from_the_action(tmp_path):
+    device = FakeDevice(settle=0.2)
+    recorder = SessionRecorder(device, str(tmp_path))
+    recorder.capture()
+    recorder.tap(10, 20)
+    recorder.capture()
+    recorder.save()
+
+    latencies = Session.load(str(tmp_path)).latencies
+    assert latencies["tap"][0] < 0.1
+    assert latencies["settle"][0] >= 0.2
+    # The wrapped device is left as it was
+    assert "wait_for_settle" not in vars(device)
+
+
+def test_replay_follows_the_recorded_transition(tmp_path):
+    recorder = SessionRecorder(FakeDevice(), str(tmp_path))
+    recorder.capture()
+    recorder.tap(10, 20)
+    recorder.capture()
+    recorder.save()
+
+    replay = ReplayDevice(str(tmp_path), latency="none")
+    assert replay.capture() == PNG_A
+    replay.tap(15, 25)
+    assert replay.capture() == PNG_B
+
+
+def test_capture_without_a_recorded_frame_raises_a_replay_error(tmp_path):
+    Session().save(str(tmp_path))
+    replay = ReplayDevice(str(tmp_path), latency="none")
+    with pytest.raises(RuntimeError, match="no image recorded"):
+        replay.capture()
@@ -0,0 +1,124 @@
+import os
+import time
+
+import pytest
+
+from unimobile.core.screenshot_store import ScreenshotStore
+
+
+def store_at(tmp_path, **kwargs):
+    kwargs.setdefault("max_bytes", None)
+    kwargs.setdefault("max_age", None)
+    kwargs.setdefault("evict_every", 0)
+    return ScreenshotStore(str(tmp_path / "store"), **kwargs)
+
+
+def put_aged(store, name: bytes, age: float) -> str:
+    """A 100-byte object last used `age` seconds ago"""
+    path = store.put(name.ljust(100, b"."))
+    used = time.time() - age
+    os.utime(path, (used, used))
+    return path
+
+
+def test_identical_frames_are_stored_once(tmp_path):
+    store = store_at(tmp_path)
+    first = store.put(b"frame")
+    assert store.put(b"frame") == first
+    assert store.put(b"other") != first
+    assert store.stats.deduplicated == 1
+    assert store.digest_of(first) in store
+
+
+def test_put_file_consumes_the_source_and_dedups(tmp_path):
+    store = store_at(tmp_path)
+    stored = store.put(b"frame")
+    source = tmp_path / "capture.png"
+    source.write_bytes(b"frame")
+
+    assert store.put_file(str(source)) == stored
+    assert not source.exists()
+
+
+def test_size_limit_removes_least_recently_used_first(tmp_path):
+    store = store_at(tmp_path, max_bytes=250)
+    paths = [put_aged(store, name, age) for name, age in ((b"a", 400), (b"b", 300), (b"c", 200), (b"d", 100))]
+
+    assert store.evict() == 2
+    assert [os.path.exists(path) for path in paths] == [False, False, True, True]
+    assert store.stats.bytes == 200
+
+
+def test_put_refreshes_the_last_use(tmp_path):
+    store = store_at(tmp_path, max_bytes=150)
+    old = put_aged(store, b"a", 400)
+    new = put_aged(store, b"b", 100)
+    store.put(b"a".ljust(100, b"."))
+
+    store.evict()
+    assert os.path.exists(old) and not os.path.exists(new)
+
+
+def test_pinned_objects_survive_and_the_next_oldest_go(tmp_path):
+    store = store_at(tmp_path, max_bytes=250)
+    paths = [put_aged(store, name, age) for name, age in ((b"a", 400), (b"b", 300), (b"c", 200), (b"d", 100))]
+    store.pin([paths[0]], "task_failed")
+
+    assert store.evict() == 2
+    assert [os.path.exists(path) for path in paths] == [True, False, False, True]
+    assert store.stats.pinned == 1
+
+
+def test_age_limit_spares_pinned_and_recent_objects(tmp_path):
+    store = store_at(tmp_path, max_age=1000)
+    expired = put_aged(store, b"a", 5000)
+    pinned = put_aged(store, b"b", 5000)
+    recent = put_aged(store, b"c", 10)
+    store.pin([pinned], "keep")
+
+    assert store.evict() == 1
+    assert not os.path.exists(expired)
+    assert os.path.exists(pinned) and os.path.exists(recent)
+
+
+def test_pins_persist_and_unpin_makes_objects_evictable(tmp_path):
+    store = store_at(tmp_path, max_age=1000)
+    path = put_aged(store, b"a", 5000)
+    store.pin([path], "keep")
+
+    reopened = store_at(tmp_path, max_age=1000)
+    assert reopened.evict() == 0
+    reopened.unpin("keep")
+    assert reopened.evict() == 1
+    assert not os.path.exists(path)
+
+
+def test_derived_files_are_evicted_with_their_screenshot(tmp_path):
+    store = store_at(tmp_path, max_age=1000)
+    path = put_aged(store, b"a", 5000)
+    derived = path[:-len(".png")] + "_som.png"
+    with open(derived, "wb") as f:
+        f.write(b"som")
+    old = time.time() - 5000
+    os.utime(derived, (old, old))
+
+    assert store.evict() == 1
+    assert not os.path.exists(path) and not os.path.exists(derived)
+
+
+def test_recently_used_derivative_keeps_the_object(tmp_path):
+    store = store_at(tmp_path, max_age=1000)
+    path = put_aged(store, b"a", 5000)
+    with open(path[:-len(".png")] + "_grid.png", "wb") as f:
+        f.write(b"grid")
+
+    assert store.evict() == 0
+    assert os.path.exists(path)
+
+
+@pytest.mark.parametrize("puts, evicted", [(2, False), (3, True)])
+def test_eviction_runs_every_n_puts(tmp_path, puts, evicted):
+    store = store_at(tmp_path, max_bytes=0, evict_every=3)
+    for i in range(puts):
+        store.put(bytes([i]))
+    assert (store.stats.evicted > 0) is evicted
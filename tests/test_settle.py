@@ -0,0 +1,34 @@
+import time
+
+from unimobile.devices.settle import SettleDetector
+
+
+class FakeScreen:
+    """screen_hash changes for the first `changes` polls, then stays put"""
+    def __init__(self, changes: int = 0, fail: bool = False):
+        self.changes = changes
+        self.fail = fail
+        self.polls = 0
+
+    def screen_hash(self, stride: int = 8) -> str:
+        self.polls += 1
+        if self.fail:
+            raise RuntimeError("no screen")
+        return str(min(self.polls, self.changes + 1))
+
+
+def detector(device, **kwargs):
+    return SettleDetector(device, interval=0.01, stable_duration=0.05, min_wait=0.0, max_wait=2.0, **kwargs)
+
+
+def test_returns_once_the_screen_is_stable():
+    device = FakeScreen(changes=3)
+    waited = detector(device).wait()
+    assert waited < 1.0
+    assert device.polls >= 4
+
+
+def test_capture_failure_uses_the_fixed_delay_not_the_cap():
+    start = time.monotonic()
+    detector(FakeScreen(fail=True)).wait(fallback=0.2)
+    assert 0.15 < time.monotonic() - start < 1.0
@@ -0,0 +1,67 @@
+import shutil
+
+import pytest
+
+from unimobile.devices.executor import DEFAULT_EXECUTOR
+from unimobile.devices.shell_session import ShellSession
+
+pytestmark = pytest.mark.skipif(shutil.which("sh") is None, reason="needs a POSIX shell")
+
+
+@pytest.fixture
+def session():
+    # A local `sh` speaks the same stdin protocol as `adb shell`
+    session = ShellSession(["sh"], timeout=5)
+    yield session
+    session.close()
+
+
+def test_output_keeps_its_own_trailing_newline(session):
+    assert session.execute("echo hello").output == "hello\n"
+    assert session.execute("printf 'a\\n\\n'").output == "a\n\n"
+
+
+def test_output_without_trailing_newline_is_unchanged(session):
+    result = session.execute("printf hello")
+    assert result.output == "hello"
+    assert result.exit_code == 0
+    assert session.execute("printf ''").output == ""
+
+
+def test_stderr_and_exit_code(session):
+    result = session.execute("printf oops >&2; exit_code() { return 3; }; exit_code")
+    assert result.error == "oops"
+    assert result.exit_code == 3
+
+
+def test_command_reading_stdin_does_not_eat_the_framing(session):
+    assert session.execute("cat").output == ""
+    assert session.execute("read line; echo \"got:$line\"").output == "got:\n"
+    # The session is still in sync afterwards
+    assert session.execute("echo still-alive").output == "still-alive\n"
+
+
+def test_compound_commands_share_the_null_stdin(session):
+    assert session.execute("cat; cat && echo done").output == "done\n"
+
+
+def test_results_reach_executor_listeners(session):
+    seen = []
+    listener = lambda cmdline, result: seen.append((cmdline, result))
+    DEFAULT_EXECUTOR.add_listener(listener)
+    try:
+        session.execute("printf out; printf err >&2; false")
+    finally:
+        DEFAULT_EXECUTOR.remove_listener(listener)
+
+    assert len(seen) == 1
+    cmdline, result = seen[0]
+    assert cmdline == 'sh "printf out; printf err >&2; false"'
+    assert (result.output, result.error, result.exit_code) == ("out", "err", 1)
+
+
+def test_timeout_kills_and_restarts_the_session(session):
+    result = session.execute("sleep 5", timeout=0.3)
+    assert result.exit_code == -1
+    assert result.error.startswith("Command timed out")
+    assert session.execute("echo back").output == "back\n"
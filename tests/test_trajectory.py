@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from unimobile.core.protocol import Action, ActionType
+from unimobile.core.trajectory import DATA_FILE, INDEX_FILE, TrajectoryReader, TrajectoryWriter
+
+
+def write(directory, tasks):
+    """Write {task id: number of steps}; returns the keys begin_task handed out"""
+    writer = TrajectoryWriter(str(directory))
+    keys = []
+    for task_id, steps in tasks.items():
+        key = writer.begin_task(task_id, f"instruction {task_id}")
+        for step in range(1, steps + 1):
+            writer.append_step(key, {"step": step, "action": Action(ActionType.TAP, {"x": step, "y": 2 * step})})
+        writer.end_task(key, success=True, steps=steps)
+        keys.append(key)
+    writer.close()
+    return keys
+
+
+def lines(path):
+    with open(path, "rb") as f:
+        return f.readlines()
+
+
+def rewrite(path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def xs(directory, task):
+    return [record["action"].params["x"] for record in TrajectoryReader(str(directory)).trajectory(task)]
+
+
+def test_reads_back_through_task_trajectory(tmp_path):
+    write(tmp_path, {"a": 3, "b": 2})
+    trajectory = TrajectoryReader(str(tmp_path)).trajectory("a")
+
+    assert len(trajectory) == 3
+    assert trajectory[0]["action"] == Action(ActionType.TAP, {"x": 1, "y": 2})
+    assert [record["step"] for record in trajectory[1:]] == [2, 3]
+    assert TrajectoryReader(str(tmp_path)).task_info("b")["success"] is True
+
+
+def test_stale_index_is_completed_from_the_data_file(tmp_path):
+    write(tmp_path, {"a": 3, "b": 2})
+    index = os.path.join(tmp_path, INDEX_FILE)
+    # Crash after the first three records: the rest of the index, and half a line, are missing
+    kept = lines(index)[:3]
+    rewrite(index, b"".join(kept) + lines(index)[3][:10])
+
+    assert xs(tmp_path, "a") == [1, 2, 3]
+    assert xs(tmp_path, "b") == [1, 2]
+
+
+def test_missing_index_is_rebuilt(tmp_path):
+    write(tmp_path, {"a": 2})
+    os.remove(os.path.join(tmp_path, INDEX_FILE))
+
+    assert xs(tmp_path, "a") == [1, 2]
+    assert TrajectoryReader(str(tmp_path)).task_info("a")["instruction"] == "instruction a"
+
+
+def test_partially_written_final_record_is_skipped(tmp_path):
+    write(tmp_path, {"a": 3})
+    data, index = os.path.join(tmp_path, DATA_FILE), os.path.join(tmp_path, INDEX_FILE)
+    # The end record and step 3 are lost: step 3 only half reached the data file, never the index
+    records = lines(data)[:-1]
+    rewrite(data, b"".join(records[:-1]) + records[-1][:-20])
+    rewrite(index, b"".join(lines(index)[:3]))
+
+    reader = TrajectoryReader(str(tmp_path))
+    assert xs(tmp_path, "a") == [1, 2]
+    assert "success" not in reader.task_info("a")
+
+
+def test_writer_appends_after_a_torn_record(tmp_path):
+    write(tmp_path, {"a": 2})
+    data = os.path.join(tmp_path, DATA_FILE)
+    rewrite(data, b"".join(lines(data)) + b'{"task": "a", "kind": "st')
+    os.remove(os.path.join(tmp_path, INDEX_FILE))
+
+    write(tmp_path, {"b": 2})
+    assert xs(tmp_path, "a") == [1, 2]
+    assert xs(tmp_path, "b") == [1, 2]
+    assert TrajectoryReader(str(tmp_path)).task_info("b")["instruction"] == "instruction b"
+
+
+def test_writer_reindexes_records_missing_from_the_index(tmp_path):
+    write(tmp_path, {"a": 2})
+    index = os.path.join(tmp_path, INDEX_FILE)
+    rewrite(index, b"".join(lines(index)[:1]) + lines(index)[1][:5])
+
+    write(tmp_path, {"b": 1})
+    # Every record is in the index again, so readers need no scan
+    assert len(lines(index)) == len(lines(os.path.join(tmp_path, DATA_FILE)))
+    assert xs(tmp_path, "a") == [1, 2]
+
+
+def test_begin_task_makes_keys_unique(tmp_path):
+    assert write(tmp_path, {"t": 1}) == ["t"]
+    writer = TrajectoryWriter(str(tmp_path))
+    try:
+        assert writer.begin_task("t", "again") == "t-2"
+        assert writer.begin_task("t", "and again") == "t-3"
+        assert writer.begin_task(7, "new") == "7"
+    finally:
+        writer.close()
+    assert set(TrajectoryReader(str(tmp_path)).tasks()) == {"t", "t-2", "t-3", "7"}
+
+
+def test_unknown_step_raises(tmp_path):
+    write(tmp_path, {"a": 1})
+    with pytest.raises(KeyError):
+        TrajectoryReader(str(tmp_path)).step("a", 5)
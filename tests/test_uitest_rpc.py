@@ -0,0 +1,98 @@
+import pytest
+
+from unimobile.devices.uitest_rpc import MockUitestServer, UitestRpcClient, UitestRpcError
+
+
+@pytest.fixture
+def server():
+    with MockUitestServer() as server:
+        yield server
+
+
+def test_start_creates_a_driver_and_calls_use_it(server):
+    client = UitestRpcClient(port=server.port).start()
+    try:
+        client.click(10, 20)
+    finally:
+        client.close()
+    assert server.calls == [("Driver.create", []), ("Driver.click", [10, 20])]
+
+
+def test_key_events_are_pipelined_in_order(server):
+    client = UitestRpcClient(port=server.port).start()
+    try:
+        client.key_events([67, 67, 66])
+        client.input_text("你好")
+    finally:
+        client.close()
+    assert server.calls[1:] == [
+        ("Driver.triggerKey", [67]),
+        ("Driver.triggerKey", [67]),
+        ("Driver.triggerKey", [66]),
+        ("Driver.inputText", [{"x": 1, "y": 1}, "你好"]),
+    ]
+
+
+def test_agent_exceptions_raise():
+    with MockUitestServer(responses={"Driver.click": {"exception": "Can not connect to AAMS"}}) as server:
+        client = UitestRpcClient(port=server.port).start()
+        with pytest.raises(UitestRpcError, match="AAMS"):
+            client.click(1, 1)
+        client.close()
+
+
+def test_client_reconnects_after_close(server):
+    client = UitestRpcClient(port=server.port).start()
+    client.close()
+    client.click(3, 4)
+    client.close()
+    assert server.calls[-1] == ("Driver.click", [3, 4])
+
+
+def test_close_removes_the_port_forward(monkeypatch, server):
+    import unimobile.devices.uitest_rpc as uitest_rpc
+    from unimobile.devices.base import CommandResult
+
+    commands = []
+
+    def fake_execute(cmd, **kwargs):
+        commands.append(cmd)
+        return CommandResult("", "", 0)
+
+    monkeypatch.setattr(uitest_rpc, "_execute_command", fake_execute)
+    client = UitestRpcClient("FMR0223C13000649", port=server.port).start()
+    client.close()
+    client.close()
+
+    assert commands[-1] == f"hdc -t FMR0223C13000649 fport rm tcp:{server.port} tcp:8012"
+    assert sum("fport rm" in cmd for cmd in commands) == 1
+
+
+def test_request_is_not_resent_after_the_connection_drops():
+    # The agent reads the click, then drops the connection without replying
+    with MockUitestServer(responses={"Driver.click": None}) as server:
+        client = UitestRpcClient(port=server.port).start()
+        with pytest.raises(UitestRpcError) as error:
+            client.click(1, 2)
+        client.close()
+    assert error.value.sent is True
+    assert server.calls.count(("Driver.click", [1, 2])) == 1
+
+
+def test_request_is_retried_when_it_never_left_the_host(server):
+    client = UitestRpcClient(port=server.port).start()
+    # A dead socket that fails before sending: the client reconnects and sends once
+    client._sock.close()
+    client.click(3, 4)
+    client.close()
+    assert server.calls.count(("Driver.click", [3, 4])) == 1
+
+
+def test_rejected_call_may_fall_back():
+    with MockUitestServer(responses={"Driver.inputText": {"exception": "no focus"}}) as server:
+        client = UitestRpcClient(port=server.port).start()
+        with pytest.raises(UitestRpcError) as error:
+            client.input_text("a")
+        client.close()
+    # The agent refused the only call in the burst: nothing ran
+    assert error.value.sent is False
@@ -0,0 +1,23 @@
+#!/bin/sh
+# Build the on-device input injection helper used by AndroidDevice(injector_jar=...).
+#
+# Needs a JDK (javac) and an Android SDK with one platform and build-tools (d8):
+#     ANDROID_HOME=~/Android/Sdk tools/injector/build.sh
+# Output: build/unimobile-injector.jar (a dex jar run with app_process)
+set -e
+
+HERE=$(cd "$(dirname "$0")" && pwd)
+ROOT=$(cd "$HERE/../.." && pwd)
+: "${ANDROID_HOME:=${ANDROID_SDK_ROOT:?set ANDROID_HOME to the Android SDK}}"
+ANDROID_JAR=${ANDROID_JAR:-$(ls "$ANDROID_HOME"/platforms/android-*/android.jar | sort -V | tail -n 1)}
+D8=${D8:-$(ls "$ANDROID_HOME"/build-tools/*/d8 | sort -V | tail -n 1)}
+OUT=${OUT:-$ROOT/build/unimobile-injector.jar}
+
+CLASSES=$(mktemp -d)
+trap 'rm -rf "$CLASSES"' EXIT
+
+javac -source 8 -target 8 -encoding UTF-8 -classpath "$ANDROID_JAR" -d "$CLASSES" \
+    $(find "$HERE/src" -name '*.java')
+mkdir -p "$(dirname "$OUT")"
+"$D8" --min-api 24 --lib "$ANDROID_JAR" --output "$OUT" $(find "$CLASSES" -name '*.class')
+echo "Built $OUT"
@@ -0,0 +1,204 @@
+package com.unimobile.injector;
+
+import android.net.LocalServerSocket;
+import android.net.LocalSocket;
+import android.os.SystemClock;
+import android.util.Base64;
+import android.view.InputDevice;
+import android.view.InputEvent;
+import android.view.KeyCharacterMap;
+import android.view.KeyEvent;
+import android.view.MotionEvent;
+
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.List;
+
+/**
+ * On-device half of unimobile/devices/injector.py.
+ *
+ * Started once with app_process (shell uid, which holds INJECT_EVENTS), it
+ * listens on an abstract socket and injects input events through the hidden
+ * InputManager API, so a gesture costs a socket round trip instead of
+ * starting the `input` tool's runtime.
+ *
+ * Each request line is parsed and validated before anything is injected:
+ * "ERR" means nothing reached the device, "PARTIAL" means injection failed
+ * part way through and the client must not replay the request.
+ */
+public final class Server {
+    private static final String DEFAULT_SOCKET = "unimobile_injector";
+    // InputManager.INJECT_INPUT_EVENT_MODE_WAIT_FOR_FINISH
+    private static final int INJECT_MODE_WAIT_FOR_FINISH = 2;
+    private static final int SWIPE_STEP_MS = 10;
+
+    private final Object inputManager;
+    private final Method injectInputEvent;
+    private final KeyCharacterMap charMap = KeyCharacterMap.load(KeyCharacterMap.VIRTUAL_KEYBOARD);
+
+    private Server() throws ReflectiveOperationException {
+        Class<?> cls;
+        try {
+            // Android 14 moved injection to InputManagerGlobal
+            cls = Class.forName("android.hardware.input.InputManagerGlobal");
+        } catch (ClassNotFoundException e) {
+            cls = Class.forName("android.hardware.input.InputManager");
+        }
+        inputManager = cls.getDeclaredMethod("getInstance").invoke(null);
+        injectInputEvent = cls.getMethod("injectInputEvent", InputEvent.class, int.class);
+    }
+
+    private static final class RequestError extends Exception {
+        RequestError(String message) {
+            super(message);
+        }
+    }
+
+    /** Events of one request, with the pause (ms) to observe before each of them */
+    private static final class Plan {
+        final List<InputEvent> events = new ArrayList<>();
+        final List<Long> delays = new ArrayList<>();
+
+        void add(InputEvent event, long delayMs) {
+            events.add(event);
+            delays.add(delayMs);
+        }
+    }
+
+    private synchronized String handle(String line) {
+        String[] parts = line.trim().split(" ");
+        String op = parts[0];
+        if (op.equals("PING")) {
+            return "PONG";
+        }
+
+        Plan plan;
+        try {
+            plan = plan(op, parts);
+        } catch (RequestError | IllegalArgumentException e) {
+            return "ERR " + e.getMessage();
+        }
+
+        int injected = 0;
+        try {
+            for (int i = 0; i < plan.events.size(); i++) {
+                if (plan.delays.get(i) > 0) {
+                    SystemClock.sleep(plan.delays.get(i));
+                }
+                inject(plan.events.get(i));
+                injected++;
+            }
+        } catch (Exception e) {
+            return (injected == 0 ? "ERR " : "PARTIAL ") + e;
+        }
+        return "OK";
+    }
+
+    private Plan plan(String op, String[] parts) throws RequestError {
+        Plan plan = new Plan();
+        long now = SystemClock.uptimeMillis();
+        switch (op) {
+            case "TAP": {
+                expectArgs(parts, 2);
+                float x = Integer.parseInt(parts[1]), y = Integer.parseInt(parts[2]);
+                plan.add(touch(now, now, MotionEvent.ACTION_DOWN, x, y), 0);
+                plan.add(touch(now, now, MotionEvent.ACTION_UP, x, y), 0);
+                return plan;
+            }
+            case "SWIPE": {
+                expectArgs(parts, 5);
+                float x1 = Integer.parseInt(parts[1]), y1 = Integer.parseInt(parts[2]);
+                float x2 = Integer.parseInt(parts[3]), y2 = Integer.parseInt(parts[4]);
+                int duration = Math.max(SWIPE_STEP_MS, Integer.parseInt(parts[5]));
+                int steps = duration / SWIPE_STEP_MS;
+                plan.add(touch(now, now, MotionEvent.ACTION_DOWN, x1, y1), 0);
+                for (int i = 1; i <= steps; i++) {
+                    float t = (float) i / steps;
+                    plan.add(touch(now, now + (long) i * SWIPE_STEP_MS, MotionEvent.ACTION_MOVE,
+                            x1 + (x2 - x1) * t, y1 + (y2 - y1) * t), SWIPE_STEP_MS);
+                }
+                plan.add(touch(now, now + duration, MotionEvent.ACTION_UP, x2, y2), 0);
+                return plan;
+            }
+            case "KEY": {
+                if (parts.length < 2) {
+                    throw new RequestError("KEY needs at least one key code");
+                }
+                for (int i = 1; i < parts.length; i++) {
+                    int code = Integer.parseInt(parts[i]);
+                    plan.add(new KeyEvent(now, now, KeyEvent.ACTION_DOWN, code, 0), 0);
+                    plan.add(new KeyEvent(now, now, KeyEvent.ACTION_UP, code, 0), 0);
+                }
+                return plan;
+            }
+            case "TEXT": {
+                expectArgs(parts, 1);
+                String text = new String(Base64.decode(parts[1], Base64.DEFAULT), StandardCharsets.UTF_8);
+                KeyEvent[] events = charMap.getEvents(text.toCharArray());
+                if (events == null) {
+                    // e.g. CJK text: nothing is injected and the client retries with `input text`,
+                    // which cannot type it either
+                    throw new RequestError("text not representable with the virtual keyboard");
+                }
+                for (KeyEvent event : events) {
+                    plan.add(event, 0);
+                }
+                return plan;
+            }
+            default:
+                throw new RequestError("bad request: " + op);
+        }
+    }
+
+    private static void expectArgs(String[] parts, int count) throws RequestError {
+        if (parts.length != count + 1) {
+            throw new RequestError(parts[0] + " takes " + count + " arguments");
+        }
+    }
+
+    private static MotionEvent touch(long downTime, long eventTime, int action, float x, float y) {
+        MotionEvent event = MotionEvent.obtain(downTime, eventTime, action, x, y, 0);
+        event.setSource(InputDevice.SOURCE_TOUCHSCREEN);
+        return event;
+    }
+
+    private void inject(InputEvent event) throws Exception {
+        Boolean ok = (Boolean) injectInputEvent.invoke(inputManager, event, INJECT_MODE_WAIT_FOR_FINISH);
+        if (ok == null || !ok) {
+            throw new IOException("injectInputEvent refused " + event);
+        }
+    }
+
+    private void serve(LocalSocket client) {
+        try (LocalSocket socket = client;
+             BufferedReader reader = new BufferedReader(
+                     new InputStreamReader(socket.getInputStream(), StandardCharsets.UTF_8))) {
+            OutputStream out = socket.getOutputStream();
+            String line;
+            while ((line = reader.readLine()) != null) {
+                out.write((handle(line) + "\n").getBytes(StandardCharsets.UTF_8));
+                out.flush();
+            }
+        } catch (IOException e) {
+            System.err.println("unimobile-injector: client dropped: " + e);
+        }
+    }
+
+    public static void main(String[] args) throws Exception {
+        String name = args.length > 0 ? args[0] : DEFAULT_SOCKET;
+        Server server = new Server();
+        // Fails with "Address already in use" when a server is already running
+        LocalServerSocket listener = new LocalServerSocket(name);
+        while (true) {
+            final LocalSocket client = listener.accept();
+            Thread thread = new Thread(() -> server.serve(client), "unimobile-injector-client");
+            thread.setDaemon(true);
+            thread.start();
+        }
+    }
+}
@@ -4,6 +4,7 @@ from .planner.universal_planner import UniversalPlanner
 
 from .perception.omniparser import OmniParserPerception
 from .perception.grid import GridPerception
+from .perception.hierarchy import HierarchyPerception
 
 from .llm.openai_llm import OpenAILLM
 
@@ -20,6 +21,7 @@ __all__ = [
 
     "OmniParserPerception",
     "GridPerception",
+    "HierarchyPerception",
 
     "OpenAILLM",
 
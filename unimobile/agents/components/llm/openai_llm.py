@@ -1,12 +1,15 @@
-import base64
 import os
 import logging
 from typing import List
 
 from openai import OpenAI
 
+from unimobile.core.deadline import DeadlineExceeded, current_deadline
+from unimobile.core.frame import frame_for
 from unimobile.core.interfaces import BaseLLM
+from unimobile.core.tracing import span, traced
 from unimobile.utils.registry import register_llm
+from unimobile.config.timing import TIMING_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +28,19 @@ class OpenAILLM(BaseLLM):
         self.max_tokens = max_tokens
         self.model = model
 
+    @traced("llm.generate", "llm")
     def generate(self, prompt: str, images: List[str] = None) -> str:
         logger.info(f"llm model is: {self.model}")
+        # Bounded by the current task/step deadline: the request times out with it, and
+        # the answer is kept short when little budget is left
+        deadline = current_deadline()
+        timeout, max_tokens = None, self.max_tokens
+        if deadline is not None:
+            deadline.check("LLM call")
+            timeout = deadline.clamp(None)
+            if deadline.remaining() < TIMING_CONFIG.budget.llm_low_budget_below:
+                max_tokens = min(max_tokens, TIMING_CONFIG.budget.llm_low_budget_max_tokens)
+                logger.warning(f"LLM budget running low ({deadline.remaining():.1f}s), max_tokens capped to {max_tokens}")
         messages = [
             {
                 "role": "user",
@@ -42,7 +56,7 @@ class OpenAILLM(BaseLLM):
                         messages[0]["content"].append({
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
+                                "url": f"data:{self._mime_type(img_path)};base64,{base64_image}",
                                 "detail": "high"
                             }
                         })
@@ -50,18 +64,26 @@ class OpenAILLM(BaseLLM):
                         logger.error(f"Image encoding failed {img_path}: {e}")
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
+            with span("llm.request", "llm", model=self.model):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=self.temperature,
+                    timeout=timeout
+                )
             return response.choices[0].message.content
         except Exception as e:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded(f"LLM call: {e}") from e
             logger.error(f"OpenAILLM call failed: {e}")
             return ""
 
 
+    @staticmethod
+    def _mime_type(image_path: str) -> str:
+        return frame_for(image_path).mime_type
+
     def _encode_image(self, image_path: str) -> str:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
\ No newline at end of file
+        # Memoized on the step's shared Frame: the screenshot is not re-read per call
+        return frame_for(image_path).base64()
\ No newline at end of file
@@ -18,10 +18,15 @@ class GridPerception(BasePerception):
         base_name = os.path.basename(screenshot_path).split('.')[0]
         marked_path = os.path.join(dir_name, f"{base_name}_grid.png")
         
+        # decode once, shared by the size lookup, the grid drawing and the rest of the step
+        try:
+            img = perception_input.get_frame().bgr()
+        except Exception:
+            img = None
+
         # draw grid
-        rows, cols = self._draw_grid(screenshot_path, marked_path)
+        rows, cols = self._draw_grid(img, marked_path)
         
-        img = cv2.imread(screenshot_path)
         if img is None:
             h, w = 2340, 1080 
         else:
@@ -53,16 +58,17 @@ class GridPerception(BasePerception):
         
         return prompt
 
-    def _draw_grid(self, img_path, output_path) -> Tuple[int, int]:
+    def _draw_grid(self, img, output_path) -> Tuple[int, int]:
         def get_unit_len(n):
             for i in range(1, n + 1):
                 if n % i == 0 and 120 <= i <= 180:
                     return i
             return -1
 
-        image = cv2.imread(img_path)
+        image = cv2.imread(img) if isinstance(img, str) else img
         if image is None:
             return 0, 0
+        image = image.copy()
             
         height, width, _ = image.shape
         color = (255, 116, 113)
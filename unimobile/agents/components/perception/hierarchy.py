@@ -0,0 +1,148 @@
+import io
+import re
+import json
+import logging
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from unimobile.core.interfaces import BasePerception
+from unimobile.core.protocol import PerceptionResult, PerceptionInput
+from unimobile.utils.registry import register_perception
+
+logger = logging.getLogger(__name__)
+
+_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+
+def _parse_bounds(value: str) -> Optional[List[int]]:
+    match = _BOUNDS.search(value or "")
+    return [int(v) for v in match.groups()] if match else None
+
+
+def iter_xml_nodes(data: Union[bytes, str]) -> Iterator[Dict[str, str]]:
+    """Yield the attributes of every <node> of an in-memory `uiautomator dump`, clearing elements as it goes"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    for event, elem in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+        if event == "start" and elem.tag == "node":
+            yield dict(elem.attrib)
+        elif event == "end":
+            elem.clear()
+
+
+def iter_json_nodes(tree: Dict[str, Any]) -> Iterator[Dict[str, str]]:
+    """Walk a HarmonyOS `dump_hierarchy()` tree ({"attributes": {...}, "children": [...]})"""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        attributes = node.get("attributes", {})
+        yield {
+            "text": attributes.get("text", ""),
+            "content-desc": attributes.get("description", ""),
+            "resource-id": attributes.get("id", "") or attributes.get("key", ""),
+            "class": attributes.get("type", ""),
+            "clickable": str(attributes.get("clickable", "false")).lower(),
+            "enabled": str(attributes.get("enabled", "true")).lower(),
+            "bounds": attributes.get("bounds", ""),
+        }
+        stack.extend(reversed(node.get("children", [])))
+
+
+@register_perception("hierarchy_perception")
+class HierarchyPerception(BasePerception):
+    """
+    Elements straight from the accessibility hierarchy (uiautomator / ArkUI dump).
+
+    No model is involved: the dump, already in memory, is parsed on the CPU
+    in tens of milliseconds. Screens that expose no accessibility data raise, so the
+    agent falls through to the next perception strategy.
+    """
+    # The Runner fetches `device.dump_hierarchy()` for perceptions that need it
+    requires_ui = True
+
+    def __init__(self, max_elements: int = 80, clickable_only: bool = False, **kwargs):
+        self.max_elements = max_elements
+        self.clickable_only = clickable_only
+
+    def perceive(self, perception_input: PerceptionInput) -> PerceptionResult:
+        logger.info("#### HierarchyPerception ####")
+        ui_data = perception_input.ui_data
+        if ui_data is None and perception_input.ui_path:
+            with open(perception_input.ui_path, "rb") as f:
+                ui_data = f.read()
+        if not ui_data:
+            raise ValueError("No UI hierarchy available")
+
+        elements = self._extract(self._iter_nodes(ui_data), perception_input.width)
+        if not elements:
+            raise ValueError("UI hierarchy has no usable elements")
+
+        return PerceptionResult(
+            mode="hierarchy",
+            original_screenshot_path=perception_input.screenshot_path,
+            elements=elements,
+            metadata={"width": perception_input.width, "height": perception_input.height},
+            prompt_representation=self._get_prompt_context(elements),
+            visual_representations=[perception_input.screenshot_path]
+        )
+
+    @staticmethod
+    def _iter_nodes(ui_data: Union[bytes, str, Dict]) -> Iterator[Dict[str, str]]:
+        if isinstance(ui_data, dict):
+            return iter_json_nodes(ui_data)
+        text = ui_data.lstrip()
+        if text[:1] in (b"{", "{"):
+            return iter_json_nodes(json.loads(text))
+        return iter_xml_nodes(text)
+
+    def _extract(self, nodes: Iterator[Dict[str, str]], image_width: int) -> List[Dict[str, Any]]:
+        elements = []
+        scale = None
+        seen = set()
+        for node in nodes:
+            bounds = _parse_bounds(node.get("bounds"))
+            if bounds is None:
+                continue
+            if scale is None:
+                # The root node spans the physical screen; the screenshot may be downscaled
+                root_width = bounds[2] - bounds[0]
+                scale = image_width / root_width if image_width and root_width > 0 else 1.0
+
+            x1, y1, x2, y2 = bounds
+            if x2 <= x1 or y2 <= y1 or node.get("enabled", "true") == "false":
+                continue
+
+            text = node.get("text") or node.get("content-desc") or ""
+            clickable = node.get("clickable") == "true" or node.get("long-clickable") == "true"
+            if not (clickable or text.strip()) or (self.clickable_only and not clickable):
+                continue
+
+            box = [int(round(v * scale)) for v in bounds]
+            center = [(box[0] + box[2]) // 2, (box[1] + box[3]) // 2]
+            key = (tuple(box), text)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            elements.append({
+                "index": len(elements),
+                "text": text.strip(),
+                "type": node.get("class", "").rsplit(".", 1)[-1],
+                "resource_id": node.get("resource-id", ""),
+                "clickable": clickable,
+                "coordinates": center,
+                "bbox": box,
+            })
+            if len(elements) >= self.max_elements:
+                break
+        return elements
+
+    def _get_prompt_context(self, elements: list) -> str:
+        prompt = "--- UI Elements (accessibility hierarchy) ---\n"
+        prompt += "Format: ID | Text | Type | Resource ID | Clickable | Center Coordinates\n"
+
+        for e in elements:
+            prompt += (f"ID: {e['index']} | Text: {e['text']} | Type: {e['type']} | "
+                       f"Resource ID: {e['resource_id']} | Clickable: {e['clickable']} | Center: {e['coordinates']}\n")
+
+        return prompt
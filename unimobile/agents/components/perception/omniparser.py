@@ -1,11 +1,12 @@
+import os
 import re
 import ast
 import io
 import requests
 import base64
 import logging
-from PIL import Image
 
+from unimobile.core.deadline import current_deadline
 from unimobile.core.interfaces import BasePerception
 from unimobile.core.protocol import PerceptionResult, PerceptionInput
 from unimobile.utils.registry import register_perception
@@ -35,6 +36,9 @@ def omniparser_text_to_list(text_result: str) -> list[dict]:
 
 @register_perception("omniparser_perception")
 class OmniParserPerception(BasePerception):
+    # Round trip to a model server: swapped for a local strategy when the step budget runs low
+    expensive = True
+
     def __init__(self, url, box_threshold=0.5, iou_threshold=0.5, use_paddleocr=False):
         self.url = url
         self.box_threshold = box_threshold
@@ -70,15 +74,15 @@ class OmniParserPerception(BasePerception):
         width = perception_input.width
         height = perception_input.height
         try:
-            with Image.open(screenshot_path) as img:
-                width, height = img.size
+            frame = perception_input.get_frame()
+            width, height = frame.size
         except Exception as e:
             print(f"Failed to read the local screenshot: {e}")
         
         print(f"OmniParser width, height is: ({width}, {height})")
 
         try:
-            files = {"image": open(screenshot_path, "rb")}
+            files = {"image": (os.path.basename(screenshot_path), perception_input.get_frame().data)}
             data = {
                 "box_threshold": self.box_threshold,
                 "iou_threshold": self.iou_threshold,
@@ -86,7 +90,9 @@ class OmniParserPerception(BasePerception):
                 "imagsz": (width, height)
             }
             
-            response = requests.post(self.url, files=files, data=data)
+            deadline = current_deadline()
+            timeout = deadline.clamp(None) if deadline is not None else None
+            response = requests.post(self.url, files=files, data=data, timeout=timeout)
             result = response.json()
         except Exception as e:
             print(f"OmniParser network error: {e}")
@@ -99,7 +105,9 @@ class OmniParserPerception(BasePerception):
             try:
                 base64_str = result["data"]["processed_image"]
                 img_bytes = base64.b64decode(base64_str)
-                with open("temp/screenshots/last_omniparser_debug.png", "wb") as f:
+                # Next to the screenshot (like the SoM/grid images): one perception serves several devices
+                debug_path = f"{os.path.splitext(screenshot_path)[0]}_omniparser.png"
+                with open(debug_path, "wb") as f:
                     f.write(img_bytes)
             except Exception:
                 pass
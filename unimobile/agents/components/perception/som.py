@@ -3,7 +3,7 @@ import time
 import logging
 import torch
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw, ImageFont
 
 # Hugging Face GroundingDINO
 from transformers import AutoProcessor, AutoModelForZeroShotObjectDetection
@@ -55,7 +55,7 @@ class SetOfMarksPerception(BasePerception):
         logger.info(f"#### SoM Perception (GroundingDINO) ####")
 
         try:
-            image = Image.open(screenshot_path).convert("RGB")
+            image = perception_input.get_frame().pil()
             width, height = image.size
         except Exception as e:
             logger.error(f"Failed to read screenshot: {e}")
@@ -1,8 +1,10 @@
 import logging
 import os
 from typing import List
+from unimobile.core.deadline import current_deadline
 from unimobile.core.interfaces import BaseReason
 from unimobile.core.protocol import Action, PerceptionResult, MemoryFragment, FragmentType
+from unimobile.core.tracing import span
 from unimobile.utils.registry import register_reasoning, get_parser_class
 
 logger = logging.getLogger(__name__)
@@ -200,6 +202,9 @@ class UniversalReason(BaseReason):
              images = perception_result.visual_representations or [perception_result.original_screenshot_path]
 
         # LLM
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check("reasoning")
         response = self.llm.generate(prompt, images=images)
         logger.info(f"🧠 Response: {response}")
 
@@ -212,7 +217,9 @@ class UniversalReason(BaseReason):
             "elements": perception_result.elements
         }
         
-        return self.parser.parse(response, parse_metadata), response
+        with span("reasoning.parse", "agent"):
+            action = self.parser.parse(response, parse_metadata)
+        return action, response
 
     def _format_history(self, fragments: List[MemoryFragment]) -> str:
         """Generate text history from Memory Fragments
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 import logging
+from unimobile.core.frame import frame_for
 from unimobile.core.interfaces import BaseVerifier
 from unimobile.core.protocol import VerifierInput, VerifierResult, ActionType
 from unimobile.utils.registry import register_verifier
@@ -20,9 +21,16 @@ class ScreenDiffVerifier(BaseVerifier):
         if action.type not in [ActionType.TAP, ActionType.SWIPE, ActionType.TEXT]:
             return VerifierResult(is_success=True, feedback="Action type skipped verification")
 
+        mask = input_data.changed_mask
+        if mask is not None and not np.any(mask):
+            # The capture transport saw no changed pixel at all: no need to load either image
+            return VerifierResult(is_success=False, feedback="Screen did NOT change (Diff: 0.00%)",
+                                  score=0.0, should_retry=True)
+
         try:
-            img1 = cv2.imread(img_before_path)
-            img2 = cv2.imread(img_after_path)
+            # The previous step's frame is usually still decoded in the shared registry
+            img1 = (input_data.frame_before or frame_for(img_before_path)).bgr()
+            img2 = (input_data.frame_after or frame_for(img_after_path)).bgr()
 
             if img1 is None or img2 is None:
                 return VerifierResult(is_success=False, feedback="Failed to load screenshots")
@@ -30,13 +38,18 @@ class ScreenDiffVerifier(BaseVerifier):
             if img1.shape != img2.shape:
                 return VerifierResult(is_success=True, feedback="Screen dimension changed")
 
+            total_pixels = img1.shape[0] * img1.shape[1]
+            if mask is not None and mask.shape == img1.shape[:2]:
+                # Only the rows the transport reported as changed can differ
+                rows = np.asarray(mask).any(axis=1)
+                img1, img2 = img1[rows], img2[rows]
+
             gray1 = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
             gray2 = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
             diff = cv2.absdiff(gray1, gray2)
             _, thresh = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
             
             non_zero_count = np.count_nonzero(thresh)
-            total_pixels = gray1.shape[0] * gray1.shape[1]
             diff_ratio = non_zero_count / total_pixels
 
             logger.info(f"Verifier Diff Ratio: {diff_ratio:.4f}")
@@ -1,5 +1,6 @@
-from typing import Union, List, Optional
+from typing import Union, List, Optional, Tuple
 import logging
+import threading
 from dataclasses import dataclass
 
 from unimobile.core.interfaces import BaseAgent, BasePerception, BaseReason, BaseMemory, BasePlanner, BaseVerifier
@@ -10,7 +11,11 @@ from unimobile.core.protocol import (
     VerifierInput, VerifierResult,
     PlanInput
 )
+from unimobile.core.deadline import low_budget
+from unimobile.core.frame import frame_for
+from unimobile.core.tracing import span, traced
 from unimobile.utils.registry import register_strategy
+from unimobile.config.timing import TIMING_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -51,12 +56,18 @@ class ModularAgent(BaseAgent):
         self.state = AgentRuntimeState()
         self.current_task = ""
         self.current_plan = ""
+        # Set by prefetch_knowledge, consumed by the next slow-path decision
+        self._knowledge_ready = False
+        # A pipelined Runner runs verify_last, perceive and prefetch_knowledge concurrently:
+        # the agent state and the memory are only read and written under this lock
+        self._lock = threading.RLock()
 
     def reset(self, task: str):
         self.current_task = task
         logger.info(f"Agent reset task: {task}")
         
         self.state = AgentRuntimeState()
+        self._knowledge_ready = False
         
         self.memory.clear()
         self.memory.add(MemoryFragment(
@@ -82,79 +93,142 @@ class ModularAgent(BaseAgent):
         else:
             self.current_plan = "No specific plan, execute step by step."
 
-    def step(self, screenshot_path: str, width: int, height: int) -> Action:
-        
-        # =================================================
-        # 0. Verification Phase
-        # =================================================
-        if self.verifier and self.state.last_screenshot_path and self.state.last_action:
-            
-            if self.state.last_action.type in [ActionType.TAP, ActionType.SWIPE, ActionType.TEXT]:
-                
-                verify_input = VerifierInput(
-                    task=self.current_task,
-                    screenshot_before=self.state.last_screenshot_path,
-                    screenshot_after=screenshot_path,
-                    action=self.state.last_action
-                )
-                
-                verify_result = self.verifier.verify(verify_input)
-            
-                if not verify_result.is_success:
-                    logger.warning(f"The previous operation of the Verifier was judged as a failure: {verify_result.feedback}")
-
-                    if self.state.current_strategy_idx < len(self.strategies) - 1:
-                        self.state.current_strategy_idx += 1
-                        new_strategy_name = self.strategies[self.state.current_strategy_idx].__class__.__name__
-                        logger.info(f"The Agent automatically switches the perception strategy -> {new_strategy_name}")
-                        
-                        self.memory.add(MemoryFragment(
-                            role="system",
-                            type=FragmentType.ERROR,
-                            content=f"Previous action failed verification. Reason: {verify_result.feedback}. Switching perception strategy."
-                        ))
-                    else:
-                        logger.warning("The Agent has no more strategies to switch to. Keep trying the current strategy.")
-                else:
-                    # success
-                    if self.verbose: logger.info(f"Verifier passed: {verify_result.feedback}")
-                    if self.state.current_strategy_idx != 0:
-                        logger.info("Agent operate successfully")
-                        self.state.current_strategy_idx = 0
+    # Accepts the `changed_mask` keyword from Runners on delta-capture devices
+    uses_changed_mask = True
+
+    @property
+    def requires_ui(self) -> bool:
+        """Whether the current perception strategy wants the UI hierarchy alongside the screenshot"""
+        return getattr(self.strategies[self.state.current_strategy_idx], "requires_ui", False)
+
+    def step(self, screenshot_path: str, width: int, height: int, ui_data=None, changed_mask=None) -> Action:
+        # The stages are public so a pipelined Runner can overlap them (see Runner(pipelined=True))
+        self.verify_last(screenshot_path, changed_mask)
+
+        perception_result, strategy_idx = self.perceive(screenshot_path, width, height, ui_data, changed_mask)
+        self.state.current_strategy_idx = strategy_idx
+        if isinstance(perception_result, Action):
+            return perception_result
+
+        return self.decide(screenshot_path, perception_result)
+
+    @traced("agent.verify", "agent")
+    def verify_last(self, screenshot_path: str, changed_mask=None):
+        """
+        0. Verification Phase: judge the previous action from the new screenshot
+        and switch the perception strategy on failure
+        """
+        with self._lock:
+            last_screenshot_path, last_action = self.state.last_screenshot_path, self.state.last_action
+        if not (self.verifier and last_screenshot_path and last_action):
+            return
+        if last_action.type not in [ActionType.TAP, ActionType.SWIPE, ActionType.TEXT]:
+            return
+        if low_budget(TIMING_CONFIG.budget.skip_verify_below):
+            logger.warning("Step budget running low, skipping verification of the previous action")
+            return
+
+        verify_input = VerifierInput(
+            task=self.current_task,
+            screenshot_before=last_screenshot_path,
+            screenshot_after=screenshot_path,
+            action=last_action,
+            changed_mask=changed_mask,
+            frame_before=frame_for(last_screenshot_path),
+            frame_after=frame_for(screenshot_path)
+        )
+
+        verify_result = self.verifier.verify(verify_input)
+        with self._lock:
+            self._apply_verification(verify_result)
+
+    def _apply_verification(self, verify_result: VerifierResult):
+        if not verify_result.is_success:
+            logger.warning(f"The previous operation of the Verifier was judged as a failure: {verify_result.feedback}")
 
-        # =================================================
-        # 1. Perception Phase
-        # =================================================
-        current_perception_tool = self.strategies[self.state.current_strategy_idx]
-        perception_result = None
-        
-        try:
-            perception_input = PerceptionInput(
-                screenshot_path=screenshot_path,
-                width=width,
-                height=height
-            )
-            perception_result = current_perception_tool.perceive(perception_input)
-            
-            if perception_result is None:
-                raise ValueError("Perception returned None")
-                
-        except Exception as e:
-            logger.error(f"Perception {current_perception_tool.__class__.__name__} Error: {e}")
             if self.state.current_strategy_idx < len(self.strategies) - 1:
                 self.state.current_strategy_idx += 1
-                logger.info("Agent Perception Error, try next perception...")
-                return self.step(screenshot_path, width, height)
+                new_strategy_name = self.strategies[self.state.current_strategy_idx].__class__.__name__
+                logger.info(f"The Agent automatically switches the perception strategy -> {new_strategy_name}")
+
+                self.memory.add(MemoryFragment(
+                    role="system",
+                    type=FragmentType.ERROR,
+                    content=f"Previous action failed verification. Reason: {verify_result.feedback}. Switching perception strategy."
+                ))
             else:
-                return Action(type=ActionType.FAIL, thought=f"All perception strategies crashed: {e}")
+                logger.warning("The Agent has no more strategies to switch to. Keep trying the current strategy.")
+        else:
+            # success
+            if self.verbose: logger.info(f"Verifier passed: {verify_result.feedback}")
+            if self.state.current_strategy_idx != 0:
+                logger.info("Agent operate successfully")
+                self.state.current_strategy_idx = 0
+
+    @traced("agent.perceive", "agent")
+    def perceive(self, screenshot_path: str, width: int, height: int, ui_data=None, changed_mask=None,
+                 strategy_idx: int = None) -> Tuple[Union[PerceptionResult, Action], int]:
+        """
+        1. Perception Phase, starting from `strategy_idx` (default: the current strategy)
+        and falling through to the next strategy on errors.
+
+        Does not touch the agent state, so it can run alongside `verify_last`.
+        When the step budget runs low, an `expensive` strategy (e.g. a remote
+        parser) is replaced by the first cheap one.
+
+        Returns:
+            (PerceptionResult, or a FAIL Action when every strategy crashed; the strategy index used)
+        """
+        idx = self.state.current_strategy_idx if strategy_idx is None else strategy_idx
+        if getattr(self.strategies[idx], "expensive", False) and low_budget(TIMING_CONFIG.budget.cheap_perception_below):
+            cheap = [i for i, strategy in enumerate(self.strategies) if not getattr(strategy, "expensive", False)]
+            if cheap:
+                logger.warning(f"Step budget running low, perceiving with {self.strategies[cheap[0]].__class__.__name__}")
+                idx = cheap[0]
+        while True:
+            current_perception_tool = self.strategies[idx]
+            try:
+                perception_input = PerceptionInput(
+                    screenshot_path=screenshot_path,
+                    width=width,
+                    height=height,
+                    ui_data=ui_data,
+                    changed_mask=changed_mask,
+                    frame=frame_for(screenshot_path)
+                )
+                with span(f"perception.{current_perception_tool.__class__.__name__}", "perception"):
+                    perception_result = current_perception_tool.perceive(perception_input)
+
+                if perception_result is None:
+                    raise ValueError("Perception returned None")
+                break
+
+            except Exception as e:
+                logger.error(f"Perception {current_perception_tool.__class__.__name__} Error: {e}")
+                if idx < len(self.strategies) - 1:
+                    idx += 1
+                    logger.info("Agent Perception Error, try next perception...")
+                else:
+                    return Action(type=ActionType.FAIL, thought=f"All perception strategies crashed: {e}"), idx
 
         if self.verbose:
             logger.info(f"Agent perception done (Mode: {perception_result.mode})")
+        return perception_result, idx
 
+    @traced("agent.load_knowledge", "agent")
+    def prefetch_knowledge(self):
+        """Start the slow-path knowledge retrieval early; it only depends on the task"""
+        with self._lock:
+            self.memory.load_knowledge(query=self.current_task)
+            self._knowledge_ready = True
+
+    def decide(self, screenshot_path: str, perception_result: PerceptionResult) -> Action:
         # =================================================
         # 2. Fast Path: Konwledge Traces
         # =================================================
-        cached_action = self.memory.retrieve_experience(screenshot_path, self.current_task)
+        with span("agent.fast_path", "agent") as fast_path, self._lock:
+            cached_action = self.memory.retrieve_experience(screenshot_path, self.current_task)
+            fast_path.set(hit=bool(cached_action))
         
         if cached_action:
             logger.info(f"Agent Fast Path execute: {cached_action.type}")
@@ -169,21 +243,26 @@ class ModularAgent(BaseAgent):
         # 3. Slow Path
         # =================================================
         # A. Memory retriever
-        self.memory.load_knowledge(query=self.current_task)
+        with self._lock:
+            if not self._knowledge_ready:
+                with span("agent.load_knowledge", "agent"):
+                    self.memory.load_knowledge(query=self.current_task)
+            self._knowledge_ready = False
 
-        # B. Get Fragment
-        context_fragments = self.memory.get_working_context()
+            # B. Get Fragment
+            context_fragments = self.memory.get_working_context()
 
         # C. Think
         if self.verbose: logger.info("Agent Slow Path execute...")
         
         try:
-            action, response = self.reasoning.think(
-                task=self.current_task,
-                plan=self.current_plan,
-                perception_result=perception_result,
-                memory_context=context_fragments
-            )
+            with span("agent.think", "agent"):
+                action, response = self.reasoning.think(
+                    task=self.current_task,
+                    plan=self.current_plan,
+                    perception_result=perception_result,
+                    memory_context=context_fragments
+                )
         except Exception as e:
             logger.error(f"Agent think Error: {e}")
             return Action(type=ActionType.FAIL, thought=f"Brain Error: {e}")
@@ -202,16 +281,17 @@ class ModularAgent(BaseAgent):
         return action
 
     def _save_action_to_memory(self, action: Action, response: str, source: str):
-        self.memory.add(MemoryFragment(
-            role="assistant",
-            type=FragmentType.ACTION,
-            content=action,
-            metadata={"source": source}
-        ))
+        with self._lock:
+            self.memory.add(MemoryFragment(
+                role="assistant",
+                type=FragmentType.ACTION,
+                content=action,
+                metadata={"source": source}
+            ))
 
-        self.memory.add(MemoryFragment(
-            role="assistant",
-            type=FragmentType.TEXT,
-            content=response,
-            metadata={"source": source}
-        ))
+            self.memory.add(MemoryFragment(
+                role="assistant",
+                type=FragmentType.TEXT,
+                content=response,
+                metadata={"source": source}
+            ))
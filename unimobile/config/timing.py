@@ -23,12 +23,43 @@ class DeviceTimingConfig:
     default_back_delay: float = 1.0
     default_home_delay: float = 1.0
     default_launch_delay: float = 3.0
+    package_cache_ttl: float = 300.0
 
 @dataclass
 class ConnectionTimingConfig:
     """Connect the relevant time configuration"""
     adb_restart_delay: float = 2.0
     server_restart_delay: float = 1.0
+    shell_command_timeout: float = 20.0
+    # Installs, pushes and emulator snapshots, which legitimately outlast a shell command
+    transfer_timeout: float = 300.0
+    device_scan_timeout: float = 5.0
+    device_scan_ttl: float = 2.0
+    device_watch_interval: float = 2.0
+    heartbeat_interval: float = 5.0
+    reconnect_backoff: float = 1.0
+    reconnect_max_backoff: float = 30.0
+    reconnect_timeout: float = 300.0
+    max_capture_retries: int = 3
+
+@dataclass
+class CaptureTimingConfig:
+    """Background frame capture time configuration"""
+    poll_interval: float = 0.05
+    stable_duration: float = 0.3
+    max_stable_wait: float = 5.0
+    buffer_size: int = 8
+    settle_interval: float = 0.1
+    settle_min_wait: float = 0.15
+    settle_stride: int = 8
+
+@dataclass
+class BudgetTimingConfig:
+    """Deadline budget thresholds (seconds left) below which the agent degrades"""
+    skip_verify_below: float = 10.0
+    cheap_perception_below: float = 20.0
+    llm_low_budget_below: float = 15.0
+    llm_low_budget_max_tokens: int = 512
 
 @dataclass
 class TimingConfig:
@@ -36,10 +67,14 @@ class TimingConfig:
     action: ActionTimingConfig
     device: DeviceTimingConfig
     connection: ConnectionTimingConfig
+    capture: CaptureTimingConfig
+    budget: BudgetTimingConfig
 
     def __init__(self):
         self.action = ActionTimingConfig()
         self.device = DeviceTimingConfig()
         self.connection = ConnectionTimingConfig()
+        self.capture = CaptureTimingConfig()
+        self.budget = BudgetTimingConfig()
 
 TIMING_CONFIG = TimingConfig()
\ No newline at end of file
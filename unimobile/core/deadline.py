@@ -0,0 +1,78 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a task or step runs out of its time budget"""
+    pass
+
+
+class Deadline:
+    """
+    A wall-clock budget. Deadlines nest: a child never outlives its parent.
+
+    Example:
+        with deadline_scope(30):            # per step
+            device.shell("input tap 1 2")   # bounded by the step budget
+    """
+    def __init__(self, timeout: Optional[float] = None, parent: "Deadline" = None):
+        self.start = time.monotonic()
+        self.timeout = timeout
+        self.parent = parent
+        end = self.start + timeout if timeout is not None else float("inf")
+        if parent is not None:
+            end = min(end, parent.end)
+        self.end = end
+
+    def remaining(self) -> float:
+        return max(0.0, self.end - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.end
+
+    def clamp(self, timeout: Optional[float]) -> Optional[float]:
+        """The smaller of `timeout` and the remaining budget (None when both are unbounded)"""
+        if self.end == float("inf"):
+            return timeout
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+    def check(self, what: str = ""):
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline exceeded{': ' + what if what else ''}")
+
+    def child(self, timeout: Optional[float] = None) -> "Deadline":
+        return Deadline(timeout, parent=self)
+
+
+_local = threading.local()
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The innermost deadline installed by `deadline_scope` in this thread"""
+    return getattr(_local, "deadline", None)
+
+
+def low_budget(threshold: float) -> bool:
+    """Whether the current deadline has less than `threshold` seconds left (False when unbounded)"""
+    deadline = current_deadline()
+    return deadline is not None and deadline.remaining() < threshold
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float] = None, deadline: Deadline = None):
+    """Install a deadline (nested inside the current one) for the duration of the block"""
+    previous = current_deadline()
+    if deadline is None:
+        deadline = Deadline(timeout, parent=previous)
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
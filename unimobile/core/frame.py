@@ -0,0 +1,195 @@
+import os
+import base64
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from unimobile.devices.capture import PNG_SIGNATURE, decode_image, encode_jpeg, image_size, resize_image, write_bytes
+
+MIME_TYPES = {".png": "image/png", ".webp": "image/webp", ".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+
+
+class Frame:
+    """
+    One screenshot shared by every component of a step.
+
+    Each representation (encoded bytes, BGR/RGB/gray arrays, downscaled
+    copies, JPEG, base64) is computed on first use and memoized, so the
+    file is read and decoded at most once however many perceptions,
+    verifiers and LLM adapters look at it. The path is kept for components
+    that still work on files.
+
+    Example:
+        frame = Frame.from_bytes(device.capture(), path)
+        frame.bgr()             # decoded once
+        frame.base64()          # the original encoding, read/encoded once
+    """
+    def __init__(self, path: str = None, data: bytes = None, image: np.ndarray = None, color: str = "BGR"):
+        if path is None and data is None and image is None:
+            raise ValueError("A Frame needs a path, encoded bytes or an image")
+        self.path = path
+        self._data = data
+        self._views: Dict[Any, Any] = {}
+        if image is not None:
+            self._views["bgr"] = image if color == "BGR" else cv2.cvtColor(
+                image, cv2.COLOR_RGBA2BGR if color == "RGBA" else cv2.COLOR_RGB2BGR)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_path(cls, path: str) -> "Frame":
+        return cls(path=path)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, path: str = None) -> "Frame":
+        return cls(path=path, data=data)
+
+    @classmethod
+    def from_array(cls, image: np.ndarray, path: str = None, color: str = "BGR") -> "Frame":
+        return cls(path=path, image=image, color=color)
+
+    def _memo(self, key, compute: Callable[[], Any]):
+        with self._lock:
+            if key not in self._views:
+                self._views[key] = compute()
+            return self._views[key]
+
+    @property
+    def data(self) -> bytes:
+        """The encoded image: the file / captured bytes, or a fast PNG of an in-memory array"""
+        with self._lock:
+            if self._data is None:
+                if self.path and os.path.exists(self.path):
+                    with open(self.path, "rb") as f:
+                        self._data = f.read()
+                else:
+                    ok, buf = cv2.imencode(".png", self.bgr(), [cv2.IMWRITE_PNG_COMPRESSION, 1])
+                    if not ok:
+                        raise ValueError("Failed to encode frame")
+                    self._data = buf.tobytes()
+            return self._data
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height), from the PNG header when nothing has been decoded yet"""
+        with self._lock:
+            if "bgr" in self._views:
+                height, width = self._views["bgr"].shape[:2]
+                return width, height
+            if self.data[:8] == PNG_SIGNATURE:
+                return image_size(self.data)
+        height, width = self.bgr().shape[:2]
+        return width, height
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def mime_type(self) -> str:
+        if self.path:
+            return MIME_TYPES.get(os.path.splitext(self.path)[1].lower(), "image/jpeg")
+        return "image/png" if self.data[:8] == PNG_SIGNATURE else "image/jpeg"
+
+    def bgr(self) -> np.ndarray:
+        return self._memo("bgr", lambda: decode_image(self.data))
+
+    def rgb(self) -> np.ndarray:
+        return self._memo("rgb", lambda: cv2.cvtColor(self.bgr(), cv2.COLOR_BGR2RGB))
+
+    def gray(self) -> np.ndarray:
+        return self._memo("gray", lambda: cv2.cvtColor(self.bgr(), cv2.COLOR_BGR2GRAY))
+
+    def pil(self):
+        """A new RGB PIL image built from the memoized RGB array: callers may draw on it"""
+        from PIL import Image
+        return Image.fromarray(self.rgb())
+
+    def scaled(self, max_side: int) -> np.ndarray:
+        """BGR copy whose long side is at most `max_side`"""
+        def compute():
+            height, width = self.bgr().shape[:2]
+            scale = min(1.0, max_side / max(width, height))
+            return resize_image(self.bgr(), max(1, round(width * scale)), max(1, round(height * scale)))
+        return self._memo(("scaled", max_side), compute)
+
+    def jpeg(self, quality: int = 80, max_side: int = None) -> bytes:
+        def compute():
+            return encode_jpeg(self.scaled(max_side) if max_side else self.bgr(), quality)
+        return self._memo(("jpeg", quality, max_side), compute)
+
+    def base64(self) -> str:
+        """The original encoding as base64 (see `mime_type`)"""
+        return self._memo("base64", lambda: base64.b64encode(self.data).decode("utf-8"))
+
+    def save(self, path: str = None) -> str:
+        """Make sure the frame exists on disk for path-based components"""
+        path = path or self.path
+        if path is None:
+            raise ValueError("Frame has no path")
+        if path != self.path or not os.path.exists(path):
+            write_bytes(path, self.data)
+        self.path = self.path or path
+        return path
+
+
+# path -> Frame for the last few frames: components that only receive paths
+# (LLM adapters, verifiers comparing with the previous step) share the decoded views.
+# Every running Runner gets FRAMES_PER_RUNNER slots (see frame_scope), so the
+# runners of a DevicePool do not evict each other's frames.
+_REGISTRY: "OrderedDict[str, Frame]" = OrderedDict()
+FRAMES_PER_RUNNER = 4
+_active_runners = 0
+_registry_lock = threading.Lock()
+
+
+def _capacity() -> int:
+    return FRAMES_PER_RUNNER * max(1, _active_runners)
+
+
+@contextmanager
+def frame_scope():
+    """Held by a Runner while it runs: grows the registry by one runner's worth of frames"""
+    global _active_runners
+    with _registry_lock:
+        _active_runners += 1
+    try:
+        yield
+    finally:
+        with _registry_lock:
+            _active_runners -= 1
+            _evict()
+
+
+def _evict():
+    while len(_REGISTRY) > _capacity():
+        _REGISTRY.popitem(last=False)
+
+
+def register_frame(frame: Frame) -> Frame:
+    if not frame.path:
+        raise ValueError("Only frames with a path can be registered")
+    key = os.path.abspath(frame.path)
+    with _registry_lock:
+        _REGISTRY[key] = frame
+        _REGISTRY.move_to_end(key)
+        _evict()
+    return frame
+
+
+def frame_for(path: str) -> Frame:
+    """The registered Frame for `path`, or a new one (registered) read from the file"""
+    key = os.path.abspath(path)
+    with _registry_lock:
+        frame: Optional[Frame] = _REGISTRY.get(key)
+        if frame is not None:
+            _REGISTRY.move_to_end(key)
+            return frame
+    return register_frame(Frame.from_path(path))
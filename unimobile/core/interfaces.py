@@ -244,6 +244,8 @@ class BaseAgent(ABC):
     """
     @abstractmethod
     def step(self, screenshot_path: str, width: int, height: int) -> Action:
+        """Agents whose perception has `requires_ui` also accept a `ui_data` keyword (see PerceptionInput),
+        agents with `uses_changed_mask` a `changed_mask` keyword"""
         pass
     
     @abstractmethod
@@ -0,0 +1,236 @@
+import os
+import re
+import time
+import queue
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from unimobile.core.interfaces import BaseAgent
+from unimobile.core.protocol import ActionType
+from unimobile.core.runner import Runner
+from unimobile.devices.base import BaseDevice, DeviceInfo
+from unimobile.devices.manager import DeviceManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TaskResult:
+    """
+    The outcome of one task dispatched by the DevicePool
+    """
+    index: int
+    task: Union[str, Dict]
+    device_id: Optional[str] = None
+    trajectory: List[Dict[str, Any]] = field(default_factory=list)
+    success: bool = False
+    error: Optional[str] = None
+    attempts: int = 0
+    duration: float = 0.0
+
+
+@dataclass
+class DeviceLease:
+    """
+    A device held by the pool together with its own agent and runner
+    """
+    info: DeviceInfo
+    device: BaseDevice
+    agent: BaseAgent
+    runner: Runner
+    failures: int = 0
+    retired: bool = False
+
+
+class DevicePool:
+    """
+    Runs a queue of tasks across all attached devices in parallel.
+
+    Each leased device gets its own agent and Runner and executes one task at
+    a time. A task whose device fails its health check is requeued on another
+    device; a device that keeps failing is retired from the pool.
+
+    Example:
+        pool = DevicePool.from_config("configs/agent_android_classic.yaml")
+        results = pool.run(["Open settings", "Turn on wifi"], max_steps=15)
+    """
+    def __init__(self,
+                 agent_factory: Callable[[BaseDevice], BaseAgent],
+                 device_factory: Callable[[DeviceInfo], BaseDevice] = None,
+                 device_ids: List[str] = None,
+                 platforms: List[str] = None,
+                 max_attempts: int = 2,
+                 max_device_failures: int = 2,
+                 runner_kwargs: Dict[str, Any] = None):
+        """
+        Args:
+            agent_factory (Callable[[BaseDevice], BaseAgent]): builds one agent per leased device
+            device_factory (Callable[[DeviceInfo], BaseDevice], optional): Defaults to DeviceManager.get_device_instance.
+            device_ids (List[str], optional): only lease these devices. Defaults to every attached device.
+            platforms (List[str], optional): only lease devices of these platforms. Defaults to None.
+            max_attempts (int, optional): how many devices a task may be tried on. Defaults to 2.
+            max_device_failures (int, optional): failed health checks before a device is retired. Defaults to 2.
+            runner_kwargs (Dict[str, Any], optional): extra Runner arguments. Defaults to None.
+        """
+        self.agent_factory = agent_factory
+        self.device_factory = device_factory or (
+            lambda info: DeviceManager.get_device_instance(info.device_id, info.platform))
+        self.device_ids = device_ids
+        self.platforms = platforms
+        self.max_attempts = max_attempts
+        self.max_device_failures = max_device_failures
+        self.runner_kwargs = runner_kwargs or {}
+        self.leases: List[DeviceLease] = []
+
+    @classmethod
+    def from_config(cls, config_path: str, **kwargs) -> "DevicePool":
+        """Build every device and agent from one YAML config, sharing its stateless components"""
+        from unimobile.utils.config_loader import ConfigLoader
+
+        loader = ConfigLoader(config_path)
+        shared: Dict[str, Any] = {}
+        action_cfg = loader.config.get("agent", {}).get("components", {}).get("action", {})
+        action_name = action_cfg if isinstance(action_cfg, str) else action_cfg.get("name", "")
+        platform = action_name.split("_")[0]
+
+        kwargs.setdefault("platforms", [platform] if platform in ("android", "harmony") else None)
+        return cls(agent_factory=lambda device: loader.load_agent(shared=shared),
+                   device_factory=lambda info: loader.load_device(device_id=info.device_id),
+                   **kwargs)
+
+    def lease_devices(self) -> List[DeviceLease]:
+        """Scan attached devices and build an agent and runner for each healthy one"""
+        for info in DeviceManager.list_all_devices():
+            if info.status != "device":
+                continue
+            if self.device_ids and info.device_id not in self.device_ids:
+                continue
+            if self.platforms and info.platform not in self.platforms:
+                continue
+            if any(lease.info.device_id == info.device_id for lease in self.leases):
+                continue
+
+            try:
+                device = self.device_factory(info)
+                agent = self.agent_factory(device)
+                save_dir = os.path.join(os.getcwd(), "temp", "screenshots", re.sub(r"[^\w.-]", "_", info.device_id))
+                runner = Runner(agent, device, save_dir=save_dir, **self.runner_kwargs)
+            except Exception as e:
+                logger.error(f"DevicePool failed to lease {info.device_id}: {e}")
+                continue
+
+            lease = DeviceLease(info=info, device=device, agent=agent, runner=runner)
+            if self.health_check(lease):
+                self.leases.append(lease)
+                logger.info(f"DevicePool leased {info.platform} device {info.device_id}")
+            else:
+                device.close()
+
+        return self.leases
+
+    def health_check(self, lease: DeviceLease) -> bool:
+        try:
+            result = lease.device.shell("echo unimobile_ok", error_raise=False)
+            return result.exit_code == 0 and "unimobile_ok" in result.output
+        except Exception as e:
+            logger.warning(f"DevicePool health check failed on {lease.info.device_id}: {e}")
+            return False
+
+    def run(self, tasks: List[Union[str, Dict]], max_steps: int = 15) -> List[TaskResult]:
+        """Dispatch `tasks` across the leased devices and block until all are finished"""
+        if not any(not lease.retired for lease in self.leases):
+            self.lease_devices()
+        if not any(not lease.retired for lease in self.leases):
+            raise RuntimeError("DevicePool: no healthy devices available")
+
+        results = [TaskResult(index=i, task=task) for i, task in enumerate(tasks)]
+        pending: "queue.Queue[int]" = queue.Queue()
+        for i in range(len(tasks)):
+            pending.put(i)
+
+        state = {"outstanding": len(tasks), "workers": 0}
+        lock = threading.Lock()
+
+        def finish():
+            with lock:
+                state["outstanding"] -= 1
+
+        def worker(lease: DeviceLease):
+            while not lease.retired:
+                with lock:
+                    if state["outstanding"] == 0:
+                        break
+                try:
+                    index = pending.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+
+                result = results[index]
+                if not self.health_check(lease):
+                    self._record_failure(lease)
+                    pending.put(index)
+                    continue
+
+                result.attempts += 1
+                result.device_id = lease.info.device_id
+                start = time.time()
+                try:
+                    result.trajectory = lease.runner.run(result.task, max_steps=max_steps) or []
+                    result.error = None
+                except Exception as e:
+                    result.error = str(e)
+                    logger.error(f"DevicePool task {index} failed on {lease.info.device_id}: {e}")
+                result.duration = time.time() - start
+                result.success = bool(result.trajectory) and result.trajectory[-1]["action"].type == ActionType.DONE
+
+                if not result.success and not self.health_check(lease):
+                    # The device dropped mid-task: the failure is not the task's fault
+                    self._record_failure(lease)
+                    if result.attempts < self.max_attempts:
+                        logger.info(f"DevicePool requeue task {index} (attempt {result.attempts}/{self.max_attempts})")
+                        pending.put(index)
+                        continue
+                finish()
+
+            with lock:
+                state["workers"] -= 1
+                last_worker = state["workers"] == 0
+            if last_worker:
+                # Every device is gone, drain whatever is left
+                while True:
+                    try:
+                        index = pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    results[index].error = results[index].error or "No healthy device left"
+                    finish()
+
+        threads = []
+        for lease in self.leases:
+            if lease.retired:
+                continue
+            state["workers"] += 1
+            thread = threading.Thread(target=worker, args=(lease,), name=f"DevicePool-{lease.info.device_id}", daemon=True)
+            threads.append(thread)
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def _record_failure(self, lease: DeviceLease):
+        lease.failures += 1
+        if lease.failures >= self.max_device_failures:
+            lease.retired = True
+            logger.error(f"DevicePool retired device {lease.info.device_id} after {lease.failures} failures")
+
+    def close(self):
+        for lease in self.leases:
+            try:
+                lease.device.close()
+            except Exception:
+                pass
+        self.leases = []
@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 
 class ActionType(Enum):
     TAP = "tap"
@@ -51,6 +51,19 @@ class PerceptionInput:
     width: int
     height: int
     ui_path: str = None
+    # In-memory UI hierarchy (uiautomator XML bytes or a HarmonyOS dump dict), for perceptions with `requires_ui`
+    ui_data: Union[bytes, str, Dict, None] = None
+    # (height, width) bool mask of pixels changed since the previous step, from a delta capture transport
+    changed_mask: Any = None
+    # unimobile.core.frame.Frame of the screenshot: decoded views shared with the rest of the step
+    frame: Any = None
+
+    def get_frame(self):
+        """The step's shared Frame (looked up by `screenshot_path` when not set)"""
+        if self.frame is None:
+            from unimobile.core.frame import frame_for
+            self.frame = frame_for(self.screenshot_path)
+        return self.frame
 
 @dataclass
 class PlanInput:
@@ -115,6 +128,11 @@ class VerifierInput:
     screenshot_before: str
     screenshot_after: str
     action: Action
+    # (height, width) bool mask of pixels changed between the two screenshots, when the device provides it
+    changed_mask: Any = None
+    # Shared Frames of the two screenshots (unimobile.core.frame.Frame); the paths stay authoritative
+    frame_before: Any = None
+    frame_after: Any = None
 
     metadata: Dict[str, Any] = field(default_factory=dict)
 
@@ -1,27 +1,93 @@
 import time
 import os
+import uuid
 import tempfile
 import logging
-from typing import Union, Dict
-from PIL import Image
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Tuple, Union, Dict, Optional
 
 from unimobile.core.interfaces import BaseAgent
+from unimobile.core.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+from unimobile.core.frame import Frame, frame_scope, register_frame
+from unimobile.core.screenshot_store import ScreenshotStore
+from unimobile.core.trajectory import TrajectoryWriter
+from unimobile.core.timeline import StepTimeline
+from unimobile.core.tracing import TRACER
 from unimobile.devices.base import BaseDevice
-from unimobile.core.protocol import ActionType
+from unimobile.devices.capture import CaptureProfile, resize_image, write_bytes
+from unimobile.devices.executor import COMMAND_STATS
+from unimobile.core.protocol import Action, ActionType
+from unimobile.config.timing import TIMING_CONFIG
 
 logger = logging.getLogger(__name__)
 
 class Runner:
-    def __init__(self, agent: BaseAgent, device: BaseDevice):
+    def __init__(self, agent: BaseAgent, device: BaseDevice, in_memory: bool = False, save_dir: str = None, step_timeout: float = None,
+                 task_timeout: float = None,
+                 capture_profile: CaptureProfile = None, pipelined: bool = False, timeline_path: str = None,
+                 screenshot_store: ScreenshotStore = None, trajectory_writer: TrajectoryWriter = None,
+                 trace_dir: str = None):
+        """
+        Args:
+            agent (BaseAgent): agent
+            device (BaseDevice): device
+            in_memory (bool, optional): Capture frames into memory with `device.capture()`.
+                Frames are only materialized in a RAM-backed directory (/dev/shm) for path-based components. Defaults to False.
+            save_dir (str, optional): Screenshot directory, overrides the default. Runners sharing a host need distinct ones. Defaults to None.
+            step_timeout (float, optional): Budget in seconds for one step: capture, perception, verification, the LLM call
+                and execution are all bounded by it, and degrade when it runs low (see TIMING_CONFIG.budget). Defaults to None.
+            task_timeout (float, optional): Wall-clock budget in seconds for the whole task, planning included; step budgets
+                never outlive it. The task ends with a FAIL action when it expires. Defaults to None.
+            capture_profile (CaptureProfile, optional): Resolution/format the agent gets (e.g. 1280px JPEG).
+                Action coordinates are mapped back to physical pixels before execution. Defaults to None.
+            pipelined (bool, optional): Overlap independent stages of a step: knowledge retrieval and the UI hierarchy dump
+                run while the screenshot transfers, verification of the previous action runs alongside perception,
+                and step logging runs on a background thread. Defaults to False.
+            timeline_path (str, optional): Write the per-stage timeline of each run here (Chrome trace format). Defaults to None.
+            screenshot_store (ScreenshotStore, optional): Keep screenshots in a deduplicating, size/age-limited store;
+                trajectories then reference store paths and `save_dir` only holds captures in transit. Defaults to None.
+            trajectory_writer (TrajectoryWriter, optional): Stream step records to disk as they happen; `run` then returns
+                a disk-backed TaskTrajectory instead of keeping the steps in memory. Defaults to None.
+            trace_dir (str, optional): Enable span tracing and write each task's Chrome trace (<task>.trace.json) and
+                per-span latency histograms (<task>.histograms.json) here. Defaults to None.
+        """
         logger.info("========== Initialize Runner ==========")
         self.agent = agent
         self.device = device
+        self.in_memory = in_memory
+        self.step_timeout = step_timeout
+        self.task_timeout = task_timeout
+        self.last_frame: bytes = None
+        self.last_action_at: float = 0.0
+        self.capture_profile = capture_profile
+        # Image pixels per physical pixel of the current step's screenshot
+        self.frame_scale: float = 1.0
+        self._physical_size: Tuple[int, int] = None
+        self.pipelined = pipelined
+        self.timeline_path = timeline_path
+        self.timeline = StepTimeline()
+        self._stages: Optional[ThreadPoolExecutor] = None
+        self._background: Optional[ThreadPoolExecutor] = None
+        self.screenshot_store = screenshot_store
+        self.trajectory_writer = trajectory_writer
+        self.trace_dir = trace_dir
+        if trace_dir:
+            TRACER.enable()
+        self._trace_task: Optional[str] = None
         
         # TODO
-        self.save_dir = os.path.join(os.getcwd(), "temp", "screenshots")
+        if save_dir:
+            self.save_dir = save_dir
+        elif screenshot_store is not None:
+            self.save_dir = os.path.join(screenshot_store.root, "incoming")
+        elif in_memory:
+            ram_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+            self.save_dir = os.path.join(ram_dir, "unimobile", "screenshots")
+        else:
+            self.save_dir = os.path.join(os.getcwd(), "temp", "screenshots")
         
         if not os.path.exists(self.save_dir):
-            os.makedirs(self.save_dir)
+            os.makedirs(self.save_dir, exist_ok=True)
             print(f"📁 [Runner] The screenshot directory has been created: {self.save_dir}")
         else:
             print(f"📁 [Runner] The screenshot will be saved to: {self.save_dir}")
@@ -30,50 +96,189 @@ class Runner:
         logger.info("\n")
 
     def run(self, task_input: Union[str, Dict], max_steps: int = 15):
-        if isinstance(task_input, dict):
-            instruction = task_input.get("instruction", "")
-            self.agent.reset(instruction)
-        else:
-            instruction = task_input
-            self.agent.reset(instruction)
+        task_deadline = Deadline(self.task_timeout)
+        with deadline_scope(deadline=task_deadline):
+            if isinstance(task_input, dict):
+                instruction = task_input.get("instruction", "")
+                self.agent.reset(instruction)
+                if task_input.get("reset"):
+                    # {"reset": {"snapshot": "clean_home", "packages": ["com.android.settings"]}}
+                    method = self.device.reset(**task_input["reset"])
+                    print(f"🔄 [Runner] Device reset ({method})")
+            else:
+                instruction = task_input
+                self.agent.reset(instruction)
             
         print(f"\n🚀 [Runner] Starting Task: {instruction}")
         
-        task_id = int(time.time())
+        # Runners of a DevicePool start in the same second: the suffix keeps screenshot names, pins and traces apart
+        task_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        self.timeline = StepTimeline()
+        if self.pipelined:
+            self._stages = ThreadPoolExecutor(max_workers=3, thread_name_prefix="RunnerStage")
+            self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="RunnerLog")
+        writer = self.trajectory_writer
         trajectory = []
+        if writer is not None:
+            task_key = writer.begin_task(task_id, instruction, device=self.device.serial)
+            record = lambda step_record: writer.append_step(task_key, step_record)
+        else:
+            task_key = task_id
+            record = trajectory.append
+        self._trace_task = task_key
+        try:
+            with TRACER.task_scope(task_key), deadline_scope(deadline=task_deadline), frame_scope():
+                steps, last_action = self._run_steps(task_id, max_steps, record)
+        finally:
+            if self._stages is not None:
+                self._stages.shutdown(wait=True)
+                self._background.shutdown(wait=True)
+                self._stages = self._background = None
+
+        succeeded = last_action is not None and last_action.type == ActionType.DONE
+        if writer is not None:
+            writer.end_task(task_key, succeeded, steps)
+            trajectory = writer.trajectory(task_key)
+            print(f"🗂️ [Runner] Trajectory {task_key} written to {writer.directory}")
+
+        store = self.screenshot_store
+        if store is not None:
+            if store.pin_failed and not succeeded and trajectory:
+                store.pin([record["screenshot_path"] for record in trajectory], f"task_{task_id}")
+            store.evict()
+            logger.info(f"Screenshot store: {store.stats.summary()}")
+
+        logger.info(f"Device command time by category:\n{COMMAND_STATS.summary()}")
+        if getattr(self.device, "watchdog", None) is not None:
+            logger.info(f"Device connection: {self.device.watchdog.stats.summary()}")
+        if getattr(self.device, "delta", None) is not None:
+            logger.info(f"Delta capture: {self.device.delta.stats.summary()}")
+        logger.info(f"Step timeline:\n{self.timeline.summary()}")
+        if self.timeline_path:
+            print(f"📈 [Runner] Step timeline written to {self.timeline.export(self.timeline_path)}")
+        if self.trace_dir:
+            logger.info(f"Span latencies:\n{TRACER.summary(task_key)}")
+            TRACER.export_histograms(os.path.join(self.trace_dir, f"{task_key}.histograms.json"), task_key)
+            trace_path = TRACER.export(os.path.join(self.trace_dir, f"{task_key}.trace.json"), task_key)
+            TRACER.clear(task_key)
+            print(f"📈 [Runner] Span trace written to {trace_path}")
+        print("\n🎉 [Runner] Task Finish！")
+        return trajectory
+
+    def _run_steps(self, task_id: str, max_steps: int, record) -> Tuple[int, Optional[Action]]:
+        """Run the step loop, handing each step record to `record`; returns (steps recorded, last action)"""
+        recorded, action = 0, None
+        # Consecutive re-runs of a step whose capture failed on a lost transport: a flapping link must not spin forever
+        capture_retries = 0
+        self.last_action_at = time.monotonic()
         
         step = 0
         while step < max_steps:
+            task_deadline = current_deadline()
+            if task_deadline is not None and task_deadline.expired:
+                self._log_step(step, f"⏰ [Runner] Task budget of {task_deadline.timeout}s exhausted after {step} step(s)")
+                action = Action(type=ActionType.FAIL, thought="Task deadline exceeded")
+                break
+            if not self._wait_for_connection():
+                break
             step += 1
             logger.info(f"--- Step {step}/{max_steps} ---")
             print(f"\n--- Step {step}/{max_steps} ---")
             
             timestamp = int(time.time() * 1000)
-            filename = f"task_{task_id}_step_{step}.png"
+            extension = self.capture_profile.extension if self.capture_profile else ".png"
+            filename = f"task_{task_id}_step_{step}{extension}"
             screenshot_path = os.path.join(self.save_dir, filename)
             
-            if step > 1:
+            # Knowledge retrieval depends only on the task: start it before the screen is even captured
+            knowledge = None
+            if self.pipelined and hasattr(self.agent, "prefetch_knowledge"):
+                knowledge = self._submit(step, "knowledge", self.agent.prefetch_knowledge, deadline=current_deadline())
+
+            grabber = getattr(self.device, "frame_grabber", None)
+            if step > 1 and grabber is None and not self._adaptive_settle():
                 print("[Runner] ⏳ Wait for the screen to stabilize...")
-                time.sleep(1.5)
+                with self.timeline.stage(step, "settle"):
+                    time.sleep(1.5)
 
-            try:
-                self.device.screenshot(path=screenshot_path)
-                img = Image.open(screenshot_path)
-                width = img.width
-                height = img.height
-                print(f"📸 [Device] The screenshot has been saved.: {screenshot_path}")
-            except Exception as e:
-                logger.error(f"Screenshot Failed: {e}")
-                break
+            step_deadline = Deadline(self.step_timeout, parent=current_deadline())
+            hierarchy = None
+            if self.pipelined:
+                hierarchy = self._submit(step, "hierarchy", self._dump_hierarchy, deadline=step_deadline)
+            with deadline_scope(deadline=step_deadline), self.timeline.stage(step, "capture"):
+                try:
+                    if grabber is not None:
+                        # The capture thread has been sampling during the action; take the first settled frame
+                        captured = grabber.wait_for_stable(after=self.last_action_at)
+                        if captured is None:
+                            raise RuntimeError("Frame grabber has no frame")
+                        if self.capture_profile:
+                            width, height = self._save_profiled_frame(captured.bgr(), screenshot_path)
+                            frame = Frame.from_path(screenshot_path)
+                        else:
+                            captured.save(screenshot_path)
+                            width, height = captured.width, captured.height
+                            frame = Frame.from_array(captured.image, screenshot_path, color=captured.color)
+                        print(f"📸 [Device] Stable frame taken from the frame grabber: {screenshot_path}")
+                    elif self.in_memory:
+                        if self.capture_profile:
+                            self.last_frame = self.device.capture_profiled(self.capture_profile)
+                            if self.capture_profile.format == "raw":
+                                self.last_frame = self.capture_profile.encode(self.last_frame)
+                        else:
+                            self.last_frame = self.device.capture()
+                        if self.screenshot_store is not None:
+                            screenshot_path = self.screenshot_store.put(self.last_frame, extension)
+                        else:
+                            write_bytes(screenshot_path, self.last_frame)
+                        frame = Frame.from_bytes(self.last_frame, screenshot_path)
+                        width, height = frame.size
+                        print(f"📸 [Device] The screenshot has been captured in memory: {screenshot_path}")
+                    else:
+                        self.device.screenshot(path=screenshot_path, profile=self.capture_profile)
+                        frame = Frame.from_path(screenshot_path)
+                        width, height = frame.size
+                        print(f"📸 [Device] The screenshot has been saved.: {screenshot_path}")
+                    if self.screenshot_store is not None and not self.in_memory:
+                        # Identical frames collapse onto one stored file; the capture in save_dir is consumed
+                        screenshot_path = frame.path = self.screenshot_store.put_file(screenshot_path)
+                    # Perception, verifier and LLM find the decoded frame by its path
+                    register_frame(frame)
+                    self.frame_scale = width / self._physical_width()
+                    ui_data = hierarchy.result() if hierarchy is not None else self._dump_hierarchy()
+                    changed_mask = self._take_changed_mask(width, height)
+                    capture_retries = 0
+                except Exception as e:
+                    watchdog = getattr(self.device, "watchdog", None)
+                    if (watchdog is not None and capture_retries < TIMING_CONFIG.connection.max_capture_retries
+                            and not step_deadline.expired and not watchdog.check()):
+                        # Transport dropped: pause until it is back instead of burning the step
+                        capture_retries += 1
+                        logger.warning(f"Screenshot failed on a disconnected device, step {step} will be retried "
+                                       f"({capture_retries}/{TIMING_CONFIG.connection.max_capture_retries}): {e}")
+                        step -= 1
+                        continue
+                    logger.error(f"Screenshot Failed: {e}")
+                    if step_deadline.expired:
+                        action = Action(type=ActionType.FAIL, thought=f"Deadline exceeded during capture: {e}")
+                    break
             
             try:
-                action = self.agent.step(screenshot_path, width, height)
-                print(f"🧠 [Agent] action is: {action}")
+                extra = {}
+                if ui_data is not None:
+                    extra["ui_data"] = ui_data
+                if changed_mask is not None:
+                    extra["changed_mask"] = changed_mask
+                with deadline_scope(deadline=step_deadline):
+                    action = self._agent_step(step, screenshot_path, width, height, extra, knowledge)
+            except DeadlineExceeded as e:
+                logger.warning(f"Agent ran out of budget: {e}")
+                action = Action(type=ActionType.FAIL, thought=str(e))
             except Exception as e:
                 logger.error(f"Agent Execute Failed: {e}")
                 break
 
-            print(f"🧠 [Agent]: {action.type.value} -> params: {action.params}")
+            self._log_step(step, f"🧠 [Agent] action is: {action}", f"🧠 [Agent]: {action.type.value} -> params: {action.params}")
             
             step_record = {
                 "step": step,
@@ -81,32 +286,151 @@ class Runner:
                 "action": action,
                 "thought": action.thought
             }
-            trajectory.append(step_record)
+            record(step_record)
+            recorded += 1
 
             if action.type == ActionType.DONE:
-                print("✅ [Runner] The Agent believes that the task has been completed！")
+                self._log_step(step, "✅ [Runner] The Agent believes that the task has been completed！")
                 break
             elif action.type == ActionType.FAIL:
-                print("❌ [Runner] Agent give up task (Fail)。")
+                self._log_step(step, "❌ [Runner] Agent give up task (Fail)。")
                 break
             elif action.type == ActionType.WAIT:
                 print("⏳ [Runner] Agent request to wait...")
-                time.sleep(2)
+                with self.timeline.stage(step, "wait"):
+                    time.sleep(2)
                 continue
 
-            self._execute_on_device(action)
-            time.sleep(0.5)
-            
-        print("\n🎉 [Runner] Task Finish！")
-        return trajectory
+            with deadline_scope(deadline=step_deadline), self.timeline.stage(step, "execute"):
+                self._execute_on_device(action)
+            self.last_action_at = time.monotonic()
+            if getattr(self.device, "frame_grabber", None) is None and not self._adaptive_settle():
+                with self.timeline.stage(step, "settle"):
+                    time.sleep(0.5)
+
+        return recorded, action
+
+    def _submit(self, step: int, stage: str, fn, *args, deadline: Deadline = None) -> Future:
+        """Run `fn` on the stage pool, timed on the timeline; deadlines and the trace task are per-thread, so they are re-installed"""
+        task = self._trace_task
+        def run():
+            with TRACER.task_scope(task), self.timeline.stage(step, stage), deadline_scope(deadline=deadline):
+                return fn(*args)
+        return self._stages.submit(run)
+
+    def _agent_step(self, step: int, screenshot_path: str, width: int, height: int, extra: Dict,
+                    knowledge: Future = None) -> Action:
+        staged = all(hasattr(self.agent, name) for name in ("verify_last", "perceive", "decide"))
+        if not self.pipelined or not staged:
+            with self.timeline.stage(step, "agent"):
+                return self.agent.step(screenshot_path, width, height, **extra)
+
+        ui_data, changed_mask = extra.get("ui_data"), extra.get("changed_mask")
+        # Perceive with the current strategy while the previous action is verified. Verification may
+        # switch strategies; the speculative perception is then discarded and redone with the new one.
+        strategy_idx = self.agent.state.current_strategy_idx
+        verification = self._submit(step, "verify", self.agent.verify_last, screenshot_path, changed_mask,
+                                    deadline=current_deadline())
+        with self.timeline.stage(step, "perceive"):
+            perception_result, used_idx = self.agent.perceive(screenshot_path, width, height, ui_data, changed_mask,
+                                                              strategy_idx=strategy_idx)
+        verification.result()
+        if self.agent.state.current_strategy_idx != strategy_idx:
+            logger.info("Verifier switched the perception strategy, perceiving again")
+            with self.timeline.stage(step, "perceive"):
+                perception_result, used_idx = self.agent.perceive(screenshot_path, width, height, ui_data, changed_mask)
+        self.agent.state.current_strategy_idx = used_idx
+        if isinstance(perception_result, Action):
+            return perception_result
+
+        if knowledge is not None:
+            try:
+                knowledge.result()
+            except Exception as e:
+                # decide() loads it itself when the prefetch did not complete
+                logger.warning(f"Knowledge prefetch failed: {e}")
+        with self.timeline.stage(step, "decide"):
+            return self.agent.decide(screenshot_path, perception_result)
+
+    def _log_step(self, step: int, *lines: str):
+        """Step output, in order on the background thread when pipelined"""
+        task = self._trace_task
+        def log():
+            with TRACER.task_scope(task), self.timeline.stage(step, "log"):
+                for line in lines:
+                    print(line)
+        if self._background is not None:
+            self._background.submit(log)
+        else:
+            log()
+
+    def _wait_for_connection(self) -> bool:
+        """Block while the device watchdog reports the transport as lost; False if it does not come back"""
+        watchdog = getattr(self.device, "watchdog", None)
+        if watchdog is None or watchdog.connected:
+            return True
+
+        timeout = TIMING_CONFIG.connection.reconnect_timeout
+        deadline = current_deadline()
+        if deadline is not None:
+            # Waiting past the task budget would only end in a FAIL anyway
+            timeout = deadline.clamp(timeout)
+        print(f"⏸️ [Runner] Device disconnected, pausing for up to {timeout:.0f}s...")
+        if watchdog.wait_connected(timeout):
+            print(f"▶️ [Runner] Device reconnected after {watchdog.stats.last_downtime:.1f}s, resuming")
+            return True
+        logger.error(f"Device did not reconnect within {timeout:.0f}s, stopping the task")
+        return False
+
+    def _dump_hierarchy(self):
+        """The UI hierarchy, fetched only when the agent's current perception uses it"""
+        if not getattr(self.agent, "requires_ui", False):
+            return None
+        try:
+            return self.device.dump_hierarchy()
+        except Exception as e:
+            logger.warning(f"UI hierarchy dump failed, perceiving from pixels only: {e}")
+            return None
+
+    def _take_changed_mask(self, width: int, height: int):
+        """Pixels changed since the previous step, when the device has a delta transport and the agent takes the mask"""
+        delta = getattr(self.device, "delta", None)
+        if delta is None:
+            return None
+        mask = delta.take_mask(width, height)
+        if not getattr(self.agent, "uses_changed_mask", False):
+            return None
+        return mask
+
+    def _physical_width(self) -> int:
+        if self._physical_size is None:
+            w, h = (self.device.w, self.device.h) if self.device.w and self.device.h else self.device.display_size()
+            self._physical_size = (w, h)
+        return self._physical_size[0]
+
+    def _save_profiled_frame(self, image, path: str) -> Tuple[int, int]:
+        h, w = image.shape[:2]
+        scale = self.capture_profile.scale_for(w, h)
+        image = resize_image(image, max(1, round(w * scale)), max(1, round(h * scale)))
+        write_bytes(path, self.capture_profile.encode(image))
+        return image.shape[1], image.shape[0]
+
+    def _to_physical(self, x: float, y: float) -> Tuple[int, int]:
+        """Screenshot coordinates (what the agent saw) -> device pixels"""
+        if self.frame_scale == 1.0:
+            return int(x), int(y)
+        return int(round(x / self.frame_scale)), int(round(y / self.frame_scale))
+
+    def _adaptive_settle(self) -> bool:
+        """The device action methods already return once the UI has settled"""
+        return getattr(self.device, "settle_detector", None) is not None or getattr(self.device, "settles_on_return", False)
 
     def _execute_on_device(self, action):
         try:
             if action.type == ActionType.TAP:
                 # {"x": 100, "y": 200}
                 # tap(x, y)
-                x = int(action.params.get('x', 0))
-                y = int(action.params.get('y', 0))
+                x, y = self._to_physical(float(action.params.get('x', 0)), float(action.params.get('y', 0)))
                 self.device.tap(x, y)
 
             elif action.type == ActionType.TEXT:
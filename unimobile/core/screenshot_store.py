@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set
+
+logger = logging.getLogger(__name__)
+
+OBJECTS_DIR = "objects"
+PINS_FILE = "pins.json"
+
+
+@dataclass
+class StoreStats:
+    objects: int = 0
+    bytes: int = 0
+    pinned: int = 0
+    deduplicated: int = 0
+    evicted: int = 0
+
+    def summary(self) -> str:
+        return (f"objects={self.objects} size={self.bytes / 1e6:.1f}MB pinned={self.pinned} "
+                f"deduplicated={self.deduplicated} evicted={self.evicted}")
+
+
+class ScreenshotStore:
+    """
+    Content-addressed screenshot storage shared by Runners.
+
+    Screenshots are stored once under objects/<2 hex>/<sha1><ext>; an identical
+    frame (WAIT, a tap that changed nothing) maps to the existing file, so
+    trajectories hold references instead of copies. Files a perception
+    derives from a screenshot (`<sha1>_som.png`, `<sha1>_grid.png`) live next
+    to it and are evicted with it.
+
+    The modification time of an object is its last use: every put touches
+    it, and eviction removes the least recently used unpinned objects until
+    the store is under `max_bytes`, as well as anything older than `max_age`.
+    Pinned objects (e.g. the screenshots of failed tasks) are never evicted.
+
+    Example:
+        store = ScreenshotStore("temp/store", max_bytes=2e9, max_age=7 * 86400)
+        runner = Runner(agent, device, screenshot_store=store)
+        ...
+        store.unpin("task_1717171717-3f2a9c1e")
+    """
+    def __init__(self, root: str, max_bytes: float = 2e9, max_age: float = 7 * 86400, evict_every: int = 50,
+                 pin_failed: bool = True):
+        """
+        Args:
+            root (str): store directory
+            max_bytes (float, optional): size limit in bytes (None: unlimited). Defaults to 2 GB.
+            max_age (float, optional): seconds since last use after which an unpinned object is dropped (None: never). Defaults to 7 days.
+            evict_every (int, optional): run eviction every N puts. Defaults to 50.
+            pin_failed (bool, optional): Runners pin the screenshots of tasks that did not finish with DONE. Defaults to True.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self.pin_failed = pin_failed
+        self.stats = StoreStats()
+        self._puts = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, OBJECTS_DIR), exist_ok=True)
+        self._pins: Dict[str, List[str]] = self._load_pins()
+
+    @staticmethod
+    def digest_of(path: str) -> str:
+        """The content hash a store path is named after"""
+        return os.path.basename(path)[:40]
+
+    def path_for(self, digest: str, ext: str = ".png") -> str:
+        return os.path.join(self.root, OBJECTS_DIR, digest[:2], digest + ext)
+
+    def __contains__(self, digest: str) -> bool:
+        directory = os.path.join(self.root, OBJECTS_DIR, digest[:2])
+        return os.path.isdir(directory) and any(name.startswith(digest) for name in os.listdir(directory))
+
+    def put(self, data: bytes, ext: str = ".png") -> str:
+        """Store encoded image bytes, returning the path of the (possibly pre-existing) object"""
+        path = self.path_for(hashlib.sha1(data).hexdigest(), ext)
+        if self._touch(path):
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._after_put()
+        return path
+
+    def put_file(self, source: str) -> str:
+        """Move an already written screenshot into the store (the source is consumed)"""
+        with open(source, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        path = self.path_for(digest, os.path.splitext(source)[1] or ".png")
+        if self._touch(path):
+            os.remove(source)
+            return path
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # The capture directory may be on another filesystem (/dev/shm)
+        shutil.move(source, path)
+        self._after_put()
+        return path
+
+    def _touch(self, path: str) -> bool:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self.stats.deduplicated += 1
+        return True
+
+    def _after_put(self):
+        with self._lock:
+            self._puts += 1
+            due = self.evict_every and self._puts % self.evict_every == 0
+        if due:
+            self.evict()
+
+    # ---------------------------------------------------------------- pins
+
+    def pin(self, paths: Iterable[str], label: str):
+        """Keep these screenshots (store paths or digests) until `unpin(label)`"""
+        digests = sorted({self.digest_of(p) for p in paths if p})
+        with self._lock:
+            self._pins[label] = sorted(set(self._pins.get(label, [])) | set(digests))
+            self._save_pins()
+        logger.info(f"ScreenshotStore: pinned {len(digests)} screenshots as {label}")
+
+    def unpin(self, label: str):
+        with self._lock:
+            if self._pins.pop(label, None) is not None:
+                self._save_pins()
+
+    def pinned(self) -> Set[str]:
+        with self._lock:
+            return {digest for digests in self._pins.values() for digest in digests}
+
+    def _load_pins(self) -> Dict[str, List[str]]:
+        try:
+            with open(os.path.join(self.root, PINS_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"ScreenshotStore: unreadable pins file, starting without pins: {e}")
+            return {}
+
+    def _save_pins(self):
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._pins, f, indent=2)
+        os.replace(tmp, os.path.join(self.root, PINS_FILE))
+
+    # ------------------------------------------------------------ eviction
+
+    def evict(self) -> int:
+        """Apply the age and size limits; returns the number of objects removed"""
+        now = time.time()
+        pinned = self.pinned()
+        objects: Dict[str, dict] = {}
+        for bucket in os.scandir(os.path.join(self.root, OBJECTS_DIR)):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                # A screenshot and its derivatives form one object, last used when any of them was
+                obj = objects.setdefault(self.digest_of(entry.name), {"files": [], "bytes": 0, "used": 0.0})
+                obj["files"].append(entry.path)
+                obj["bytes"] += stat.st_size
+                obj["used"] = max(obj["used"], stat.st_mtime)
+
+        total = sum(obj["bytes"] for obj in objects.values())
+        removed = 0
+        for digest, obj in sorted(objects.items(), key=lambda kv: kv[1]["used"]):
+            if digest in pinned:
+                continue
+            expired = self.max_age is not None and now - obj["used"] > self.max_age
+            oversize = self.max_bytes is not None and total > self.max_bytes
+            if not (expired or oversize):
+                # Sorted oldest first: nothing later is expired either
+                break
+            for path in obj["files"]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= obj["bytes"]
+            removed += 1
+
+        with self._lock:
+            self.stats.objects = len(objects) - removed
+            self.stats.bytes = total
+            self.stats.pinned = len(pinned & objects.keys())
+            self.stats.evicted += removed
+        if removed:
+            logger.info(f"ScreenshotStore: evicted {removed} screenshots, {total / 1e6:.1f}MB left")
+        return removed
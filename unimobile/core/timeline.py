@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List
+
+from unimobile.core.tracing import span
+
+
+@dataclass
+class StageEvent:
+    step: int
+    stage: str
+    thread: str
+    start: float        # seconds since the timeline origin
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class StepTimeline:
+    """
+    When each Runner stage ran, per step and per thread.
+
+    `export()` writes the Chrome trace-event format: open the file in
+    chrome://tracing or https://ui.perfetto.dev to see which stages overlap.
+
+    Stages are also recorded as "runner.<stage>" spans when tracing is
+    enabled (see unimobile.core.tracing).
+
+    Example:
+        with timeline.stage(step, "capture"):
+            ...
+    """
+    def __init__(self):
+        self.origin = time.monotonic()
+        self.events: List[StageEvent] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, step: int, name: str):
+        start = time.monotonic()
+        try:
+            with span(f"runner.{name}", "runner", step=step):
+                yield
+        finally:
+            self.record(step, name, start, time.monotonic())
+
+    def record(self, step: int, name: str, start: float, end: float):
+        event = StageEvent(step, name, threading.current_thread().name, start - self.origin, end - self.origin)
+        with self._lock:
+            self.events.append(event)
+
+    def totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for event in self.events:
+            totals[event.stage] = totals.get(event.stage, 0.0) + event.duration
+        return totals
+
+    def summary(self) -> str:
+        if not self.events:
+            return "(no stages recorded)"
+        wall = max(e.end for e in self.events) - min(e.start for e in self.events)
+        busy = sum(e.duration for e in self.events)
+        lines = [f"{stage:<12} {total:8.2f}s" for stage, total in sorted(self.totals().items(), key=lambda kv: -kv[1])]
+        lines.append(f"{'wall':<12} {wall:8.2f}s (stage time {busy:.2f}s, overlap x{busy / wall if wall else 1.0:.2f})")
+        return "\n".join(lines)
+
+    def export(self, path: str) -> str:
+        threads = {name: tid for tid, name in enumerate(sorted({e.thread for e in self.events}), start=1)}
+        trace = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                 for name, tid in threads.items()]
+        trace += [{"name": e.stage, "cat": "step", "ph": "X", "pid": 1, "tid": threads[e.thread],
+                   "ts": round(e.start * 1e6), "dur": round(e.duration * 1e6), "args": {"step": e.step}}
+                  for e in self.events]
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return path
@@ -0,0 +1,246 @@
+import os
+import json
+import time
+import bisect
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKET_BOUNDS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    thread: str
+    task: Optional[str]
+    start: float        # seconds since the tracer origin
+    end: float
+    args: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class _NullSpan:
+    """Returned by a disabled tracer: entering, exiting and tagging it cost nothing"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.category, self.start, time.monotonic(), self.args)
+        return False
+
+    def set(self, **args):
+        """Attach arguments known only inside the span (e.g. the strategy that was used)"""
+        self.args.update(args)
+
+
+class Histogram:
+    """Latency distribution of one span name"""
+    def __init__(self, name: str):
+        self.name = name
+        self.durations: List[float] = []
+
+    def add(self, seconds: float):
+        bisect.insort(self.durations, seconds)
+
+    @property
+    def count(self) -> int:
+        return len(self.durations)
+
+    @property
+    def total(self) -> float:
+        return sum(self.durations)
+
+    def percentile(self, p: float) -> float:
+        if not self.durations:
+            return 0.0
+        return self.durations[min(len(self.durations) - 1, int(p / 100 * len(self.durations)))]
+
+    def buckets(self) -> Dict[str, int]:
+        counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        for seconds in self.durations:
+            counts[bisect.bisect_left(BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+        labels = [f"<={bound}ms" for bound in BUCKET_BOUNDS_MS] + [f">{BUCKET_BOUNDS_MS[-1]}ms"]
+        return dict(zip(labels, counts))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 3),
+            "p90_ms": round(self.percentile(90) * 1000, 3),
+            "p99_ms": round(self.percentile(99) * 1000, 3),
+            "max_ms": round(self.durations[-1] * 1000, 3) if self.durations else 0.0,
+            "buckets": self.buckets(),
+        }
+
+
+class Tracer:
+    """
+    Span tracing of the agent loop: Runner stages, agent phases, device
+    operations and LLM calls.
+
+    Disabled by default (set UNIMOBILE_TRACE=1 or call `enable()`); a
+    disabled tracer hands out one shared no-op span, so instrumented code
+    costs a flag check. Spans are attributed to the task installed with
+    `task_scope` in the recording thread, and only the last `max_spans`
+    are kept.
+
+    Example:
+        with span("agent.think", "agent", step=3):
+            ...
+        TRACER.export("temp/traces/task.trace.json", task="1717171717")
+        print(TRACER.summary(task="1717171717"))
+    """
+    def __init__(self, enabled: bool = False, max_spans: int = 200000):
+        self.enabled = enabled
+        self.origin = time.monotonic()
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name: str, category: str = "", **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return _ActiveSpan(self, name, category, args)
+
+    def record(self, name: str, category: str, start: float, end: float, args: Dict[str, Any] = None):
+        span = Span(name, category, threading.current_thread().name, self.current_task(),
+                    start - self.origin, end - self.origin, args or {})
+        with self._lock:
+            self._spans.append(span)
+
+    def current_task(self) -> Optional[str]:
+        return getattr(self._local, "task", None)
+
+    @contextmanager
+    def task_scope(self, task: Optional[str]):
+        """Attribute the spans recorded in this thread to `task` (thread pools re-install it per job)"""
+        previous = self.current_task()
+        self._local.task = task
+        try:
+            yield
+        finally:
+            self._local.task = previous
+
+    def spans(self, task: str = None) -> List[Span]:
+        with self._lock:
+            return [s for s in self._spans if task is None or s.task == task]
+
+    def clear(self, task: str = None):
+        """Drop the spans of `task` (all spans when None) once they have been exported"""
+        with self._lock:
+            if task is None:
+                self._spans.clear()
+            else:
+                kept = [s for s in self._spans if s.task != task]
+                self._spans.clear()
+                self._spans.extend(kept)
+
+    def histograms(self, task: str = None) -> Dict[str, Histogram]:
+        histograms: Dict[str, Histogram] = {}
+        for span in self.spans(task):
+            histograms.setdefault(span.name, Histogram(span.name)).add(span.duration)
+        return histograms
+
+    def summary(self, task: str = None) -> str:
+        histograms = self.histograms(task)
+        if not histograms:
+            return "(no spans recorded)"
+        lines = [f"{'span':<28} {'count':>6} {'total':>9} {'p50':>8} {'p90':>8} {'max':>8}"]
+        for name, h in sorted(histograms.items(), key=lambda kv: -kv[1].total):
+            lines.append(f"{name:<28} {h.count:>6} {h.total:>8.2f}s {h.percentile(50) * 1000:>6.0f}ms "
+                         f"{h.percentile(90) * 1000:>6.0f}ms {h.durations[-1] * 1000:>6.0f}ms")
+        return "\n".join(lines)
+
+    def export(self, path: str, task: str = None) -> str:
+        """Write the spans as Chrome trace events (chrome://tracing, https://ui.perfetto.dev)"""
+        spans = self.spans(task)
+        threads = {name: tid for tid, name in enumerate(sorted({s.thread for s in spans}), start=1)}
+        trace = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                 for name, tid in threads.items()]
+        trace += [{"name": s.name, "cat": s.category or "default", "ph": "X", "pid": 1, "tid": threads[s.thread],
+                   "ts": round(s.start * 1e6), "dur": round(s.duration * 1e6), "args": s.args}
+                  for s in spans]
+        _write_json(path, {"traceEvents": trace, "displayTimeUnit": "ms"})
+        return path
+
+    def export_histograms(self, path: str, task: str = None) -> str:
+        _write_json(path, {name: h.to_dict() for name, h in sorted(self.histograms(task).items())})
+        return path
+
+
+def _write_json(path: str, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, default=str)
+
+
+TRACER = Tracer(enabled=os.getenv("UNIMOBILE_TRACE", "").lower() in ("1", "true", "yes"))
+
+
+def span(name: str, category: str = "", **args):
+    """A span on the global tracer (a shared no-op when tracing is disabled)"""
+    if not TRACER.enabled:
+        return NULL_SPAN
+    return _ActiveSpan(TRACER, name, category, args)
+
+
+def traced(name: str = None, category: str = ""):
+    """Decorator recording every call of the function as a span"""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            with _ActiveSpan(TRACER, label, category, {}):
+                return fn(*args, **kwargs)
+        wrapper.__traced__ = True
+        return wrapper
+    return decorate
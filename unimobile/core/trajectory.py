@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from unimobile.core.protocol import Action, ActionType
+
+logger = logging.getLogger(__name__)
+
+DATA_FILE = "trajectories.jsonl"
+INDEX_FILE = "trajectories.idx"
+
+TASK, STEP, END = "task", "step", "end"
+
+
+def action_to_dict(action: Action) -> Dict[str, Any]:
+    return {"type": action.type.value, "params": action.params, "thought": action.thought,
+            "metadata": action.metadata}
+
+
+def action_from_dict(data: Dict[str, Any]) -> Action:
+    return Action(type=ActionType(data["type"]), params=data.get("params") or {},
+                  thought=data.get("thought"), metadata=data.get("metadata") or {})
+
+
+def _to_record(step_record: Dict[str, Any]) -> Dict[str, Any]:
+    record = dict(step_record)
+    if isinstance(record.get("action"), Action):
+        record["action"] = action_to_dict(record["action"])
+    return record
+
+
+def _from_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    record = dict(record)
+    if isinstance(record.get("action"), dict):
+        record["action"] = action_from_dict(record["action"])
+    return record
+
+
+def _truncate_torn_tail(path: str):
+    """Cut a partially written last line (crash mid-write), so appends start on a fresh line"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            size = min(65536, pos)
+            f.seek(pos - size)
+            newline = f.read(size).rfind(b"\n")
+            if newline >= 0:
+                pos = pos - size + newline + 1
+                break
+            pos -= size
+        if pos < end:
+            logger.warning(f"TrajectoryWriter: dropping {end - pos} bytes of a partially written record in {path}")
+            f.truncate(pos)
+
+
+class TrajectoryWriter:
+    """
+    Append-only trajectory sink: one JSON line per step in trajectories.jsonl,
+    plus trajectories.idx mapping (task, step) to the byte range of the line.
+
+    Records are serialized on the caller's thread and written by a background
+    thread, which flushes every `flush_interval` seconds; `flush()` blocks
+    until everything queued is on disk. Several Runners may share a writer.
+    Opening a directory after a crash cuts a partially written last record
+    and indexes records the index is missing before appending.
+
+    Example:
+        writer = TrajectoryWriter("temp/trajectories")
+        Runner(agent, device, trajectory_writer=writer).run("Open settings")
+        TrajectoryReader("temp/trajectories").step(task_id, 3)
+    """
+    def __init__(self, directory: str, flush_interval: float = 1.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+        for name in (DATA_FILE, INDEX_FILE):
+            _truncate_torn_tail(os.path.join(directory, name))
+        self.reader = TrajectoryReader(directory)
+        self._data = open(os.path.join(directory, DATA_FILE), "ab")
+        self._index = open(os.path.join(directory, INDEX_FILE), "ab")
+        # Records the index missed (crash, deleted index) must be indexed before new ones follow them
+        for entry in self.reader._unindexed:
+            self._index.write(json.dumps(entry).encode("utf-8") + b"\n")
+        self._index.flush()
+        self.reader._unindexed = []
+        self._queue: "queue.Queue[Optional[Tuple[str, str, Any, bytes]]]" = queue.Queue()
+        self._tasks = set(self.reader.tasks())
+        self._tasks_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, name="TrajectoryWriter", daemon=True)
+        self._thread.start()
+
+    def begin_task(self, task_id: Any, instruction: str, **info) -> str:
+        """Start a task and return its key (task_id, made unique within this directory)"""
+        key = str(task_id)
+        with self._tasks_lock:
+            suffix = 1
+            while key in self._tasks:
+                suffix += 1
+                key = f"{task_id}-{suffix}"
+            self._tasks.add(key)
+        self._put(key, TASK, 0, {"instruction": instruction, "started": time.time(), **info})
+        return key
+
+    def append_step(self, task: str, step_record: Dict[str, Any]):
+        self._put(task, STEP, step_record["step"], _to_record(step_record))
+
+    def end_task(self, task: str, success: bool, steps: int, **info):
+        self._put(task, END, 0, {"success": success, "steps": steps, "ended": time.time(), **info})
+
+    def _put(self, task: str, kind: str, step: int, record: Dict[str, Any]):
+        line = json.dumps({"task": task, "kind": kind, **record}, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        self._queue.put((task, kind, step, line))
+
+    def flush(self):
+        """Block until every queued record has been written and flushed"""
+        done = threading.Event()
+        self._queue.put(("", "flush", done, b""))
+        done.wait()
+
+    def trajectory(self, task: str) -> "TaskTrajectory":
+        """The steps of `task` written so far, read back from disk"""
+        self.flush()
+        self.reader.refresh()
+        return self.reader.trajectory(task)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._data.close()
+        self._index.close()
+
+    def _loop(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                self._flush_files()
+                return
+            if item and item[1] == "flush":
+                self._flush_files()
+                item[2].set()
+                continue
+            if item:
+                task, kind, step, line = item
+                try:
+                    offset = self._data.tell()
+                    self._data.write(line)
+                    index = {"task": task, "kind": kind, "step": step, "offset": offset, "length": len(line)}
+                    self._index.write(json.dumps(index).encode("utf-8") + b"\n")
+                except OSError as e:
+                    logger.error(f"TrajectoryWriter: record of task {task} lost: {e}")
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush_files()
+                last_flush = time.monotonic()
+
+    def _flush_files(self):
+        self._data.flush()
+        self._index.flush()
+
+
+class TrajectoryReader:
+    """
+    Random access to trajectories written by TrajectoryWriter.
+
+    The index is rebuilt from the data file when it is missing or stale
+    (e.g. a crash between writing a record and its index entry).
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.data_path = os.path.join(directory, DATA_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._entries: Dict[Tuple[str, str, int], Tuple[int, int]] = {}
+        self._order: Dict[str, List[int]] = {}
+        self._index_pos = 0
+        self._data_end = 0
+        # Entries recovered by scanning the data file, for TrajectoryWriter to index
+        self._unindexed: List[Dict[str, Any]] = []
+        # A writer's reader is refreshed by every Runner sharing the writer
+        self._lock = threading.RLock()
+        self.refresh()
+
+    def refresh(self):
+        """Pick up records appended since the last refresh"""
+        with self._lock:
+            self._load_index()
+            size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+            if self._data_end < size:
+                self._scan(self._data_end)
+
+    def _add(self, task: str, kind: str, step: int, offset: int, length: int):
+        self._entries[(task, kind, step)] = (offset, length)
+        steps = self._order.setdefault(task, [])
+        if kind == STEP and step not in steps:
+            steps.append(step)
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self._index_pos += len(line)
+                self._add(entry["task"], entry["kind"], entry["step"], entry["offset"], entry["length"])
+                self._data_end = max(self._data_end, entry["offset"] + entry["length"])
+
+    def _scan(self, start: int):
+        with open(self.data_path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break           # partially written record
+                try:
+                    record = json.loads(line)
+                    step = record.get("step", 0) if record["kind"] == STEP else 0
+                    self._add(record["task"], record["kind"], step, offset, len(line))
+                    self._unindexed.append({"task": record["task"], "kind": record["kind"], "step": step,
+                                            "offset": offset, "length": len(line)})
+                except (ValueError, KeyError):
+                    pass
+                offset += len(line)
+            self._data_end = offset
+
+    def _read(self, offset: int, length: int) -> Dict[str, Any]:
+        with open(self.data_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def tasks(self) -> List[str]:
+        with self._lock:
+            return list(self._order)
+
+    def steps(self, task: str) -> List[int]:
+        with self._lock:
+            return list(self._order.get(task, []))
+
+    def step(self, task: Any, step: int) -> Dict[str, Any]:
+        """One step record, with its action as an Action"""
+        with self._lock:
+            offset, length = self._entries[(str(task), STEP, step)]
+        return _from_record(self._read(offset, length))
+
+    def iter_steps(self, task: Any) -> Iterator[Dict[str, Any]]:
+        for step in self.steps(str(task)):
+            yield self.step(task, step)
+
+    def task_info(self, task: Any) -> Dict[str, Any]:
+        """The task header (instruction, start time...) merged with its end record when written"""
+        info = {}
+        for kind in (TASK, END):
+            with self._lock:
+                entry = self._entries.get((str(task), kind, 0))
+            if entry is not None:
+                info.update(self._read(*entry))
+        return info
+
+    def trajectory(self, task: Any) -> "TaskTrajectory":
+        return TaskTrajectory(self, str(task))
+
+
+class TaskTrajectory(Sequence):
+    """
+    The steps of one task, read from disk on access.
+
+    Behaves like the list Runner.run used to return (`len`, indexing,
+    iteration over step dicts) without holding the steps in memory.
+    """
+    def __init__(self, reader: TrajectoryReader, task: str):
+        self.reader = reader
+        self.task = task
+
+    def __len__(self) -> int:
+        return len(self.reader.steps(self.task))
+
+    def __getitem__(self, index):
+        steps = self.reader.steps(self.task)
+        if isinstance(index, slice):
+            return [self.reader.step(self.task, step) for step in steps[index]]
+        return self.reader.step(self.task, steps[index])
+
+    def __repr__(self) -> str:
+        return f"TaskTrajectory(task={self.task!r}, steps={len(self)}, directory={self.reader.directory!r})"
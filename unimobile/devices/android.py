@@ -4,14 +4,22 @@ import time
 import subprocess
 from typing import List, Tuple, Optional, Union
 
-from unimobile.devices.base import BaseDevice, DeviceInfo, ConnectionType, CommandResult, _execute_command, KeyCodeAndroid, SwipeDirection
+from unimobile.devices.base import BaseDevice, DeviceInfo, ConnectionType, CommandResult, _execute_command, _execute_binary, KeyCodeAndroid, SwipeDirection, ADB_PATH
+from unimobile.devices.capture import PNG_SIGNATURE, CaptureProfile, decode_image, parse_raw_screencap, write_bytes
+from unimobile.devices.shell_session import ShellSession, shell_args
+from unimobile.devices.injector import InjectorClient, InjectorError, InjectorRejected
+from unimobile.devices.app_state import ForegroundApp, parse_android_foreground
+from unimobile.devices.delta import DeltaCapture
 from unimobile.utils.registry import register_device
 from unimobile.config.timing import TIMING_CONFIG
 
 @register_device("android_action")
 class AndroidDevice(BaseDevice):
-    def __init__(self, device_id: str = None):
+    def __init__(self, device_id: str = None, persistent_shell: bool = True, frame_source: str = None, adaptive_settle: bool = False,
+                 injector_jar: str = None, watchdog: bool = False, adb_path: str = None, delta_capture: bool = False):
         super().__init__(device_id)
+        self.platform = "android"
+        self.adb = adb_path or ADB_PATH
         
         if not self.serial:
             devices = self.list_devices()
@@ -20,52 +28,76 @@ class AndroidDevice(BaseDevice):
             self.serial = devices[0].device_id
             print(f"Android automatic binding device: {self.serial}")
 
+        # One long-lived `adb shell` per device instead of one process per command
+        self._session = ShellSession(shell_args(self._adb_prefix())) if persistent_shell else None
+
         self.w, self.h = self.display_size()
 
+        # Optional app_process injection server: gestures skip the `input` tool start-up
+        self._injector: Optional[InjectorClient] = None
+        if injector_jar:
+            try:
+                self.attach_injector(InjectorClient(self._adb_prefix(), jar_path=injector_jar).start())
+            except (InjectorError, OSError) as e:
+                print(f"Android input injector unavailable, using `input`: {e}")
+
+        # Raw captures ship only the row bands that changed since the previous frame
+        self.delta: Optional[DeltaCapture] = DeltaCapture(self) if delta_capture else None
+
+        if frame_source:
+            self.start_frame_grabber(frame_source)
+        if adaptive_settle:
+            self.enable_settle_detection()
+        if watchdog:
+            self.start_watchdog()
+
     def _adb_prefix(self) -> str:
-        return f"adb -s {self.serial}" if self.serial else "adb"
+        return f"{self.adb} -s {self.serial}" if self.serial else self.adb
 
     @classmethod
-    def list_devices(cls) -> List[DeviceInfo]:
+    def list_devices(cls, timeout: float = None) -> List[DeviceInfo]:
         try:
-            result = _execute_command("adb devices -l")
+            result = _execute_command(f"{ADB_PATH} devices -l", timeout=timeout)
             if result.exit_code != 0:
                 return []
 
-            devices = []
-            lines = result.output.strip().split("\n")[1:]
-            
-            for line in lines:
-                if not line.strip(): continue
-                parts = line.split()
-                if len(parts) >= 2:
-                    device_id = parts[0]
-                    status = parts[1]
-                    
-                    if "emulator" in device_id:
-                        conn_type = ConnectionType.EMULATOR
-                    elif ":" in device_id:
-                        conn_type = ConnectionType.REMOTE
-                    else:
-                        conn_type = ConnectionType.USB
-                    
-                    model = "Unknown"
-                    for p in parts:
-                        if p.startswith("model:"):
-                            model = p.split(":")[1]
-                    
-                    devices.append(DeviceInfo(
-                        device_id=device_id,
-                        platform="android",
-                        status=status,
-                        connection_type=conn_type,
-                        model=model
-                    ))
-            return devices
+            return cls.parse_device_lines(result.output.strip().split("\n")[1:])
         except Exception as e:
             print(f"Error listing android devices: {e}")
             return []
 
+    @staticmethod
+    def parse_device_lines(lines: List[str]) -> List[DeviceInfo]:
+        """Parse `adb devices -l` / `adb track-devices` lines: <serial> <state> [key:value ...]"""
+        devices = []
+        for line in lines:
+            if not line.strip(): continue
+            parts = line.split()
+            if len(parts) >= 2:
+                device_id = parts[0]
+                status = parts[1]
+                
+                if "emulator" in device_id:
+                    conn_type = ConnectionType.EMULATOR
+                elif ":" in device_id:
+                    conn_type = ConnectionType.REMOTE
+                else:
+                    conn_type = ConnectionType.USB
+                
+                model = "Unknown"
+                for p in parts:
+                    if p.startswith("model:"):
+                        model = p.split(":")[1]
+                
+                devices.append(DeviceInfo(
+                    device_id=device_id,
+                    platform="android",
+                    status=status,
+                    connection_type=conn_type,
+                    model=model
+                ))
+        return devices
+
     def display_size(self) -> Tuple[int, int]:
         res = self.shell("wm size")
         match = re.search(r'Physical size: (\d+)x(\d+)', res.output)
@@ -73,7 +105,16 @@ class AndroidDevice(BaseDevice):
             return int(match.group(1)), int(match.group(2))
         return 1080, 2340
 
-    def screenshot(self, path: str, method: str = "screencap") -> str:
+    def screenshot(self, path: str, method: str = "exec-out", profile: CaptureProfile = None) -> str:
+        if profile is not None:
+            return self._save_profiled(path, profile)
+
+        if method == "exec-out":
+            try:
+                return write_bytes(path, self.capture())
+            except RuntimeError as e:
+                print(f"Android exec-out capture failed, falling back to sdcard: {e}")
+
         remote_path = "/sdcard/temp_screenshot.png"
         self.shell(f"screencap -p {remote_path}")
         
@@ -82,15 +123,116 @@ class AndroidDevice(BaseDevice):
         
         return path
 
+    def capture(self, decode: bool = False):
+        """Stream `screencap -p` straight into host memory via `adb exec-out`"""
+        if self.delta is not None:
+            # PNG from the patched raw frame: host-side encode instead of a full on-device one
+            import cv2
+            image = self._capture_bgr()
+            if decode:
+                return image
+            ok, buf = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            if not ok:
+                raise RuntimeError("PNG encoding of the delta frame failed")
+            return buf.tobytes()
+
+        data, error, exit_code = _execute_binary(f"{self._adb_prefix()} exec-out screencap -p")
+        if exit_code != 0 or not data.startswith(PNG_SIGNATURE):
+            raise RuntimeError(f"Android screencap failed: {error or data[:200]!r}")
+
+        return decode_image(data) if decode else data
+
+    def capture_raw(self):
+        """Read the uncompressed framebuffer (`screencap` without -p) as a zero-copy RGBA view"""
+        if self.delta is not None:
+            return self.delta.capture().image
+        data, error, exit_code = _execute_binary(f"{self._adb_prefix()} exec-out screencap")
+        if exit_code != 0:
+            raise RuntimeError(f"Android raw screencap failed: {error}")
+
+        return parse_raw_screencap(data)
+
+    def screen_hash(self, stride: int = 8) -> str:
+        """md5 of the raw framebuffer computed on the device: 32 bytes cross adb instead of the ~10 MB frame"""
+        result = self.shell("screencap | md5sum")
+        digest = result.output.split()
+        if result.exit_code != 0 or not digest:
+            raise RuntimeError(f"Android screen hash failed: {result.error or result.output}")
+        return digest[0]
+
+    def _capture_bgr(self, scale: float = 1.0):
+        # The raw framebuffer skips the on-device PNG encode; the profile re-encodes on the host
+        import cv2
+        image = self.capture_raw()
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2BGR if image.shape[2] == 4 else cv2.COLOR_RGB2BGR)
+
     def shell(self, cmd: str, error_raise=True) -> CommandResult:
+        if self._session is not None and "\n" not in cmd:
+            return self._session.execute(cmd)
+
         full_cmd = f"{self._adb_prefix()} shell \"{cmd}\""
         return _execute_command(full_cmd)
 
+    def close(self):
+        super().close()
+        if self._injector is not None:
+            self._injector.close()
+        if self._session is not None:
+            self._session.close()
+
+    def _create_frame_source(self, source: str):
+        if source == "screenrecord":
+            from unimobile.devices.frame_grabber import ScreenrecordFrameSource
+            return ScreenrecordFrameSource(self._adb_prefix(), self.w, self.h)
+        return super()._create_frame_source(source)
+
+    def attach_injector(self, client: InjectorClient):
+        """Route tap/swipe/key/text through `client` (e.g. one connected to a FakeInjectorServer)"""
+        self._injector = client
+
+    def _inject(self, op: str, *args) -> bool:
+        """Send `op` through the injection server; False means the caller should use `input`"""
+        if self._injector is None:
+            return False
+        try:
+            if op == "tap":
+                self._injector.tap(*args)
+            elif op == "swipe":
+                self._injector.swipe(*self._swipe_points(*args), 500)
+            elif op == "text":
+                self._injector.text(args[0])
+            elif op == "clear":
+                self._injector.key(*[KeyCodeAndroid.DEL.value] * args[0])
+            elif op in ("home", "back", "enter"):
+                self._injector.key(KeyCodeAndroid[op.upper()].value)
+            else:
+                return False
+            return True
+        except InjectorError as e:
+            if not isinstance(e, InjectorRejected):
+                # Transport failure: stop using the server; a rejected request only affects this op
+                self._injector.close()
+                self._injector = None
+            if e.sent:
+                # Replaying through `input` could send the gesture twice
+                print(f"Android input injector failed after sending '{op}', not replaying it: {e}")
+                return True
+            print(f"Android input injector failed, falling back to `input`: {e}")
+            return False
+
+    def _send(self, op: str, *args):
+        if not self._inject(op, *args):
+            self.shell(self._batch_command(op, *args))
+
     def tap(self, x: int, y: int) -> None:
-        self.shell(f"input tap {x} {y}")
-        time.sleep(TIMING_CONFIG.device.default_tap_delay)
+        self._send("tap", x, y)
+        self.wait_for_settle(TIMING_CONFIG.device.default_tap_delay)
 
     def swipe(self, direction: Union[SwipeDirection, str], scale: float = 0.8, box=None, speed=1600):
+        self._send("swipe", direction, scale)
+        self.wait_for_settle(TIMING_CONFIG.device.default_swipe_delay)
+
+    def _swipe_points(self, direction: Union[SwipeDirection, str], scale: float = 0.8) -> Tuple[int, int, int, int]:
         if isinstance(direction, str):
             direction = direction.lower()
         
@@ -113,56 +255,124 @@ class AndroidDevice(BaseDevice):
         elif direction == SwipeDirection.DOWN or direction == "down":
             x1, y1 = w // 2, v_offset
             x2, y2 = w // 2, h - v_offset
-        
-        duration = 500
-        self.shell(f"input swipe {x1} {y1} {x2} {y2} {duration}")
-        time.sleep(TIMING_CONFIG.device.default_swipe_delay)
+        return x1, y1, x2, y2
 
     def input_text(self, text: str):
-        safe_text = text.replace(" ", "%s").replace("'", "")
-        self.shell(f"input text '{safe_text}'")
-        time.sleep(TIMING_CONFIG.action.text_input_delay)
+        self._send("text", text)
+        self.wait_for_settle(TIMING_CONFIG.action.text_input_delay)
 
     def clear_text(self, num: int = 15) -> None:
-        cmd = f"input keyevent {KeyCodeAndroid.DEL.value}"
-        full_cmd = ";".join([cmd] * num)
-        self.shell(full_cmd)
-        time.sleep(TIMING_CONFIG.action.text_clear_delay)
+        self._send("clear", num)
+        self.wait_for_settle(TIMING_CONFIG.action.text_clear_delay)
 
     def go_home(self):
-        self.shell(f"input keyevent {KeyCodeAndroid.HOME.value}")
-        time.sleep(TIMING_CONFIG.device.default_home_delay)
+        self._send("home")
+        self.wait_for_settle(TIMING_CONFIG.device.default_home_delay)
 
     def go_back(self):
-        self.shell(f"input keyevent {KeyCodeAndroid.BACK.value}")
-        time.sleep(TIMING_CONFIG.device.default_back_delay)
+        self._send("back")
+        self.wait_for_settle(TIMING_CONFIG.device.default_back_delay)
 
     def enter(self):
-        self.shell(f"input keyevent {KeyCodeAndroid.ENTER.value}")
+        self._send("enter")
+        self.wait_for_settle(0)
+
+    def _batch_command(self, op: str, *args) -> Optional[str]:
+        if op == "tap":
+            x, y = args
+            return f"input tap {x} {y}"
+        if op == "swipe":
+            direction, scale = args
+            x1, y1, x2, y2 = self._swipe_points(direction, scale)
+            duration = 500
+            return f"input swipe {x1} {y1} {x2} {y2} {duration}"
+        if op == "text":
+            safe_text = args[0].replace(" ", "%s").replace("'", "")
+            return f"input text '{safe_text}'"
+        if op == "clear":
+            # `input keyevent` accepts several key codes: one tool launch instead of `num`
+            return "input keyevent " + " ".join([str(KeyCodeAndroid.DEL.value)] * args[0])
+        if op in ("home", "back", "enter"):
+            return f"input keyevent {KeyCodeAndroid[op.upper()].value}"
+        if op == "wait":
+            return f"sleep {args[0]}"
+        return None
 
     def get_app(self) -> List[str]:
+        return self.app_state.packages()
+
+    def _list_packages(self) -> List[str]:
         res = self.shell("pm list packages")
         packages = []
         for line in res.output.splitlines():
             if line.startswith("package:"):
                 packages.append(line.replace("package:", "").strip())
         return packages
+
+    def _query_foreground(self) -> ForegroundApp:
+        # grep on the device: the full dumpsys is tens of KB
+        res = self.shell("dumpsys activity activities | grep -E 'ResumedActivity'")
+        return parse_android_foreground(res.output)
+
+    def install_app(self, apk_path: str) -> CommandResult:
+        result = _execute_command(f"{self._adb_prefix()} install -r {apk_path}", timeout=TIMING_CONFIG.connection.transfer_timeout)
+        self.app_state.invalidate_packages()
+        return result
+
+    def uninstall_app(self, package_name: str) -> CommandResult:
+        result = self.shell(f"pm uninstall {package_name}")
+        self.app_state.invalidate_packages()
+        return result
     
+    @property
+    def is_emulator(self) -> bool:
+        return bool(self.serial) and self.serial.startswith("emulator-")
+
+    def save_snapshot(self, name: str) -> bool:
+        """Save the emulator state as `name` (`adb emu avd snapshot save`)"""
+        if not self.is_emulator:
+            raise RuntimeError(f"{self.serial} is not an emulator, snapshots are unavailable")
+        result = _execute_command(f"{self._adb_prefix()} emu avd snapshot save {name}",
+                                  timeout=TIMING_CONFIG.connection.transfer_timeout)
+        return result.exit_code == 0 and "KO" not in result.output
+
+    def _load_snapshot(self, name: str) -> bool:
+        if not self.is_emulator:
+            return False
+        result = _execute_command(f"{self._adb_prefix()} emu avd snapshot load {name}",
+                                  timeout=TIMING_CONFIG.connection.transfer_timeout)
+        if result.exit_code != 0 or "KO" in result.output:
+            print(f"Android snapshot {name} could not be loaded, clearing app data instead: {result.output or result.error}")
+            return False
+
+        # The emulator restarts adbd: wait for it, then drop connections bound to the old one
+        _execute_command(f"{self._adb_prefix()} wait-for-device", timeout=TIMING_CONFIG.connection.shell_command_timeout)
+        if self._session is not None:
+            self._session.close()
+        if self._injector is not None:
+            # The injection server process did not exist in the snapshot
+            self._injector.close()
+            self._injector = None
+        return True
+
+    def _clear_app(self, package: str):
+        self.shell(f"am force-stop {package}; pm clear {package}")
+
     def launch_app(self, package_name: str, delay: float = None):
-        if delay is None:
-            delay = TIMING_CONFIG.device.default_launch_delay
-        
         self.shell(f"monkey -p {package_name} -c android.intent.category.LAUNCHER 1")
-        time.sleep(delay)
+        if delay is None:
+            self.wait_for_settle(TIMING_CONFIG.device.default_launch_delay)
+        else:
+            time.sleep(delay)
+
+    def dump_hierarchy(self) -> bytes:
+        """Read `uiautomator dump` back over exec-out (/dev/tty) instead of a file on sdcard plus a pull"""
+        data, error, exit_code = _execute_binary(f"{self._adb_prefix()} exec-out uiautomator dump /dev/tty")
+        end = data.rfind(b"</hierarchy>")
+        if exit_code != 0 or end < 0:
+            raise RuntimeError(f"Android uiautomator dump failed: {error or data[:200]!r}")
+        # the dump is followed by "UI hierchary dumped to: /dev/tty"
+        return data[data.find(b"<"):end + len(b"</hierarchy>")]
 
     def get_xml(self, prefix, save_dir):
-        backslash = "\\"
-        xml_dir = "/sdcard"
-        dump_command = f"adb -s {self.serial} shell uiautomator dump " \
-                       f"{os.path.join(xml_dir, prefix + '.xml').replace(backslash, '/')}"
-        pull_command = f"adb -s {self.serial} pull " \
-                       f"{os.path.join(xml_dir, prefix + '.xml').replace(backslash, '/')} " \
-                       f"{os.path.join(save_dir, prefix + '.xml')}"
-        result = _execute_command(dump_command)
-        result = _execute_command(pull_command)
-        return result
\ No newline at end of file
+        return write_bytes(os.path.join(save_dir, prefix + '.xml'), self.dump_hierarchy())
\ No newline at end of file
@@ -0,0 +1,103 @@
+import re
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from unimobile.config.timing import TIMING_CONFIG
+from unimobile.devices.executor import DEFAULT_EXECUTOR, ExecResult
+
+logger = logging.getLogger(__name__)
+
+_PACKAGE_CHANGE = re.compile(r"\b(?:install|uninstall|install-multiple)\b")
+
+
+@dataclass(frozen=True)
+class ForegroundApp:
+    package: Optional[str] = None
+    activity: Optional[str] = None     # Android activity / HarmonyOS ability
+
+
+class AppStateTracker:
+    """
+    Cached app state for one device.
+
+    - The installed-package inventory is fetched once and reused until an
+      install/uninstall is seen (device.install_app / uninstall_app, or an
+      `adb install` / `hdc install` for this device through the executor),
+      or until package_cache_ttl expires.
+    - The foreground package/activity is queried with one cheap dumpsys/aa
+      call and memoized per frame: callers pass a frame key (content hash,
+      screenshot path...) and repeated lookups for the same frame are free.
+
+    The platform queries live on the device (`_list_packages`, `_query_foreground`).
+    """
+    def __init__(self, device, package_ttl: float = None):
+        self.device = device
+        self.package_ttl = package_ttl if package_ttl is not None else TIMING_CONFIG.device.package_cache_ttl
+        self._packages: Optional[List[str]] = None
+        self._packages_time = 0.0
+        self._foreground: Optional[ForegroundApp] = None
+        self._frame_key: Any = None
+        self._lock = threading.Lock()
+        DEFAULT_EXECUTOR.add_listener(self._on_command)
+
+    def packages(self, refresh: bool = False) -> List[str]:
+        with self._lock:
+            stale = time.monotonic() - self._packages_time > self.package_ttl
+            if refresh or stale or self._packages is None:
+                self._packages = self.device._list_packages()
+                self._packages_time = time.monotonic()
+            return list(self._packages)
+
+    def invalidate_packages(self):
+        with self._lock:
+            self._packages = None
+
+    def foreground(self, frame_key: Any = None) -> ForegroundApp:
+        """The foreground app; with a `frame_key`, queried at most once per frame"""
+        with self._lock:
+            if frame_key is not None and frame_key == self._frame_key and self._foreground is not None:
+                return self._foreground
+        try:
+            current = self.device._query_foreground()
+        except Exception as e:
+            logger.warning(f"Foreground app query failed: {e}")
+            current = ForegroundApp()
+        with self._lock:
+            self._foreground, self._frame_key = current, frame_key
+        return current
+
+    def close(self):
+        DEFAULT_EXECUTOR.remove_listener(self._on_command)
+
+    def _on_command(self, cmdline: str, result: ExecResult):
+        serial = self.device.serial
+        if serial and serial in cmdline and _PACKAGE_CHANGE.search(cmdline):
+            self.invalidate_packages()
+
+
+def parse_android_foreground(output: str) -> ForegroundApp:
+    """From `dumpsys activity activities`: `mResumedActivity: ActivityRecord{... u0 com.pkg/.Main t12}`"""
+    match = re.search(r"(?:topResumedActivity|mResumedActivity|ResumedActivity)[=:].*?\s([\w.]+)/([\w.$]+)", output)
+    if not match:
+        return ForegroundApp()
+    package, activity = match.group(1), match.group(2)
+    if activity.startswith("."):
+        activity = package + activity
+    return ForegroundApp(package, activity)
+
+
+def parse_harmony_foreground(output: str) -> ForegroundApp:
+    """From `aa dump -l`: the mission whose state is FOREGROUND, named `#[#bundle:module:ability]`"""
+    for block in re.split(r"Mission ID #", output)[1:]:
+        if "#FOREGROUND" not in block:
+            continue
+        match = re.search(r"mission name #\[#([^:\]]+):[^:\]]*:([^\]]+)\]", block)
+        if match:
+            return ForegroundApp(match.group(1), match.group(2))
+        bundle = re.search(r"bundle name \[([^\]]+)\]", block)
+        ability = re.search(r"(?:main name|ability name) \[([^\]]+)\]", block)
+        return ForegroundApp(bundle.group(1) if bundle else None, ability.group(1) if ability else None)
+    return ForegroundApp()
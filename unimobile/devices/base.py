@@ -1,14 +1,27 @@
 import abc
-import shlex
+import os
+import time
+import tempfile
 import socket
-import subprocess
 from enum import Enum, unique
 from dataclasses import dataclass
-from typing import Union, List, Tuple, Optional
+from typing import TYPE_CHECKING, Union, List, Tuple, Optional
+
+from unimobile.config.timing import TIMING_CONFIG
+from unimobile.core.tracing import traced
+from unimobile.devices.executor import DEFAULT_EXECUTOR
+
+if TYPE_CHECKING:
+    # Only for annotations; the methods import these lazily so cv2/numpy stay off the import path
+    import numpy as np
+    from unimobile.devices.capture import CaptureProfile
+    from unimobile.devices.app_state import AppStateTracker, ForegroundApp
 
 
 SOCKET_TIMEOUT = 20
 UITEST_SERVICE_PORT = 8012
+# adb executable; point it at a stub binary to test without the SDK
+ADB_PATH = os.getenv("UNIMOBILE_ADB", "adb")
 
 class SwipeDirection(str, Enum):
     LEFT = "left"
@@ -406,28 +419,43 @@ class DeviceInfo:
     version: Optional[str] = None # Android Version or HarmonyOS Version
 
 
-def _execute_command(cmdargs: Union[str, List[str]]) -> CommandResult:
-    if isinstance(cmdargs, (list, tuple)):
-        cmdline: str = ' '.join(list(map(shlex.quote, cmdargs)))
-    elif isinstance(cmdargs, str):
-        cmdline = cmdargs
+def _execute_command(cmdargs: Union[str, List[str]], timeout: float = None, retries: int = None) -> CommandResult:
+    """Run a host command through the deadline-aware executor (see CommandExecutor)
+
+    Args:
+        timeout (float, optional): per-call timeout, further bounded by the current step deadline.
+            Defaults to the executor's (TIMING_CONFIG.connection.shell_command_timeout).
+        retries (int, optional): retries on timeout / transport errors, for idempotent commands only. Defaults to 0.
+    """
+    result = DEFAULT_EXECUTOR.run(cmdargs, timeout=timeout, retries=retries)
+    if result.timed_out:
+        return CommandResult("", result.error, -1)
 
-    try:
-        process = subprocess.Popen(cmdline, stdout=subprocess.PIPE,
-                                   stderr=subprocess.PIPE, shell=True)
-        output, error = process.communicate()
-        output = output.decode('utf-8')
-        error = error.decode('utf-8')
-        exit_code = process.returncode
+    return _build_result(result.output, result.error, result.exit_code)
 
-        if 'error:' in output.lower() or '[fail]' in output.lower():
-            return CommandResult("", output, -1)
+def _execute_binary(cmdargs: Union[str, List[str]], timeout: float = None) -> Tuple[bytes, str, int]:
+    """Like `_execute_command`, but keeps stdout as raw bytes (e.g. `adb exec-out screencap`)"""
+    result = DEFAULT_EXECUTOR.run(cmdargs, timeout=timeout, binary=True)
+    return result.output, result.error, result.exit_code
 
-        return CommandResult(output, error, exit_code)
-    except Exception as e:
-        return CommandResult("", str(e), -1)
+def _build_result(output: str, error: str, exit_code: int) -> CommandResult:
+    if 'error:' in output.lower() or '[fail]' in output.lower():
+        return CommandResult("", output, -1)
+
+    return CommandResult(output, error, exit_code)
 
 class BaseDevice(abc.ABC):
+    # Device operations recorded as "device.<name>" spans when tracing is enabled;
+    # subclasses are instrumented automatically (see __init_subclass__)
+    TRACED_METHODS = ("screenshot", "capture", "capture_raw", "capture_profiled", "dump_hierarchy", "tap", "swipe",
+                      "input_text", "clear_text", "go_home", "go_back", "enter", "reset")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.TRACED_METHODS:
+            method = cls.__dict__.get(name)
+            if callable(method) and not getattr(method, "__traced__", False):
+                setattr(cls, name, traced(f"device.{name}", "device")(method))
     
     def __init__(self, device_id: str = None, language: str = "cn") -> None:
         self.serial = device_id
@@ -435,6 +463,10 @@ class BaseDevice(abc.ABC):
         self.platform = "unknown"
         self.w: int = 0
         self.h: int = 0
+        self.frame_grabber = None
+        self.settle_detector = None
+        self.watchdog = None
+        self._app_state = None
 
     @abc.abstractmethod
     def display_size(self) -> Tuple[int, int]:
@@ -442,9 +474,84 @@ class BaseDevice(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def screenshot(self, path: str, method: str = "snapshot_display") -> str:
+    def screenshot(self, path: str, method: str = "snapshot_display", profile: "CaptureProfile" = None) -> str:
+        """Save a screenshot to `path`; with a `profile`, downscale/re-encode it as the profile asks (see capture_profiled)"""
         pass
 
+    def capture(self, decode: bool = False) -> Union[bytes, "np.ndarray"]:
+        """Capture the screen into memory.
+
+        Args:
+            decode (bool, optional): Return a decoded BGR array instead of the encoded image bytes. Defaults to False.
+
+        The default implementation goes through `screenshot` and a temporary file;
+        platforms override it with a direct in-memory path.
+        """
+        fd, path = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            self.screenshot(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        finally:
+            os.remove(path)
+
+        if decode:
+            from unimobile.devices.capture import decode_image
+            return decode_image(data)
+        return data
+
+    def capture_raw(self) -> "np.ndarray":
+        """Capture the screen as an uncompressed (H, W, C) RGB(A) array.
+
+        The default implementation decodes `capture`; platforms that can read
+        the framebuffer directly override it to skip PNG encode/decode.
+        """
+        import cv2
+        return cv2.cvtColor(self.capture(decode=True), cv2.COLOR_BGR2RGBA)
+
+    def screen_hash(self, stride: int = 8) -> str:
+        """A fingerprint of the current screen, equal between two calls only if the screen did not change.
+
+        The default hashes a capture downscaled by `stride` (on the device where
+        `_capture_bgr` supports it); platforms that can hash on the device
+        override it so no image crosses the transport.
+        """
+        import zlib
+        import numpy as np
+
+        image = self._capture_bgr(1.0 / stride)
+        if self.w and image.shape[1] > self.w // stride * 2:
+            # `scale` was ignored: subsample on the host
+            image = image[::stride, ::stride]
+        return format(zlib.crc32(np.ascontiguousarray(image).data), "08x")
+
+    def capture_profiled(self, profile: "CaptureProfile") -> Union[bytes, "np.ndarray"]:
+        """Capture according to `profile`: at most `max_long_side`, encoded as its format.
+
+        Returns encoded bytes, or a BGR array for the "raw" format. Callers map
+        image coordinates back with the ratio of image to `display_size` width.
+        """
+        from unimobile.devices.capture import resize_image
+
+        width, height = (self.w, self.h) if self.w and self.h else self.display_size()
+        scale = profile.scale_for(width, height)
+        image = resize_image(self._capture_bgr(scale),
+                             max(1, round(width * scale)), max(1, round(height * scale)))
+        return image if profile.format == "raw" else profile.encode(image)
+
+    def _capture_bgr(self, scale: float = 1.0) -> "np.ndarray":
+        """A BGR frame for `capture_profiled`; platforms that can downscale on the device may honour `scale`"""
+        return self.capture(decode=True)
+
+    def _save_profiled(self, path: str, profile: "CaptureProfile") -> str:
+        from unimobile.devices.capture import write_bytes
+
+        data = self.capture_profiled(profile)
+        if profile.format == "raw":
+            data = profile.encode(data)
+        return write_bytes(path, data)
+
     @abc.abstractmethod
     def shell(self, cmd: str, error_raise=True) -> CommandResult:
         """Execute ADB/HDC Shell 命令"""
@@ -490,9 +597,211 @@ class BaseDevice(abc.ABC):
     @abc.abstractmethod
     def get_app(self) -> List[str]:
         pass
+
+    def reset(self, snapshot: str = None, packages: List[str] = None) -> str:
+        """Restore a known state before a task.
+
+        Args:
+            snapshot (str, optional): emulator snapshot to load, where the platform supports it. Defaults to None.
+            packages (List[str], optional): apps to force-stop and clear when no snapshot can be used. Defaults to None.
+
+        Returns:
+            str: "snapshot" or "clear", the method that was used
+        """
+        if snapshot and self._load_snapshot(snapshot):
+            if self._app_state is not None:
+                self._app_state.invalidate_packages()
+            return "snapshot"
+
+        for package in packages or []:
+            self._clear_app(package)
+        self.go_home()
+        return "clear"
+
+    def _load_snapshot(self, name: str) -> bool:
+        """Load the named snapshot; False when the device cannot (e.g. not an emulator)"""
+        return False
+
+    def _clear_app(self, package: str):
+        """Force-stop `package` and clear its data"""
+        raise NotImplementedError
+
+    def dump_hierarchy(self) -> Union[bytes, dict]:
+        """The current accessibility hierarchy, in memory (uiautomator XML bytes or a HarmonyOS dump dict)"""
+        raise NotImplementedError
+
+    @property
+    def app_state(self) -> "AppStateTracker":
+        """Cached package inventory and per-frame foreground app (see AppStateTracker)"""
+        if self._app_state is None:
+            from unimobile.devices.app_state import AppStateTracker
+            self._app_state = AppStateTracker(self)
+        return self._app_state
+
+    def foreground_app(self, frame_key=None) -> "ForegroundApp":
+        """The foreground package and activity/ability, queried at most once per `frame_key`"""
+        return self.app_state.foreground(frame_key)
+
+    def _list_packages(self) -> List[str]:
+        """Uncached installed-package query backing `get_app`"""
+        raise NotImplementedError
+
+    def _query_foreground(self) -> "ForegroundApp":
+        """Uncached foreground app query backing `foreground_app`"""
+        raise NotImplementedError
     
 
+    def batch(self) -> "ActionBatch":
+        """Queue several actions and send them to the device in one shell round-trip.
+
+        Example:
+            with device.batch() as b:
+                b.clear_text().input_text("coffee").wait(0.3).enter()
+        """
+        return ActionBatch(self)
+
+    def _batch_command(self, op: str, *args) -> Optional[str]:
+        """Shell command implementing `op` inside a batch, or None when `op` cannot be batched on this platform"""
+        return None
+
+    def start_frame_grabber(self, source: str = "poll", **kwargs):
+        """Start a background capture thread keeping the latest frames in a ring buffer.
+
+        Args:
+            source (str, optional): "poll" for repeated fast captures; platforms may add streaming sources. Defaults to "poll".
+            kwargs: forwarded to FrameGrabber (buffer_size, interval)
+        """
+        from unimobile.devices.frame_grabber import FrameGrabber
+
+        self.stop_frame_grabber()
+        self.frame_grabber = FrameGrabber(self._create_frame_source(source), **kwargs).start()
+        return self.frame_grabber
+
+    def stop_frame_grabber(self):
+        if self.frame_grabber is not None:
+            self.frame_grabber.stop()
+            self.frame_grabber = None
+
+    def enable_settle_detection(self, **kwargs):
+        """Replace the fixed post-action sleeps with adaptive UI-settle detection (see SettleDetector)"""
+        from unimobile.devices.settle import SettleDetector
+
+        self.settle_detector = SettleDetector(self, **kwargs)
+        return self.settle_detector
+
+    def wait_for_settle(self, fallback: float) -> None:
+        """Wait for the UI to settle after an action.
+
+        Args:
+            fallback (float): fixed sleep used when settle detection is disabled
+        """
+        if self.settle_detector is not None:
+            self.settle_detector.wait(fallback=fallback)
+        elif fallback:
+            time.sleep(fallback)
+
+    def _create_frame_source(self, source: str):
+        from unimobile.devices.frame_grabber import PollingFrameSource
+
+        if source == "poll":
+            return PollingFrameSource(self)
+        raise ValueError(f"Unsupported frame source for {self.__class__.__name__}: {source}")
+
+    def start_watchdog(self, **kwargs):
+        """Watch the transport and reconnect with backoff when it drops (see ConnectionWatchdog)"""
+        from unimobile.devices.watchdog import ConnectionWatchdog
+
+        self.stop_watchdog()
+        self.watchdog = ConnectionWatchdog(self, **kwargs).start()
+        return self.watchdog
+
+    def stop_watchdog(self):
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+
+    def close(self):
+        """Release long-lived resources (shell sessions, sockets) held by the device"""
+        self.stop_frame_grabber()
+        self.stop_watchdog()
+        if self._app_state is not None:
+            self._app_state.close()
+            self._app_state = None
+
     @classmethod
     def list_devices(cls) -> List[DeviceInfo]:
         """List all the currently connected devices on this platform"""
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+
+class ActionBatch:
+    """
+    Queued device actions compiled into one compound shell command.
+
+    Actions the platform cannot express as a shell command are run directly,
+    after flushing what has been queued so far, so ordering is preserved.
+    The UI-settle wait (or fixed delay) of the last action runs once on commit.
+    """
+    def __init__(self, device: BaseDevice):
+        self.device = device
+        self._commands: List[str] = []
+        self._settle: float = 0
+
+    def __enter__(self) -> "ActionBatch":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
+
+    def _add(self, op: str, args: tuple, settle: float, fallback) -> "ActionBatch":
+        cmd = self.device._batch_command(op, *args)
+        if cmd is None:
+            self.flush()
+            fallback()
+            self._settle = 0
+        else:
+            self._commands.append(cmd)
+            self._settle = settle
+        return self
+
+    def tap(self, x: int, y: int) -> "ActionBatch":
+        return self._add("tap", (x, y), TIMING_CONFIG.device.default_tap_delay, lambda: self.device.tap(x, y))
+
+    def swipe(self, direction: Union[SwipeDirection, str], scale: float = 0.8) -> "ActionBatch":
+        return self._add("swipe", (direction, scale), TIMING_CONFIG.device.default_swipe_delay,
+                         lambda: self.device.swipe(direction, scale=scale))
+
+    def input_text(self, text: str) -> "ActionBatch":
+        return self._add("text", (text,), TIMING_CONFIG.action.text_input_delay, lambda: self.device.input_text(text))
+
+    def clear_text(self, num: int = 15) -> "ActionBatch":
+        return self._add("clear", (num,), TIMING_CONFIG.action.text_clear_delay, lambda: self.device.clear_text(num))
+
+    def enter(self) -> "ActionBatch":
+        return self._add("enter", (), 0, self.device.enter)
+
+    def go_back(self) -> "ActionBatch":
+        return self._add("back", (), TIMING_CONFIG.device.default_back_delay, self.device.go_back)
+
+    def go_home(self) -> "ActionBatch":
+        return self._add("home", (), TIMING_CONFIG.device.default_home_delay, self.device.go_home)
+
+    def wait(self, seconds: float) -> "ActionBatch":
+        """Inline pause executed on the device between the queued actions"""
+        return self._add("wait", (seconds,), 0, lambda: time.sleep(seconds))
+
+    def flush(self) -> Optional[CommandResult]:
+        if not self._commands:
+            return None
+        commands, self._commands = self._commands, []
+        return self.device.shell("; ".join(commands))
+
+    def commit(self) -> Optional[CommandResult]:
+        result = self.flush()
+        if self._settle or self.device.settle_detector is not None:
+            self.device.wait_for_settle(self._settle)
+        self._settle = 0
+        return result
+
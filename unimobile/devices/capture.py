@@ -0,0 +1,122 @@
+import struct
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """Read (width, height) from encoded image bytes without decoding the pixels"""
+    if data[:8] == PNG_SIGNATURE:
+        # IHDR is always the first chunk: length(4) type(4) width(4) height(4)
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+
+    image = decode_image(data)
+    height, width = image.shape[:2]
+    return width, height
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """Decode PNG/JPEG bytes into a BGR array (same layout as `cv2.imread`)"""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Failed to decode image ({len(data)} bytes)")
+    return image
+
+
+@dataclass
+class CaptureProfile:
+    """
+    What the consumer needs from a capture, negotiated at capture time.
+
+    Example:
+        CaptureProfile(max_long_side=1280, format="jpeg", quality=80)
+    """
+    max_long_side: Optional[int] = None     # None keeps the physical resolution
+    format: str = "png"                     # png | jpeg | webp | raw
+    quality: int = 80                       # jpeg / webp only
+
+    EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp", "raw": ".png"}
+
+    def __post_init__(self):
+        self.format = self.format.lower().replace("jpg", "jpeg")
+        if self.format not in self.EXTENSIONS:
+            raise ValueError(f"Unsupported capture format: {self.format}")
+
+    @property
+    def extension(self) -> str:
+        return self.EXTENSIONS[self.format]
+
+    def scale_for(self, width: int, height: int) -> float:
+        """Image pixels per physical pixel for a width x height screen"""
+        if not self.max_long_side or max(width, height) <= self.max_long_side:
+            return 1.0
+        return self.max_long_side / max(width, height)
+
+    def encode(self, image: np.ndarray) -> bytes:
+        """Encode a BGR array; `raw` is written as an uncompressed PNG for path-based consumers"""
+        if self.format == "jpeg":
+            return encode_jpeg(image, self.quality)
+        if self.format == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, int(self.quality)]
+        else:
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 0 if self.format == "raw" else 1]
+        ok, buf = cv2.imencode(".webp" if self.format == "webp" else ".png", image, params)
+        if not ok:
+            raise ValueError(f"Failed to encode {self.format}")
+        return buf.tobytes()
+
+
+def resize_image(image: np.ndarray, width: int, height: int) -> np.ndarray:
+    if image.shape[1] == width and image.shape[0] == height:
+        return image
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def encode_jpeg(image: np.ndarray, quality: int = 80) -> bytes:
+    """Encode a BGR array as JPEG at `quality` (1-100)"""
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError("Failed to encode JPEG")
+    return buf.tobytes()
+
+
+# android/hardware PixelFormat -> bytes per pixel
+RAW_PIXEL_FORMATS = {
+    1: 4,   # RGBA_8888
+    2: 4,   # RGBX_8888
+    3: 3,   # RGB_888
+}
+
+
+def parse_raw_screencap(data: bytes) -> np.ndarray:
+    """Parse the output of `screencap` (without -p) into an (H, W, C) uint8 view.
+
+    The header is width, height, format as little-endian uint32, followed by
+    a uint32 color space on Android 12+. The returned array is a zero-copy,
+    read-only view over `data`.
+    """
+    if len(data) < 12:
+        raise ValueError(f"Raw screencap too short: {len(data)} bytes")
+
+    width, height, pixel_format = struct.unpack_from("<III", data, 0)
+    bpp = RAW_PIXEL_FORMATS.get(pixel_format)
+    if bpp is None:
+        raise ValueError(f"Unsupported raw screencap pixel format: {pixel_format}")
+
+    payload = width * height * bpp
+    header = len(data) - payload
+    if header not in (12, 16):
+        raise ValueError(f"Unexpected raw screencap size {len(data)} for {width}x{height}x{bpp}")
+
+    return np.frombuffer(data, dtype=np.uint8, count=payload, offset=header).reshape(height, width, bpp)
+
+
+def write_bytes(path: str, data: bytes) -> str:
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
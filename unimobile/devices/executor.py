@@ -0,0 +1,260 @@
+import os
+import time
+import shlex
+import codecs
+import signal
+import logging
+import threading
+import subprocess
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+
+from unimobile.core.deadline import Deadline, current_deadline
+from unimobile.config.timing import TIMING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CommandStat:
+    count: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    timeouts: int = 0
+    failures: int = 0
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+
+class CommandStats:
+    """Time spent per command category, e.g. "adb shell input" or "hdc shell uitest" """
+    def __init__(self):
+        self._stats: Dict[str, CommandStat] = {}
+        self._lock = threading.Lock()
+
+    def record(self, category: str, duration: float, ok: bool = True, timed_out: bool = False):
+        with self._lock:
+            stat = self._stats.setdefault(category, CommandStat())
+            stat.count += 1
+            stat.total_time += duration
+            stat.max_time = max(stat.max_time, duration)
+            stat.timeouts += int(timed_out)
+            stat.failures += int(not ok)
+
+    def snapshot(self) -> Dict[str, CommandStat]:
+        with self._lock:
+            return {k: CommandStat(**vars(v)) for k, v in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self) -> str:
+        lines = []
+        for category, stat in sorted(self.snapshot().items(), key=lambda kv: -kv[1].total_time):
+            lines.append(f"{category}: n={stat.count} total={stat.total_time:.2f}s "
+                         f"mean={stat.mean_time * 1000:.0f}ms max={stat.max_time * 1000:.0f}ms "
+                         f"timeouts={stat.timeouts} failures={stat.failures}")
+        return "\n".join(lines)
+
+
+COMMAND_STATS = CommandStats()
+
+
+def command_category(cmdline: str) -> str:
+    """`adb -s SERIAL shell input tap 1 2` -> `adb shell input`"""
+    try:
+        tokens = shlex.split(cmdline)
+    except ValueError:
+        tokens = cmdline.split()
+
+    words = []
+    skip = False
+    for token in tokens:
+        if skip:
+            skip = False
+            continue
+        if token in ("-s", "-t", "-P", "-H"):
+            skip = True
+            continue
+        if token.startswith("-"):
+            continue
+        words.append(os.path.basename(token.strip("\"'")))
+        if len(words) == 3:
+            break
+    return " ".join(words) or "unknown"
+
+
+@dataclass
+class ExecResult:
+    output: Union[str, bytes]
+    error: str
+    exit_code: int
+    duration: float = 0.0
+    timed_out: bool = False
+
+
+class CommandExecutor:
+    """
+    Deadline-aware, cancellable command execution.
+
+    - Each call is bounded by its own timeout and by the current step deadline
+      (see `unimobile.core.deadline.deadline_scope`), whichever is shorter.
+    - On timeout the whole process group is killed, so the adb/hdc spawned by
+      the shell does not linger.
+    - stdout is read and decoded incrementally, optionally handing each line to
+      `on_line` while the command is still running.
+    - Timeouts and transport errors are retried up to `retries` times.
+    - Time spent is recorded per command category in `stats`.
+    """
+    TRANSIENT_ERRORS = ("device offline", "no devices/emulators found", "connection reset",
+                        "closed", "protocol fault", "[fail]connect")
+
+    def __init__(self, timeout: float = None, retries: int = 0, retry_backoff: float = 0.5, stats: CommandStats = None):
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.stats = stats or COMMAND_STATS
+        self._listeners: List[Callable[[str, ExecResult], None]] = []
+
+    def add_listener(self, callback: Callable[[str, "ExecResult"], None]):
+        """Call `callback(cmdline, result)` after every command (e.g. ConnectionWatchdog)"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, "ExecResult"], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def run(self,
+            cmdargs: Union[str, List[str]],
+            timeout: float = None,
+            retries: int = None,
+            deadline: Deadline = None,
+            binary: bool = False,
+            category: str = None,
+            on_line: Callable[[str], None] = None) -> ExecResult:
+        if isinstance(cmdargs, (list, tuple)):
+            cmdline: str = ' '.join(list(map(shlex.quote, cmdargs)))
+        else:
+            cmdline = cmdargs
+        category = category or command_category(cmdline)
+        deadline = deadline or current_deadline()
+        retries = self.retries if retries is None else retries
+        timeout = self.timeout if timeout is None else timeout
+
+        result = ExecResult(b"" if binary else "", "", -1)
+        for attempt in range(retries + 1):
+            call_timeout = deadline.clamp(timeout) if deadline is not None else timeout
+            if call_timeout is not None and call_timeout <= 0:
+                result = ExecResult(b"" if binary else "", f"Deadline exceeded before running: {cmdline}", -1, timed_out=True)
+                self.stats.record(category, 0.0, ok=False, timed_out=True)
+                break
+
+            result = self._run_once(cmdline, call_timeout, binary, on_line)
+            self.stats.record(category, result.duration, ok=result.exit_code == 0, timed_out=result.timed_out)
+
+            if result.exit_code == 0 or attempt == retries or not self._transient(result):
+                break
+            logger.warning(f"Retrying ({attempt + 1}/{retries}) after transient failure: {cmdline}: {result.error.strip()}")
+            time.sleep(self.retry_backoff * (2 ** attempt))
+
+        self.notify(cmdline, result)
+        return result
+
+    def notify(self, cmdline: str, result: ExecResult):
+        """Hand a finished command to the listeners; commands run outside `run` (e.g. ShellSession) report here too"""
+        for callback in list(self._listeners):
+            try:
+                callback(cmdline, result)
+            except Exception as e:
+                logger.error(f"Command listener failed: {e}")
+
+    def _transient(self, result: ExecResult) -> bool:
+        if result.timed_out:
+            return True
+        text = result.error if isinstance(result.output, bytes) else f"{result.output}\n{result.error}"
+        return any(marker in text.lower() for marker in self.TRANSIENT_ERRORS)
+
+    def _run_once(self, cmdline: str, timeout: Optional[float], binary: bool, on_line) -> ExecResult:
+        start = time.monotonic()
+        try:
+            process = subprocess.Popen(cmdline, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       shell=True, start_new_session=hasattr(os, "killpg"))
+        except Exception as e:
+            return ExecResult(b"" if binary else "", str(e), -1, time.monotonic() - start)
+
+        out_chunks: List[Union[str, bytes]] = []
+        err_chunks: List[str] = []
+        readers = [
+            threading.Thread(target=self._read_stdout, args=(process.stdout, out_chunks, binary, on_line), daemon=True),
+            threading.Thread(target=self._read_text, args=(process.stderr, err_chunks), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        timed_out = False
+        try:
+            process.wait(timeout=timeout)
+            # A child that inherited the pipes can keep them open after the shell exits
+            for reader in readers:
+                reader.join(timeout=None if timeout is None else max(0.0, start + timeout - time.monotonic()))
+            timed_out = any(reader.is_alive() for reader in readers)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+        if timed_out:
+            kill_process_group(process)
+            process.wait()
+            for reader in readers:
+                reader.join(timeout=1)
+
+        output = b"".join(out_chunks) if binary else "".join(out_chunks)
+        error = "".join(err_chunks)
+        if timed_out:
+            error = f"{error}Command timed out after {timeout:.1f}s: {cmdline}"
+            return ExecResult(output, error, -1, time.monotonic() - start, timed_out=True)
+        return ExecResult(output, error, process.returncode, time.monotonic() - start)
+
+    @staticmethod
+    def _read_stdout(stream, sink: list, binary: bool, on_line):
+        if binary:
+            for chunk in iter(lambda: stream.read(65536), b""):
+                sink.append(chunk)
+            return
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for raw in iter(stream.readline, b""):
+            line = decoder.decode(raw)
+            sink.append(line)
+            if on_line is not None and line:
+                try:
+                    on_line(line)
+                except Exception as e:
+                    logger.error(f"on_line callback failed: {e}")
+        sink.append(decoder.decode(b"", final=True))
+
+    @staticmethod
+    def _read_text(stream, sink: list):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for chunk in iter(lambda: stream.read(4096), b""):
+            sink.append(decoder.decode(chunk))
+        sink.append(decoder.decode(b"", final=True))
+
+
+def kill_process_group(process: subprocess.Popen):
+    """Kill `process` and its children (the adb/hdc started by `shell=True`)"""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+
+
+# Bounded even when no deadline is installed: a wedged adb/hdc must not block forever
+DEFAULT_EXECUTOR = CommandExecutor(timeout=TIMING_CONFIG.connection.shell_command_timeout)
@@ -0,0 +1,241 @@
+import time
+import zlib
+import shlex
+import shutil
+import logging
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from unimobile.config.timing import TIMING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CapturedFrame:
+    """
+    A frame held by the FrameGrabber ring buffer
+    """
+    image: np.ndarray
+    timestamp: float        # time.monotonic() when the capture started (polled) or the frame arrived (streamed)
+    content_hash: int
+    color: str = "BGR"      # channel order of `image`: "BGR", "RGB" or "RGBA"
+
+    @property
+    def width(self) -> int:
+        return self.image.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.image.shape[0]
+
+    def bgr(self) -> np.ndarray:
+        if self.color == "RGBA":
+            return cv2.cvtColor(self.image, cv2.COLOR_RGBA2BGR)
+        if self.color == "RGB":
+            return cv2.cvtColor(self.image, cv2.COLOR_RGB2BGR)
+        return self.image
+
+    def save(self, path: str) -> str:
+        # Favour speed over size: the file only feeds the path-based components
+        cv2.imwrite(path, self.bgr(), [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        return path
+
+
+def content_hash(image: np.ndarray) -> int:
+    return zlib.crc32(np.ascontiguousarray(image).data)
+
+
+class FrameSource(ABC):
+    """
+    Where the FrameGrabber pulls frames from.
+    """
+    # True when the source only emits a frame when the screen changes,
+    # so "no new frame" itself means "still stable"
+    continuous: bool = False
+
+    @abstractmethod
+    def read(self) -> Tuple[np.ndarray, str]:
+        """Block until the next frame is available, return (image, color)"""
+        pass
+
+    def close(self):
+        pass
+
+
+class PollingFrameSource(FrameSource):
+    """
+    Repeated fast captures through `device.capture_raw()` (or `capture()`)
+    """
+    def __init__(self, device, raw: bool = True):
+        self.device = device
+        self.raw = raw
+
+    def read(self) -> Tuple[np.ndarray, str]:
+        if self.raw:
+            image = self.device.capture_raw()
+            return image, "RGBA" if image.shape[2] == 4 else "RGB"
+        return self.device.capture(decode=True), "BGR"
+
+
+class ScreenrecordFrameSource(FrameSource):
+    """
+    `adb exec-out screenrecord` H.264 stream decoded on the host by ffmpeg.
+
+    screenrecord only emits frames when the screen content changes, and stops
+    after its 3 minute limit; the pipeline is restarted transparently.
+    """
+    continuous = True
+
+    def __init__(self, adb_prefix: str, width: int, height: int, bit_rate: int = 8000000, ffmpeg: str = "ffmpeg"):
+        if not shutil.which(ffmpeg):
+            raise RuntimeError(f"ScreenrecordFrameSource requires '{ffmpeg}' on PATH")
+
+        self.adb_prefix = adb_prefix
+        self.width = width
+        self.height = height
+        self.bit_rate = bit_rate
+        self.ffmpeg = ffmpeg
+        self._recorder: Optional[subprocess.Popen] = None
+        self._decoder: Optional[subprocess.Popen] = None
+
+    def _start(self):
+        self.close()
+        record_cmd = shlex.split(self.adb_prefix) + [
+            "exec-out", "screenrecord", "--output-format=h264",
+            "--size", f"{self.width}x{self.height}", "--bit-rate", str(self.bit_rate), "-"
+        ]
+        decode_cmd = [
+            self.ffmpeg, "-loglevel", "quiet", "-fflags", "nobuffer", "-flags", "low_delay",
+            "-f", "h264", "-i", "pipe:0", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"
+        ]
+        self._recorder = subprocess.Popen(record_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._decoder = subprocess.Popen(decode_cmd, stdin=self._recorder.stdout,
+                                         stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self._recorder.stdout.close()
+
+    def read(self) -> Tuple[np.ndarray, str]:
+        frame_size = self.width * self.height * 3
+        for _ in range(2):
+            if self._decoder is None or self._decoder.poll() is not None:
+                self._start()
+            buf = self._decoder.stdout.read(frame_size)
+            if len(buf) == frame_size:
+                return np.frombuffer(buf, dtype=np.uint8).reshape(self.height, self.width, 3), "BGR"
+            self.close()
+        raise RuntimeError("screenrecord stream ended")
+
+    def close(self):
+        for process in (self._decoder, self._recorder):
+            if process is not None and process.poll() is None:
+                process.kill()
+        self._recorder = None
+        self._decoder = None
+
+
+class FrameGrabber:
+    """
+    Background thread that keeps the latest frames of a device in a small ring buffer.
+
+    Example:
+        grabber = FrameGrabber(PollingFrameSource(device)).start()
+        device.tap(x, y)
+        frame = grabber.wait_for_stable(after=time.monotonic())
+    """
+    def __init__(self, source: FrameSource, buffer_size: int = None, interval: float = None):
+        self.source = source
+        self.interval = interval if interval is not None else TIMING_CONFIG.capture.poll_interval
+        self._buffer: deque = deque(maxlen=buffer_size or TIMING_CONFIG.capture.buffer_size)
+        self._cond = threading.Condition()
+        self._changed_at = 0.0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> "FrameGrabber":
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self.source.close()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def latest(self) -> Optional[CapturedFrame]:
+        with self._cond:
+            return self._buffer[-1] if self._buffer else None
+
+    def frames(self) -> List[CapturedFrame]:
+        with self._cond:
+            return list(self._buffer)
+
+    def wait_for_stable(self, after: float, stable_duration: float = None, timeout: float = None) -> Optional[CapturedFrame]:
+        """Return the first frame newer than `after` whose content has not changed for `stable_duration` seconds.
+
+        Args:
+            after (float): time.monotonic() timestamp, typically when the last action finished
+            stable_duration (float, optional): required unchanged time. Defaults to TIMING_CONFIG.capture.stable_duration.
+            timeout (float, optional): max wait, after which the newest frame is returned. Defaults to TIMING_CONFIG.capture.max_stable_wait.
+        """
+        stable_duration = stable_duration if stable_duration is not None else TIMING_CONFIG.capture.stable_duration
+        timeout = timeout if timeout is not None else TIMING_CONFIG.capture.max_stable_wait
+        give_up = time.monotonic() + timeout
+
+        with self._cond:
+            while True:
+                latest = self._buffer[-1] if self._buffer else None
+                now = time.monotonic()
+
+                # A change-driven stream that stays silent means the screen is unchanged
+                fresh = latest is not None and (latest.timestamp > after or self.source.continuous)
+                if fresh:
+                    reference = now if self.source.continuous else latest.timestamp
+                    if reference - max(self._changed_at, after) >= stable_duration:
+                        return latest
+
+                if now >= give_up:
+                    logger.warning(f"FrameGrabber: screen not stable after {timeout}s, using latest frame")
+                    return latest
+
+                self._cond.wait(timeout=min(give_up - now, stable_duration))
+
+    def _run(self):
+        while self._running:
+            # A polled frame shows the screen as of when its capture began: one that began before an
+            # action must not pass for a post-action frame however late it arrives. A streamed frame
+            # is pushed when the screen changes, so its arrival time is the closest to its content.
+            started = time.monotonic()
+            try:
+                image, color = self.source.read()
+            except Exception as e:
+                if self._running:
+                    logger.error(f"FrameGrabber capture failed: {e}")
+                    time.sleep(max(self.interval, 0.5))
+                continue
+
+            timestamp = time.monotonic() if self.source.continuous else started
+            frame = CapturedFrame(image=image, timestamp=timestamp, content_hash=content_hash(image), color=color)
+            with self._cond:
+                if not self._buffer or self._buffer[-1].content_hash != frame.content_hash:
+                    self._changed_at = frame.timestamp
+                self._buffer.append(frame)
+                self._cond.notify_all()
+
+            if not self.source.continuous:
+                time.sleep(self.interval)
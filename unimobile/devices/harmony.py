@@ -1,35 +1,28 @@
 import re
 import json
+import base64
 import uuid
 import time
 import socket
 import logging
 from datetime import datetime
-from dataclasses import dataclass
 from typing import Dict, Union, List, Tuple
 from hmdriver2.driver import Driver
 from unimobile.devices.base import KeyCode, _execute_command, CommandResult, SwipeDirection, BaseDevice
 from unimobile.devices.base import DeviceInfo, ConnectionType
+from unimobile.devices.capture import CaptureProfile, decode_image, encode_jpeg, write_bytes
+from unimobile.devices.uitest_rpc import UitestRpcClient, UitestRpcError
+from unimobile.devices.app_state import ForegroundApp, parse_harmony_foreground
 from unimobile.config.timing import TIMING_CONFIG
 from unimobile.utils.registry import register_device
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class HypiumResponse:
-    """
-    Example:
-    {"result":"On#1"}
-    {"result":null}
-    {"result":null,"exception":"Can not connect to AAMS, RET_ERR_CONNECTION_EXIST"}
-    {"exception":{"code":401,"message":"(PreProcessing: APiCallInfoChecker)Illegal argument count"}}
-    """
-    result: Union[List, bool, str, None] = None
-    exception: Union[List, bool, str, None] = None
-
 @register_device("harmony_action")
 class HarmonyDevice(BaseDevice):
-    def __init__(self, device_id: str = None, language: str = "cn") -> None:
+    def __init__(self, device_id: str = None, language: str = "cn", frame_source: str = None, adaptive_settle: bool = False,
+                 uitest_rpc: bool = True, capture_scale: float = 1.0, capture_quality: int = None,
+                 watchdog: bool = False) -> None:
         super().__init__(device_id, language)
         
         self.platform = "harmony"
@@ -42,13 +35,29 @@ class HarmonyDevice(BaseDevice):
                 raise Exception("No HarmonyOS device found")
             self.serial = devices[0].device_id
         self.d = Driver(self.serial)
+        # Taps, key events and text go over a pooled uitest socket; hdc/hmdriver2 are the fallback
+        self._use_rpc = uitest_rpc
+        self._rpc: UitestRpcClient = None
+        # In-memory capture: downscale on the device, optionally re-encode at a lower JPEG quality
+        self.capture_scale = capture_scale
+        self.capture_quality = capture_quality
+        self._display_size: Tuple[int, int] = None
         logger.info(f"The id of the device being operated is: {self.serial}")
+
+        if frame_source:
+            self.start_frame_grabber(frame_source)
+        if adaptive_settle:
+            self.enable_settle_detection()
+        if watchdog:
+            self.start_watchdog()
         
         logger.info("========== HarmonyAdaptor Initialization completed ==========")
         logger.info("\n")
     
     def display_size(self) -> Tuple[int, int]:
-        return self.d.display_size()
+        if self._display_size is None:
+            self._display_size = tuple(self.d.display_size())
+        return self._display_size
 
     def shell(self, cmd: str, error_raise=True) -> CommandResult:
         if cmd[0] != '\"':
@@ -61,11 +70,14 @@ class HarmonyDevice(BaseDevice):
         return result
 
     def get_app(self) -> List[str]:
-        """Used to obtain the ids of all the existing apps on the mobile phone
+        """Used to obtain the ids of all the existing apps on the mobile phone (cached, see AppStateTracker)
 
         Returns:
             List[str]: _description_
         """
+        return self.app_state.packages()
+
+    def _list_packages(self) -> List[str]:
         result = _execute_command(f"{self.hdc_prefix} -t {self.serial} shell bm dump -a")
         output = result.output
         pattern = r'\b[a-zA-Z0-9_]+\.[a-zA-Z0-9_]+\.[a-zA-Z0-9_.]+\b'
@@ -76,12 +88,102 @@ class HarmonyDevice(BaseDevice):
         logger.info(f"Harmony: Get app: {package_list}")
         return package_list
 
-    def screenshot(self, path: str) -> str:
+    def _query_foreground(self) -> ForegroundApp:
+        result = self.shell("aa dump -l", error_raise=False)
+        return parse_harmony_foreground(result.output)
+
+    def install_app(self, hap_path: str) -> CommandResult:
+        result = _execute_command(f"{self.hdc_prefix} -t {self.serial} install {hap_path}",
+                                  timeout=TIMING_CONFIG.connection.transfer_timeout)
+        self.app_state.invalidate_packages()
+        return result
+
+    def uninstall_app(self, bundle_name: str) -> CommandResult:
+        result = _execute_command(f"{self.hdc_prefix} -t {self.serial} uninstall {bundle_name}")
+        self.app_state.invalidate_packages()
+        return result
+
+    def screenshot(self, path: str, method: str = "snapshot_display", profile: CaptureProfile = None) -> str:
+        if profile is not None:
+            return self._save_profiled(path, profile)
+
+        if method == "snapshot_display":
+            try:
+                return write_bytes(path, self.capture())
+            except RuntimeError as e:
+                logger.warning(f"Harmony: in-memory capture failed, falling back to hmdriver2: {e}")
+
         self.d.screenshot(path)
+        return path
+
+    def capture(self, decode: bool = False, scale: float = None, quality: int = None):
+        """
+        `snapshot_display` into a JPEG on the device and stream it back base64-encoded
+        through the same hdc call, skipping the file pull and the host disk.
+
+        Args:
+            decode (bool, optional): Return a BGR array instead of JPEG bytes. Defaults to False.
+            scale (float, optional): Downscale factor applied on the device (-w/-h). Defaults to capture_scale.
+            quality (int, optional): JPEG quality. snapshot_display has a fixed quality, so a lower
+                value is applied by re-encoding on the host. Defaults to capture_quality.
+        """
+        scale = self.capture_scale if scale is None else scale
+        quality = self.capture_quality if quality is None else quality
+
+        # Per-call name: concurrent captures must not read or remove each other's file
+        remote = f"/data/local/tmp/unimobile_capture_{self.serial.replace(':', '_')}_{uuid.uuid4().hex[:12]}.jpeg"
+        size = ""
+        if scale and scale < 1.0:
+            w, h = self.display_size()
+            size = f" -w {max(1, round(w * scale))} -h {max(1, round(h * scale))}"
+
+        result = _execute_command(f"{self.hdc_prefix} -t {self.serial} shell "
+                                  f"\"snapshot_display -f {remote}{size} > /dev/null; base64 {remote}; rm -f {remote}\"")
+        try:
+            data = base64.b64decode(result.output)
+        except ValueError as e:
+            raise RuntimeError(f"Harmony snapshot_display returned invalid data: {e}")
+        if result.exit_code != 0 or not data.startswith(b"\xff\xd8"):
+            raise RuntimeError(f"Harmony snapshot_display failed: {result.error or result.output[:200]}")
+
+        if quality is None:
+            return decode_image(data) if decode else data
+
+        image = decode_image(data)
+        return image if decode else encode_jpeg(image, quality)
+
+    def _capture_bgr(self, scale: float = 1.0):
+        # snapshot_display downscales on the device, so less crosses hdc
+        return self.capture(decode=True, scale=scale, quality=None)
     
+    def _rpc_call(self, method: str, *args) -> bool:
+        """Run `method` on the uitest RPC client; False means the caller should fall back"""
+        if not self._use_rpc:
+            return False
+        try:
+            if self._rpc is None:
+                self._rpc = UitestRpcClient.for_device(self.serial, hdc_prefix=self.hdc_prefix)
+        except (UitestRpcError, OSError) as e:
+            logger.warning(f"Harmony: uitest RPC unavailable, falling back to hdc: {e}")
+            return False
+        try:
+            getattr(self._rpc, method)(*args)
+            return True
+        except (UitestRpcError, OSError) as e:
+            UitestRpcClient.release(self.serial)
+            self._rpc = None
+            if getattr(e, "sent", False):
+                # Replaying through hmdriver2 could run the operation twice
+                logger.warning(f"Harmony: uitest RPC {method} failed after sending, not replaying it: {e}")
+                return True
+            logger.warning(f"Harmony: uitest RPC {method} failed, falling back to hdc: {e}")
+            return False
+
     def tap(self, x: int, y: int) -> None:
-        self.d.click(x, y)
+        if not self._rpc_call("click", x, y):
+            self.d.click(x, y)
         logger.info(f"Harmony: Click on. The click coordinates are: ({x}, {y})")
+        self.wait_for_settle(0)
 
     def swipe(self
               , direction: Union[SwipeDirection, str]
@@ -98,6 +200,7 @@ class HarmonyDevice(BaseDevice):
             ValueError
         """
         self.d.swipe_ext(direction, scale=scale, speed=speed, box=box)
+        self.wait_for_settle(0)
         
 
     def input_text(self, text):
@@ -110,36 +213,66 @@ class HarmonyDevice(BaseDevice):
             text (str): input value
         """
         logger.info(f"Harmony: input text: {text}")
-        self.d.input_text(text=text)
+        if not self._rpc_call("input_text", text):
+            self.d.input_text(text=text)
+        self.wait_for_settle(0)
 
     def clear_text(self, num=15) -> None:
-        key_code = KeyCode.DEL.value
-        for i in range(num):
-            if i == num - 1:
-                logger.info(f"Harmony: Text cleaning")
-                return self.shell(f"uitest uiInput keyEvent {key_code}")
-            self.shell(f"uitest uiInput keyEvent {key_code}")
+        logger.info(f"Harmony: Text cleaning")
+        # One pipelined RPC burst (or one hdc round-trip) for all key events instead of `num`
+        if self._rpc_call("key_events", [KeyCode.DEL.value] * num):
+            return None
+        return self.shell(self._batch_command("clear", num))
+
+    def _batch_command(self, op: str, *args):
+        if op == "tap":
+            x, y = args
+            return f"uitest uiInput click {x} {y}"
+        if op == "clear":
+            return "; ".join([f"uitest uiInput keyEvent {KeyCode.DEL.value}"] * args[0])
+        if op == "enter":
+            return f"uitest uiInput keyEvent {KeyCode.ENTER.value}"
+        if op == "back":
+            return "uitest uiInput keyEvent Back"
+        if op == "home":
+            return "uitest uiInput keyEvent Home"
+        if op == "wait":
+            return f"sleep {args[0]}"
+        # text input and swipes go through hmdriver2
+        return None
         
     def enter(self):
         logger.info(f"Harmony: Press Enter")
-        self.d.press_key(KeyCode.ENTER.value)
+        if not self._rpc_call("key_events", [KeyCode.ENTER.value]):
+            self.d.press_key(KeyCode.ENTER.value)
+        self.wait_for_settle(0)
     
     def go_home(self):
         logger.info(f"Harmony: Press Home")
-        self.d.press_key(KeyCode.HOME.value)
+        if not self._rpc_call("key_events", [KeyCode.HOME.value]):
+            self.d.press_key(KeyCode.HOME.value)
+        self.wait_for_settle(0)
 
     def go_back(self):
         logger.info(f"Harmony: Press Back")
-        self.d.press_key(KeyCode.BACK.value)
+        if not self._rpc_call("key_events", [KeyCode.BACK.value]):
+            self.d.press_key(KeyCode.BACK.value)
+        self.wait_for_settle(0)
     
+    def close(self):
+        super().close()
+        if self._rpc is not None:
+            UitestRpcClient.release(self.serial)
+            self._rpc = None
+
     @classmethod
-    def list_devices(cls) -> List[DeviceInfo]:
+    def list_devices(cls, timeout: float = None) -> List[DeviceInfo]:
         """
         List all connected Harmony devices.
         hdc list targets
         """
         try:
-            result = _execute_command("hdc list targets")
+            result = _execute_command("hdc list targets", timeout=timeout)
             
             if result.exit_code != 0:
                 return []
@@ -153,7 +286,7 @@ class HarmonyDevice(BaseDevice):
                 
                 device_id = line.strip()
                 
-                if "List of devices" in device_id or "attached" in device_id:
+                if "List of devices" in device_id or "attached" in device_id or device_id == "[Empty]":
                     continue
 
                 if ":" in device_id:
@@ -176,7 +309,13 @@ class HarmonyDevice(BaseDevice):
             print(f"[Harmony] Error listing devices: {e}")
             return []
         
+    def _clear_app(self, package: str):
+        self.shell(f"aa force-stop {package}; bm clean -n {package} -d", error_raise=False)
+
+    def dump_hierarchy(self) -> dict:
+        return self.d.dump_hierarchy()
+
     def get_xml(self, save_dir):
-        result = self.d.dump_hierarchy()
+        result = self.dump_hierarchy()
         with open(save_dir, "w", encoding="utf-8") as file:
             json.dump(result, file, ensure_ascii=False, indent=2)
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+Injection protocol (one request / one response per line, UTF-8):
+
+    PING                          -> PONG
+    TAP <x> <y>                   -> OK
+    SWIPE <x1> <y1> <x2> <y2> <ms> -> OK
+    KEY <keycode> [<keycode> ...] -> OK
+    TEXT <base64 utf-8 text>      -> OK
+    rejected, nothing injected    -> ERR <message>
+    failed after some events      -> PARTIAL <message>
+
+The on-device helper (tools/injector, built with tools/injector/build.sh) is
+a jar started once with `app_process`, listening on the abstract socket
+`unimobile_injector`; it injects events through InputManager directly, so
+each gesture skips the `input` tool JVM start-up.
+"""
+
+import time
+import base64
+import hashlib
+import socket
+import logging
+import threading
+import socketserver
+from typing import List, Optional, Tuple
+
+from unimobile.devices.base import FreePort, SOCKET_TIMEOUT, _execute_command
+from unimobile.config.timing import TIMING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+INJECTOR_SOCKET = "unimobile_injector"
+INJECTOR_REMOTE_PATH = "/data/local/tmp/unimobile-injector.jar"
+INJECTOR_MAIN_CLASS = "com.unimobile.injector.Server"
+
+
+class InjectorError(RuntimeError):
+    """`sent` is True when the request may already have been (partly) injected: it must not be replayed"""
+    def __init__(self, message: str, sent: bool = False):
+        super().__init__(message)
+        self.sent = sent
+
+
+class InjectorRejected(InjectorError):
+    """The server answered ERR / PARTIAL: the request failed but the connection is fine"""
+
+
+class InjectorClient:
+    """
+    Host side of the persistent input injection server.
+
+    Example:
+        client = InjectorClient("adb -s emulator-5554", jar_path="build/unimobile-injector.jar")
+        client.start()
+        client.tap(100, 200)
+    """
+    def __init__(self, adb_prefix: str, jar_path: str = None, host: str = "127.0.0.1", port: int = None,
+                 timeout: float = SOCKET_TIMEOUT):
+        """
+        Args:
+            adb_prefix (str): e.g. "adb -s <serial>"
+            jar_path (str, optional): local helper jar, pushed and started by `start()`.
+                When None, an already reachable server at host:port is assumed (e.g. FakeInjectorServer). Defaults to None.
+            port (int, optional): local forwarded port. Defaults to a FreePort.
+        """
+        self.adb_prefix = adb_prefix
+        self.jar_path = jar_path
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Push the helper (when the device copy differs), start it with app_process and forward a local port to it"""
+        if self.jar_path:
+            with open(self.jar_path, "rb") as f:
+                local_md5 = hashlib.md5(f.read()).hexdigest()
+            remote = _execute_command(f"{self.adb_prefix} shell md5sum {INJECTOR_REMOTE_PATH}").output.split()
+            if not remote or remote[0] != local_md5:
+                result = _execute_command(f"{self.adb_prefix} push {self.jar_path} {INJECTOR_REMOTE_PATH}",
+                                          timeout=TIMING_CONFIG.connection.transfer_timeout)
+                if result.exit_code != 0:
+                    raise InjectorError(f"Failed to push injector: {result.error}")
+                # A server started from the stale jar would keep the socket name
+                _execute_command(f"{self.adb_prefix} shell pkill -f {INJECTOR_MAIN_CLASS}")
+
+            _execute_command(
+                f"{self.adb_prefix} shell \"CLASSPATH={INJECTOR_REMOTE_PATH} "
+                f"nohup app_process / {INJECTOR_MAIN_CLASS} {INJECTOR_SOCKET} >/dev/null 2>&1 &\"")
+
+            self.port = self.port or FreePort().get()
+            result = _execute_command(f"{self.adb_prefix} forward tcp:{self.port} localabstract:{INJECTOR_SOCKET}")
+            if result.exit_code != 0:
+                raise InjectorError(f"Failed to forward injector port: {result.error}")
+
+        # The helper needs a moment to bind its socket after app_process starts
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if self._request("PING") == "PONG":
+                    break
+            except InjectorError:
+                if time.monotonic() > deadline:
+                    raise
+            if time.monotonic() > deadline:
+                raise InjectorError("Injector did not answer PING")
+            time.sleep(0.2)
+        logger.info(f"InjectorClient connected on {self.host}:{self.port}")
+        return self
+
+    def _connect(self):
+        self.close()
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("r", encoding="utf-8", newline="\n")
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def _request(self, line: str) -> str:
+        with self._lock:
+            for attempt in range(2):
+                sent = False
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    sent = True
+                    self._sock.sendall((line + "\n").encode("utf-8"))
+                    response = self._reader.readline()
+                    if not response:
+                        raise ConnectionError("injector closed the connection")
+                    return response.strip()
+                except (OSError, ConnectionError) as e:
+                    self.close()
+                    # Only a request that never left the host is retried: the server may have run it
+                    if sent or attempt == 1:
+                        raise InjectorError(f"Injector request failed: {line}: {e}", sent=sent)
+
+    def _command(self, line: str):
+        response = self._request(line)
+        if response != "OK":
+            raise InjectorRejected(f"Injector rejected '{line}': {response}", sent=response.startswith("PARTIAL"))
+
+    def tap(self, x: int, y: int):
+        self._command(f"TAP {int(x)} {int(y)}")
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int = 500):
+        self._command(f"SWIPE {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(duration)}")
+
+    def key(self, *codes: int):
+        self._command("KEY " + " ".join(str(int(c)) for c in codes))
+
+    def text(self, text: str):
+        self._command("TEXT " + base64.b64encode(text.encode("utf-8")).decode("ascii"))
+
+
+class FakeInjectorServer:
+    """
+    In-process stand-in for the on-device helper speaking the same protocol.
+    Received events are recorded in `events`, so the client and the
+    AndroidDevice wiring can be exercised without a phone.
+
+    Example:
+        with FakeInjectorServer() as server:
+            client = InjectorClient("adb", port=server.port).start()
+            client.tap(1, 2)
+            assert server.events == [("TAP", (1, 2))]
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.events: List[Tuple[str, tuple]] = []
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    response = fake.handle_line(raw.decode("utf-8").strip())
+                    self.wfile.write((response + "\n").encode("utf-8"))
+
+        class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = Server((host, port), Handler)
+        self.host, self.port = self._server.server_address
+        self._thread: Optional[threading.Thread] = None
+
+    def handle_line(self, line: str) -> str:
+        op, _, rest = line.partition(" ")
+        args = rest.split()
+        try:
+            if op == "PING":
+                return "PONG"
+            if op == "TAP" and len(args) == 2:
+                self.events.append((op, tuple(map(int, args))))
+            elif op == "SWIPE" and len(args) == 5:
+                self.events.append((op, tuple(map(int, args))))
+            elif op == "KEY" and args:
+                self.events.append((op, tuple(map(int, args))))
+            elif op == "TEXT" and len(args) == 1:
+                self.events.append((op, (base64.b64decode(args[0]).decode("utf-8"),)))
+            else:
+                return f"ERR bad request: {line}"
+        except ValueError as e:
+            return f"ERR {e}"
+        return "OK"
+
+    def start(self) -> "FakeInjectorServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeInjectorServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
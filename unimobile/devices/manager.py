@@ -1,36 +1,88 @@
-from typing import List
-from unimobile.devices.base import DeviceInfo, BaseDevice
+import time
+import shutil
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from unimobile.devices.base import DeviceInfo, BaseDevice, ADB_PATH
 from unimobile.devices.android import AndroidDevice
 from unimobile.devices.harmony import HarmonyDevice
+from unimobile.config.timing import TIMING_CONFIG
+
+logger = logging.getLogger(__name__)
 
 class DeviceManager:
     """
     Equipment Management Center
     """
-    
+    _cache: List[DeviceInfo] = []
+    _cache_time: float = 0.0
+    _cache_lock = threading.Lock()
+    _watcher: Optional["DeviceWatcher"] = None
+
     @staticmethod
-    def list_all_devices() -> List[DeviceInfo]:
+    def list_all_devices(refresh: bool = False, timeout: float = None) -> List[DeviceInfo]:
         """
         Scan all supported platforms (Android + HarmonyOS)
+
+        The platforms are scanned concurrently, each bounded by `timeout`
+        (TIMING_CONFIG.connection.device_scan_timeout), so a hung adb/hdc
+        does not stall the caller. Results are cached for device_scan_ttl
+        seconds, or kept live by a running DeviceWatcher.
         """
+        with DeviceManager._cache_lock:
+            watching = DeviceManager._watcher is not None and DeviceManager._watcher.running
+            fresh = time.monotonic() - DeviceManager._cache_time < TIMING_CONFIG.connection.device_scan_ttl
+            if not refresh and (watching or fresh) and DeviceManager._cache_time:
+                return list(DeviceManager._cache)
+
+        all_devices = DeviceManager._scan(timeout)
+        DeviceManager._update_cache(all_devices)
+        return all_devices
+
+    @staticmethod
+    def _scan(timeout: float = None) -> List[DeviceInfo]:
+        timeout = timeout if timeout is not None else TIMING_CONFIG.connection.device_scan_timeout
+        platforms = [("Android", AndroidDevice, "ADB"), ("Harmony", HarmonyDevice, "HDC")]
+
         all_devices = []
-        
-        # 1. Android
-        try:
-            android_devs = AndroidDevice.list_devices()
-            all_devices.extend(android_devs)
-        except Exception as e:
-            print(f"DeviceManager Failed to scan Android (ADB may not be installed): {e}")
-
-        # 2. HarmonyOS
-        try:
-            harmony_devs = HarmonyDevice.list_devices()
-            all_devices.extend(harmony_devs)
-        except Exception as e:
-            print(f"DeviceManager Failed to scan Harmony (HDC may not be installed): {e}")
-            
+        with ThreadPoolExecutor(max_workers=len(platforms)) as executor:
+            futures = [(name, tool, executor.submit(cls.list_devices, timeout=timeout)) for name, cls, tool in platforms]
+            for name, tool, future in futures:
+                try:
+                    all_devices.extend(future.result())
+                except Exception as e:
+                    print(f"DeviceManager Failed to scan {name} ({tool} may not be installed): {e}")
+
         return all_devices
 
+    @staticmethod
+    def _update_cache(devices: List[DeviceInfo]):
+        with DeviceManager._cache_lock:
+            DeviceManager._cache = list(devices)
+            DeviceManager._cache_time = time.monotonic()
+
+    @staticmethod
+    def invalidate():
+        with DeviceManager._cache_lock:
+            DeviceManager._cache_time = 0.0
+
+    @staticmethod
+    def watch(on_change: Callable[[List[DeviceInfo], List[DeviceInfo]], None] = None) -> "DeviceWatcher":
+        """Start (or return) the background DeviceWatcher that keeps the cache live"""
+        if DeviceManager._watcher is None or not DeviceManager._watcher.running:
+            DeviceManager._watcher = DeviceWatcher().start()
+        if on_change:
+            DeviceManager._watcher.subscribe(on_change)
+        return DeviceManager._watcher
+
+    @staticmethod
+    def stop_watch():
+        if DeviceManager._watcher is not None:
+            DeviceManager._watcher.stop()
+            DeviceManager._watcher = None
+
     @staticmethod
     def get_device_instance(device_id: str = None, platform: str = None) -> BaseDevice:
         """
@@ -44,7 +96,7 @@ class DeviceManager:
         else:
             devices = DeviceManager.list_all_devices()
             target_info = next((d for d in devices if d.device_id == device_id), None)
-            
+
             if not target_info and platform:
                 from unimobile.devices.base import ConnectionType
                 target_info = DeviceInfo(device_id, platform, "unknown", ConnectionType.USB)
@@ -58,4 +110,105 @@ class DeviceManager:
             print(f"Initialize the Android device: {target_info.device_id}")
             return AndroidDevice(device_id=target_info.device_id)
         else:
-            raise ValueError(f"Unsupported platforms: {target_info.platform}")
\ No newline at end of file
+            raise ValueError(f"Unsupported platforms: {target_info.platform}")
+
+
+class DeviceWatcher:
+    """
+    Tracks devices attaching and detaching without re-scanning.
+
+    Android is followed through `adb track-devices`, which pushes the full
+    device list on every change. hdc has no equivalent, so HarmonyOS targets
+    are polled every device_watch_interval seconds with a bounded scan.
+    Subscribers are called with (attached, detached) lists.
+    """
+    def __init__(self, interval: float = None):
+        self.interval = interval if interval is not None else TIMING_CONFIG.connection.device_watch_interval
+        self._android: Dict[str, DeviceInfo] = {}
+        self._harmony: Dict[str, DeviceInfo] = {}
+        self._subscribers: List[Callable] = []
+        self._lock = threading.Lock()
+        self._running = False
+        self._track: Optional[subprocess.Popen] = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def subscribe(self, callback: Callable[[List[DeviceInfo], List[DeviceInfo]], None]):
+        self._subscribers.append(callback)
+
+    def devices(self) -> List[DeviceInfo]:
+        with self._lock:
+            return list(self._android.values()) + list(self._harmony.values())
+
+    def start(self) -> "DeviceWatcher":
+        if self._running:
+            return self
+        self._running = True
+
+        # Seed with a full scan so models are known before the first event
+        for info in DeviceManager._scan():
+            (self._android if info.platform == "android" else self._harmony)[info.device_id] = info
+        DeviceManager._update_cache(self.devices())
+
+        if shutil.which(ADB_PATH):
+            threading.Thread(target=self._track_android, name="DeviceWatcher-adb", daemon=True).start()
+        threading.Thread(target=self._poll_harmony, name="DeviceWatcher-hdc", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._track is not None and self._track.poll() is None:
+            self._track.kill()
+        self._track = None
+
+    def _track_android(self):
+        while self._running:
+            try:
+                self._track = subprocess.Popen([ADB_PATH, "track-devices"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                stream = self._track.stdout
+                while self._running:
+                    header = stream.read(4)
+                    if len(header) < 4:
+                        break
+                    payload = stream.read(int(header, 16)).decode("utf-8", errors="replace")
+                    infos = AndroidDevice.parse_device_lines(payload.splitlines())
+                    self._apply("android", infos)
+            except Exception as e:
+                logger.error(f"DeviceWatcher adb track-devices failed: {e}")
+            if self._running:
+                time.sleep(self.interval)
+
+    def _poll_harmony(self):
+        while self._running:
+            time.sleep(self.interval)
+            try:
+                self._apply("harmony", HarmonyDevice.list_devices(timeout=TIMING_CONFIG.connection.device_scan_timeout))
+            except Exception as e:
+                logger.error(f"DeviceWatcher hdc poll failed: {e}")
+
+    def _apply(self, platform: str, infos: List[DeviceInfo]):
+        with self._lock:
+            known = self._android if platform == "android" else self._harmony
+            current = {}
+            for info in infos:
+                previous = known.get(info.device_id)
+                # track-devices has no model column, keep the one from the seed scan
+                if previous is not None and info.model in (None, "Unknown"):
+                    info.model = previous.model
+                current[info.device_id] = info
+
+            attached = [info for device_id, info in current.items() if device_id not in known]
+            detached = [info for device_id, info in known.items() if device_id not in current]
+            known.clear()
+            known.update(current)
+
+        DeviceManager._update_cache(self.devices())
+        if attached or detached:
+            logger.info(f"DeviceWatcher: attached {[d.device_id for d in attached]}, detached {[d.device_id for d in detached]}")
+            for callback in list(self._subscribers):
+                try:
+                    callback(attached, detached)
+                except Exception as e:
+                    logger.error(f"DeviceWatcher subscriber failed: {e}")
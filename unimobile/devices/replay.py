@@ -0,0 +1,362 @@
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from unimobile.devices.base import BaseDevice, CommandResult, DeviceInfo, ConnectionType, SwipeDirection
+from unimobile.devices.capture import CaptureProfile, PNG_SIGNATURE, decode_image, write_bytes
+from unimobile.utils.registry import register_device
+
+logger = logging.getLogger(__name__)
+
+SESSION_FILE = "session.json"
+FRAMES_DIR = "frames"
+
+# Used when a session has no recorded samples for an operation (seconds, lognormal mu/sigma of a typical adb round-trip)
+DEFAULT_LATENCY = {"capture": (-1.6, 0.4), "action": (-1.2, 0.5)}
+
+
+@dataclass
+class Transition:
+    source: str
+    op: str                         # tap | swipe | text | clear | home | back | enter
+    args: Dict[str, Any]
+    target: str
+
+
+@dataclass
+class Session:
+    """
+    A recorded session: deduplicated frames plus the action graph between them.
+
+    On disk: <dir>/session.json and <dir>/frames/<frame id>.png (+ .xml / .json hierarchy).
+    """
+    platform: str = "android"
+    width: int = 0
+    height: int = 0
+    start: Optional[str] = None
+    frames: Dict[str, Dict[str, str]] = field(default_factory=dict)     # id -> {"image": file, "hierarchy": file}
+    transitions: List[Transition] = field(default_factory=list)
+    latencies: Dict[str, List[float]] = field(default_factory=dict)     # op -> recorded durations, "settle" apart
+    packages: List[str] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, session_dir: str) -> "Session":
+        with open(os.path.join(session_dir, SESSION_FILE), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data["transitions"] = [Transition(**t) for t in data.get("transitions", [])]
+        return cls(**data)
+
+    def save(self, session_dir: str):
+        os.makedirs(session_dir, exist_ok=True)
+        with open(os.path.join(session_dir, SESSION_FILE), "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, ensure_ascii=False, indent=2)
+
+
+def _action_args(op: str, args: tuple) -> Dict[str, Any]:
+    if op == "tap":
+        return {"x": int(args[0]), "y": int(args[1])}
+    if op == "swipe":
+        direction = args[0].value if isinstance(args[0], SwipeDirection) else str(args[0]).lower()
+        return {"direction": direction}
+    if op == "text":
+        return {"text": args[0]}
+    return {}
+
+
+@register_device("replay_device")
+class ReplayDevice(BaseDevice):
+    """
+    Plays back a recorded Session without a phone.
+
+    Each action follows the matching transition out of the current frame
+    (a tap matches the recorded tap nearest to it within `tap_radius`,
+    swipes match by direction, other operations by name); an action with no
+    recorded outcome leaves the screen unchanged.
+
+    Latency:
+        "recorded": sample the durations recorded for each operation
+        "none": zero-latency, for measuring pure agent overhead
+        <float>: a multiplier applied to the recorded samples
+    """
+    def __init__(self, session_dir: str, latency: Union[str, float] = "recorded", tap_radius: int = 80,
+                 strict: bool = False, seed: int = None, device_id: str = None, **kwargs):
+        super().__init__(device_id or os.path.basename(os.path.normpath(session_dir)))
+        self.session_dir = session_dir
+        self.session = Session.load(session_dir)
+        self.platform = "replay"
+        self.w, self.h = self.session.width, self.session.height
+        self.latency = latency
+        self.tap_radius = tap_radius
+        self.strict = strict
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.current = self.session.start
+        self.misses = 0
+        # Actions return with the next frame already in place: the Runner skips its settle sleeps
+        self.settles_on_return = True
+
+        self._edges: Dict[str, List[Transition]] = {}
+        for transition in self.session.transitions:
+            self._edges.setdefault(transition.source, []).append(transition)
+        logger.info(f"ReplayDevice: {len(self.session.frames)} frames, {len(self.session.transitions)} transitions "
+                    f"from {session_dir}")
+
+    def reset(self, snapshot: str = None, packages: List[str] = None) -> str:
+        # The recorded start frame is this device's only snapshot
+        self.current = self.session.start
+        self.misses = 0
+        return "snapshot"
+
+    def _sleep(self, kind: str):
+        if self.latency == "none" or self.latency == 0:
+            return
+        samples = self.session.latencies.get(kind)
+        if samples:
+            delay = self._random.choice(samples)
+        else:
+            mu, sigma = DEFAULT_LATENCY["capture" if kind == "capture" else "action"]
+            delay = self._random.lognormvariate(mu, sigma)
+        if not isinstance(self.latency, str):
+            delay *= float(self.latency)
+        time.sleep(delay)
+
+    def _frame_path(self, key: str) -> Optional[str]:
+        name = self.session.frames.get(self.current, {}).get(key)
+        return os.path.join(self.session_dir, FRAMES_DIR, name) if name else None
+
+    def _step(self, op: str, *args):
+        self._sleep(op)
+        wanted = _action_args(op, args)
+        with self._lock:
+            candidates = [t for t in self._edges.get(self.current, []) if t.op == op]
+            match = None
+            if op == "tap":
+                best = None
+                for t in candidates:
+                    distance = ((t.args["x"] - wanted["x"]) ** 2 + (t.args["y"] - wanted["y"]) ** 2) ** 0.5
+                    if distance <= self.tap_radius and (best is None or distance < best):
+                        best, match = distance, t
+            elif op in ("swipe", "text"):
+                match = next((t for t in candidates if t.args == wanted), None)
+                if match is None and op == "text":
+                    match = next(iter(candidates), None)
+            else:
+                match = next(iter(candidates), None)
+
+            if match is None:
+                self.misses += 1
+                message = f"ReplayDevice: no recorded {op} {wanted} from frame {self.current}"
+                if self.strict:
+                    raise RuntimeError(message)
+                logger.warning(message)
+                return
+            self.current = match.target
+
+    def display_size(self) -> Tuple[int, int]:
+        return self.w, self.h
+
+    def capture(self, decode: bool = False):
+        self._sleep("capture")
+        path = self._frame_path("image")
+        if path is None:
+            raise RuntimeError(f"ReplayDevice: no image recorded for frame {self.current} in {self.session_dir}")
+        with open(path, "rb") as f:
+            data = f.read()
+        return decode_image(data) if decode else data
+
+    def screenshot(self, path: str, method: str = "replay", profile: CaptureProfile = None) -> str:
+        if profile is not None:
+            return self._save_profiled(path, profile)
+        return write_bytes(path, self.capture())
+
+    def dump_hierarchy(self):
+        path = self._frame_path("hierarchy")
+        if path is None:
+            raise RuntimeError(f"No hierarchy recorded for frame {self.current}")
+        with open(path, "rb") as f:
+            data = f.read()
+        return json.loads(data) if path.endswith(".json") else data
+
+    def shell(self, cmd: str, error_raise=True) -> CommandResult:
+        # Only `echo` is emulated (DevicePool health checks); everything else is a no-op
+        output = cmd[5:].strip() + "\n" if cmd.startswith("echo ") else ""
+        return CommandResult(output, "", 0)
+
+    def tap(self, x: int, y: int) -> None:
+        self._step("tap", x, y)
+
+    def swipe(self, direction: Union[SwipeDirection, str], scale: float = 0.8, box=None, speed=1600):
+        self._step("swipe", direction)
+
+    def input_text(self, text: str):
+        self._step("text", text)
+
+    def clear_text(self, num: int = 15) -> None:
+        self._step("clear")
+
+    def go_home(self):
+        self._step("home")
+
+    def go_back(self):
+        self._step("back")
+
+    def enter(self):
+        self._step("enter")
+
+    def get_app(self) -> List[str]:
+        return list(self.session.packages)
+
+    def info(self) -> DeviceInfo:
+        return DeviceInfo(self.serial, "replay", "device", ConnectionType.EMULATOR)
+
+
+class SessionRecorder:
+    """
+    Wraps a real device and records what ReplayDevice needs: every distinct
+    frame it captures, each action with the frame it led to, and the time
+    every capture and action took. The device's post-action settle wait is
+    recorded apart (as "settle") rather than in the action's latency, since
+    replayed actions return with the next frame already in place.
+
+    Example:
+        recorder = SessionRecorder(AndroidDevice(), "sessions/settings_wifi")
+        Runner(agent, recorder, in_memory=True).run("Turn on Wi-Fi")
+        recorder.save()
+
+    Frames taken from a background frame grabber are not seen by the recorder.
+    """
+    def __init__(self, device: BaseDevice, session_dir: str, record_hierarchy: bool = False):
+        self.device = device
+        self.session_dir = session_dir
+        self.record_hierarchy = record_hierarchy
+        width, height = device.display_size()
+        self.session = Session(platform=getattr(device, "platform", "unknown"), width=width, height=height)
+        self._current: Optional[str] = None
+        self._pending: Optional[Tuple[str, Dict[str, Any], str]] = None
+        os.makedirs(os.path.join(session_dir, FRAMES_DIR), exist_ok=True)
+
+    def __getattr__(self, name):
+        # Everything not recorded goes straight to the wrapped device
+        return getattr(self.device, name)
+
+    def _timed(self, kind: str, fn, *args, **kwargs):
+        start = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.session.latencies.setdefault(kind, []).append(round(time.monotonic() - start, 4))
+
+    def _add_frame(self, data: bytes):
+        frame_id = hashlib.sha1(data).hexdigest()[:16]
+        if frame_id not in self.session.frames:
+            image = f"{frame_id}.png" if data.startswith(PNG_SIGNATURE) else f"{frame_id}.jpg"
+            write_bytes(os.path.join(self.session_dir, FRAMES_DIR, image), data)
+            entry = {"image": image}
+            if self.record_hierarchy:
+                entry.update(self._save_hierarchy(frame_id))
+            self.session.frames[frame_id] = entry
+
+        if self.session.start is None:
+            self.session.start = frame_id
+        if self._pending is not None:
+            source, args, op = self._pending
+            self.session.transitions.append(Transition(source, op, args, frame_id))
+            self._pending = None
+        self._current = frame_id
+
+    def _save_hierarchy(self, frame_id: str) -> Dict[str, str]:
+        try:
+            hierarchy = self.device.dump_hierarchy()
+        except Exception as e:
+            logger.warning(f"SessionRecorder: hierarchy not recorded: {e}")
+            return {}
+        if isinstance(hierarchy, dict):
+            name = f"{frame_id}.json"
+            hierarchy = json.dumps(hierarchy, ensure_ascii=False).encode("utf-8")
+        else:
+            name = f"{frame_id}.xml"
+        write_bytes(os.path.join(self.session_dir, FRAMES_DIR, name), hierarchy)
+        return {"hierarchy": name}
+
+    def capture(self, decode: bool = False):
+        data = self._timed("capture", self.device.capture)
+        self._add_frame(data)
+        return decode_image(data) if decode else data
+
+    def screenshot(self, path: str, method: str = None, profile: CaptureProfile = None) -> str:
+        data = self.capture()
+        if profile is not None:
+            # record at full resolution, hand the caller what it asked for
+            from unimobile.devices.capture import resize_image
+            image = decode_image(data)
+            scale = profile.scale_for(image.shape[1], image.shape[0])
+            image = resize_image(image, max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale)))
+            return write_bytes(path, profile.encode(image))
+        return write_bytes(path, data)
+
+    def _action(self, op: str, fn, *args, **kwargs):
+        if self._current is not None:
+            self._pending = (self._current, _action_args(op, args), op)
+
+        # Time the device's own wait_for_settle calls so they can be taken out of the action
+        settled = []
+        shadowed = vars(self.device).get("wait_for_settle")
+        wait_for_settle = self.device.wait_for_settle
+
+        def timed_settle(*settle_args, **settle_kwargs):
+            start = time.monotonic()
+            try:
+                return wait_for_settle(*settle_args, **settle_kwargs)
+            finally:
+                settled.append(time.monotonic() - start)
+
+        self.device.wait_for_settle = timed_settle
+        start = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - start
+            if shadowed is None:
+                del self.device.wait_for_settle
+            else:
+                self.device.wait_for_settle = shadowed
+            self.session.latencies.setdefault(op, []).append(round(max(0.0, elapsed - sum(settled)), 4))
+            if settled:
+                self.session.latencies.setdefault("settle", []).append(round(sum(settled), 4))
+
+    def tap(self, x: int, y: int) -> None:
+        return self._action("tap", self.device.tap, x, y)
+
+    def swipe(self, direction, scale: float = 0.8, box=None, speed=1600):
+        return self._action("swipe", self.device.swipe, direction, scale=scale, box=box, speed=speed)
+
+    def input_text(self, text: str):
+        return self._action("text", self.device.input_text, text)
+
+    def clear_text(self, num: int = 15) -> None:
+        return self._action("clear", self.device.clear_text, num)
+
+    def go_home(self):
+        return self._action("home", self.device.go_home)
+
+    def go_back(self):
+        return self._action("back", self.device.go_back)
+
+    def enter(self):
+        return self._action("enter", self.device.enter)
+
+    def save(self) -> str:
+        try:
+            self.session.packages = self.device.get_app()
+        except Exception as e:
+            logger.warning(f"SessionRecorder: package list not recorded: {e}")
+        self.session.save(self.session_dir)
+        logger.info(f"SessionRecorder: saved {len(self.session.frames)} frames, "
+                    f"{len(self.session.transitions)} transitions to {self.session_dir}")
+        return self.session_dir
@@ -0,0 +1,81 @@
+import time
+import logging
+
+from unimobile.config.timing import TIMING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class SettleDetector:
+    """
+    Adaptive replacement for the fixed post-action sleeps.
+
+    After an action it polls screen fingerprints (`device.screen_hash`) and
+    returns as soon as the screen has stopped changing for `stable_duration`
+    seconds, or after `max_wait` seconds on screens that keep animating
+    (spinners, slow loads). When the device runs a FrameGrabber, its ring
+    buffer is used instead of issuing captures.
+
+    Each poll still costs one screen capture on the device: about 100-250 ms
+    for an Android `screencap`, hashed on the device so only the digest
+    crosses adb, and a downscaled `snapshot_display` on HarmonyOS. The poll
+    rate is bounded by that, not by `interval`, which only adds a pause
+    between polls. A typical settle therefore takes 3-4 polls, against the
+    1-1.5 s fixed sleeps it replaces. If a capture fails, the detector falls
+    back to the fixed delay.
+    """
+    def __init__(self,
+                 device,
+                 interval: float = None,
+                 stable_duration: float = None,
+                 min_wait: float = None,
+                 max_wait: float = None,
+                 stride: int = None):
+        cfg = TIMING_CONFIG.capture
+        self.device = device
+        self.interval = interval if interval is not None else cfg.settle_interval
+        self.stable_duration = stable_duration if stable_duration is not None else cfg.stable_duration
+        self.min_wait = min_wait if min_wait is not None else cfg.settle_min_wait
+        self.max_wait = max_wait if max_wait is not None else cfg.max_stable_wait
+        self.stride = stride if stride is not None else cfg.settle_stride
+
+    def wait(self, max_wait: float = None, fallback: float = None) -> float:
+        """Block until the screen is stable, return the time spent waiting
+
+        Args:
+            max_wait (float, optional): cap on the wait. Defaults to the detector's max_wait.
+            fallback (float, optional): fixed delay used when the screen cannot be captured. Defaults to the tap delay.
+        """
+        max_wait = max_wait if max_wait is not None else self.max_wait
+        fallback = fallback if fallback is not None else TIMING_CONFIG.device.default_tap_delay
+        start = time.monotonic()
+
+        grabber = getattr(self.device, "frame_grabber", None)
+        if grabber is not None and grabber.running:
+            time.sleep(self.min_wait)
+            grabber.wait_for_stable(after=start, stable_duration=self.stable_duration,
+                                    timeout=max(0.0, max_wait - self.min_wait))
+            return time.monotonic() - start
+
+        time.sleep(self.min_wait)
+        last_hash, changed_at = None, time.monotonic()
+        while True:
+            try:
+                current = self.device.screen_hash(self.stride)
+            except Exception as e:
+                logger.warning(f"SettleDetector capture failed, using the fixed {fallback}s delay: {e}")
+                time.sleep(max(0.0, min(fallback, max_wait) - (time.monotonic() - start)))
+                break
+
+            now = time.monotonic()
+            if current != last_hash:
+                last_hash, changed_at = current, now
+            elif now - changed_at >= self.stable_duration:
+                break
+
+            if now - start >= max_wait:
+                logger.info(f"SettleDetector: screen still changing after {max_wait}s")
+                break
+            time.sleep(self.interval)
+
+        return time.monotonic() - start
@@ -0,0 +1,197 @@
+import time
+import uuid
+import queue
+import shlex
+import logging
+import threading
+import subprocess
+from typing import List, Optional
+
+from unimobile.core.deadline import current_deadline
+from unimobile.devices.base import CommandResult, _build_result
+from unimobile.devices.executor import DEFAULT_EXECUTOR, ExecResult, command_category
+from unimobile.config.timing import TIMING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_EOF = object()
+
+
+class ShellSession:
+    """
+    A long-lived `adb shell` / `hdc shell` process.
+
+    Commands are written to the stdin of a single shell process and their
+    output is framed with a unique sentinel line, so the per-command
+    process launch of `_execute_command` is paid only once per device.
+    Each command's stdin is /dev/null: it cannot swallow the framing script.
+    Results are recorded in COMMAND_STATS and reported to the executor's
+    listeners like any other command.
+
+    Example:
+        session = ShellSession(["adb", "-s", serial, "shell"])
+        result = session.execute("wm size")
+    """
+    def __init__(self, cmdargs: List[str], timeout: float = None, max_retries: int = 1):
+        self.cmdargs = list(cmdargs)
+        self.timeout = timeout if timeout is not None else TIMING_CONFIG.connection.shell_command_timeout
+        self.max_retries = max_retries
+
+        self._process: Optional[subprocess.Popen] = None
+        self._stdout: "queue.Queue" = queue.Queue()
+        self._stderr: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        self.close()
+        self._stdout = queue.Queue()
+        self._stderr = queue.Queue()
+        self._process = subprocess.Popen(self.cmdargs,
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE)
+        for stream, sink in ((self._process.stdout, self._stdout), (self._process.stderr, self._stderr)):
+            threading.Thread(target=self._pump, args=(stream, sink), daemon=True).start()
+        logger.info(f"ShellSession started: {' '.join(self.cmdargs)}")
+
+    def close(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except Exception:
+            pass
+        if process.poll() is None:
+            process.kill()
+        try:
+            process.wait(timeout=1)
+        except Exception:
+            pass
+
+    def execute(self, cmd: str, timeout: float = None) -> CommandResult:
+        """Run `cmd` in the session and wait for its sentinel.
+
+        The session is restarted when the shell hit EOF (device reboot,
+        adb server restart, cable unplugged) and the command is retried
+        up to `max_retries` times. A command that exceeds its timeout kills
+        the session, since the shell is still busy with it.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = current_deadline()
+        if deadline is not None:
+            timeout = deadline.clamp(timeout)
+            if timeout <= 0:
+                return CommandResult("", f"Deadline exceeded before running: {cmd}", -1)
+
+        # Same shape as the one-shot `adb -s <serial> shell "<cmd>"`, so listeners match either
+        cmdline = f"{' '.join(shlex.quote(arg) for arg in self.cmdargs)} \"{cmd}\""
+        start = time.monotonic()
+        with self._lock:
+            result = self._execute_with_retry(cmd, timeout)
+        timed_out = result.error.startswith("Command timed out")
+        duration = time.monotonic() - start
+        DEFAULT_EXECUTOR.stats.record(command_category(cmdline), duration, ok=result.exit_code == 0, timed_out=timed_out)
+        DEFAULT_EXECUTOR.notify(cmdline, ExecResult(result.output, result.error, result.exit_code, duration, timed_out))
+        return result
+
+    def _execute_with_retry(self, cmd: str, timeout: float) -> CommandResult:
+        for attempt in range(self.max_retries + 1):
+            if not self.alive:
+                try:
+                    self.start()
+                except Exception as e:
+                    return CommandResult("", str(e), -1)
+            try:
+                return self._execute(cmd, timeout)
+            except EOFError:
+                logger.warning(f"ShellSession EOF, reconnecting ({attempt + 1}/{self.max_retries + 1}): {cmd}")
+                self.close()
+            except TimeoutError:
+                logger.error(f"ShellSession command timed out after {timeout}s: {cmd}")
+                self.close()
+                return CommandResult("", f"Command timed out after {timeout}s: {cmd}", -1)
+
+        return CommandResult("", f"Shell session closed: {cmd}", -1)
+
+    def _execute(self, cmd: str, timeout: float) -> CommandResult:
+        marker = f"__UNIMOBILE_{uuid.uuid4().hex}__"
+        # The marker lines start with a newline so they are found even after output without one;
+        # that separator is the only thing stripped from the output
+        script = (f"{{ {cmd}\n}} </dev/null\n"
+                  f"__rc=$?; printf '\\n%s %s\\n' {marker} $__rc; printf '\\n%s\\n' {marker} >&2\n")
+        try:
+            self._process.stdin.write(script.encode("utf-8"))
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            raise EOFError
+
+        deadline = _Deadline(timeout)
+        out_lines = []
+        exit_code = -1
+        while True:
+            line = self._read(self._stdout, deadline)
+            if line.startswith(marker):
+                exit_code = int(line.split()[-1]) if line.split()[-1].lstrip("-").isdigit() else -1
+                break
+            out_lines.append(line)
+
+        err_lines = []
+        while True:
+            line = self._read(self._stderr, deadline)
+            if line.startswith(marker):
+                break
+            err_lines.append(line)
+
+        return _build_result(_strip_separator("".join(out_lines)), _strip_separator("".join(err_lines)), exit_code)
+
+    @staticmethod
+    def _read(sink: "queue.Queue", deadline: "_Deadline") -> str:
+        try:
+            item = sink.get(timeout=deadline.remaining())
+        except queue.Empty:
+            raise TimeoutError
+        if item is _EOF:
+            sink.put(_EOF)
+            raise EOFError
+        return item
+
+    @staticmethod
+    def _pump(stream, sink: "queue.Queue"):
+        try:
+            for raw in iter(stream.readline, b""):
+                sink.put(raw.decode("utf-8", errors="replace"))
+        except Exception:
+            pass
+        finally:
+            sink.put(_EOF)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _strip_separator(text: str) -> str:
+    for separator in ("\r\n", "\n"):
+        if text.endswith(separator):
+            return text[:-len(separator)]
+    return text
+
+
+class _Deadline:
+    def __init__(self, timeout: float):
+        self._end = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self._end - time.monotonic())
+
+
+def shell_args(prefix: str) -> List[str]:
+    """Split a command prefix such as `adb -s <serial>` into Popen args"""
+    return shlex.split(prefix) + ["shell"]
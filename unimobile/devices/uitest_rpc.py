@@ -0,0 +1,265 @@
+import json
+import socket
+import logging
+import threading
+import socketserver
+from datetime import datetime
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from unimobile.devices.base import FreePort, SOCKET_TIMEOUT, UITEST_SERVICE_PORT, _execute_command
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HypiumResponse:
+    """
+    Example:
+    {"result":"On#1"}
+    {"result":null}
+    {"result":null,"exception":"Can not connect to AAMS, RET_ERR_CONNECTION_EXIST"}
+    {"exception":{"code":401,"message":"(PreProcessing: APiCallInfoChecker)Illegal argument count"}}
+    """
+    result: Union[List, bool, str, None] = None
+    exception: Union[List, bool, str, None] = None
+
+
+class UitestRpcError(RuntimeError):
+    """`sent` is True when the request may already have run on the device: it must not be replayed"""
+    def __init__(self, message: str, sent: bool = False):
+        super().__init__(message)
+        self.sent = sent
+
+
+class UitestRpcClient:
+    """
+    Direct channel to the on-device uitest agent (port UITEST_SERVICE_PORT).
+
+    The hdc port forward and the uitest daemon are set up once; afterwards
+    every call is a JSON message on one persistent socket. `call_many` writes
+    several requests back to back and then reads the replies in order, so a
+    burst of key events costs one round-trip.
+
+    Example:
+        client = UitestRpcClient.for_device("FMR0223C13000649")
+        client.click(100, 200)
+        client.key_events([KeyCode.DEL.value] * 10)
+    """
+    _pool: Dict[str, "UitestRpcClient"] = {}
+    _pool_lock = threading.Lock()
+
+    def __init__(self, serial: str = None, host: str = "127.0.0.1", port: int = None, timeout: float = SOCKET_TIMEOUT,
+                 hdc_prefix: str = "hdc"):
+        """
+        Args:
+            serial (str, optional): device to forward to. When None, a server already listening
+                on host:port is used as is (e.g. MockUitestServer). Defaults to None.
+            port (int, optional): local port. Defaults to a FreePort when forwarding.
+        """
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.hdc_prefix = hdc_prefix
+        self._sock: Optional[socket.socket] = None
+        self._buffer = ""
+        self._decoder = json.JSONDecoder()
+        self._lock = threading.Lock()
+        self._driver: Optional[str] = None
+        self._forwarded = False
+
+    @classmethod
+    def for_device(cls, serial: str, **kwargs) -> "UitestRpcClient":
+        """The pooled client for `serial`, created and forwarded on first use"""
+        with cls._pool_lock:
+            client = cls._pool.get(serial)
+            if client is None:
+                client = cls(serial, **kwargs).start()
+                cls._pool[serial] = client
+            return client
+
+    @classmethod
+    def release(cls, serial: str):
+        with cls._pool_lock:
+            client = cls._pool.pop(serial, None)
+        if client is not None:
+            client.close()
+
+    def start(self) -> "UitestRpcClient":
+        if self.serial:
+            _execute_command(f"{self.hdc_prefix} -t {self.serial} shell uitest start-daemon singleness")
+            self.port = self.port or FreePort().get()
+            result = _execute_command(f"{self.hdc_prefix} -t {self.serial} fport tcp:{self.port} tcp:{UITEST_SERVICE_PORT}")
+            if result.exit_code != 0:
+                raise UitestRpcError(f"Failed to forward uitest port: {result.error}")
+            self._forwarded = True
+
+        self._driver = self.call("Driver.create", this=None).result
+        if not self._driver:
+            raise UitestRpcError("uitest agent did not create a Driver")
+        logger.info(f"UitestRpcClient connected on {self.host}:{self.port} ({self._driver})")
+        return self
+
+    def close(self):
+        self._disconnect()
+        if self._forwarded:
+            self._forwarded = False
+            _execute_command(f"{self.hdc_prefix} -t {self.serial} fport rm tcp:{self.port} tcp:{UITEST_SERVICE_PORT}")
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._buffer = ""
+
+    @staticmethod
+    def _message(api: str, args: List[Any], this: Optional[str]) -> Dict:
+        return {
+            "module": "com.ohos.devicetest.hypiumApiHelper",
+            "method": "callHypiumApi",
+            "params": {"api": api, "this": this, "args": args, "message_type": "hypium"},
+            "request_id": datetime.now().strftime("%Y%m%d%H%M%S%f"),
+        }
+
+    def call(self, api: str, args: List[Any] = None, this: Optional[str] = "") -> HypiumResponse:
+        return self.call_many([(api, args or [])], this=this)[0]
+
+    def call_many(self, calls: List[Tuple[str, List[Any]]], this: Optional[str] = "") -> List[HypiumResponse]:
+        """Pipeline `calls`: all requests are written before the first reply is read"""
+        this = self._driver if this == "" else this
+        payload = "".join(json.dumps(self._message(api, args, this), ensure_ascii=False) for api, args in calls)
+
+        with self._lock:
+            for attempt in range(2):
+                sent = False
+                try:
+                    if self._sock is None:
+                        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+                    self._sock.sendall(payload.encode("utf-8"))
+                    sent = True
+                    return [self._read_response() for _ in calls]
+                except (OSError, ConnectionError, ValueError) as e:
+                    self._disconnect()
+                    # Only a burst that never left the host is retried: the agent may have run it
+                    if sent or attempt == 1:
+                        raise UitestRpcError(f"uitest RPC failed: {[api for api, _ in calls]}: {e}", sent=sent)
+
+    def _read_response(self) -> HypiumResponse:
+        # Replies are bare JSON objects without framing; decode them off the stream
+        raw = bytearray()
+        while True:
+            text = self._buffer.lstrip()
+            if text:
+                try:
+                    obj, end = self._decoder.raw_decode(text)
+                    self._buffer = text[end:]
+                    return HypiumResponse(result=obj.get("result"), exception=obj.get("exception"))
+                except json.JSONDecodeError:
+                    pass
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("uitest agent closed the connection")
+            raw += chunk
+            try:
+                self._buffer = text + raw.decode("utf-8")
+                raw.clear()
+            except UnicodeDecodeError:
+                # multi-byte character split across reads
+                self._buffer = text
+
+    def _check(self, responses: List[HypiumResponse]):
+        for index, response in enumerate(responses):
+            if response.exception:
+                # The calls before it in the burst did run
+                raise UitestRpcError(f"uitest exception: {response.exception}", sent=index > 0)
+
+    def click(self, x: int, y: int):
+        self._check([self.call("Driver.click", [int(x), int(y)])])
+
+    def key_events(self, codes: List[int]):
+        self._check(self.call_many([("Driver.triggerKey", [int(code)]) for code in codes]))
+
+    def input_text(self, text: str, x: int = 1, y: int = 1):
+        """Type into the focused field (uitest needs a point; it is only used when nothing has focus)"""
+        self._check([self.call("Driver.inputText", [{"x": int(x), "y": int(y)}, text])])
+
+
+class MockUitestServer:
+    """
+    Local stand-in for the uitest agent. Answers `Driver.create` with
+    "Driver#0" and any other api with {"result": true}, recording
+    (api, args) in `calls`.
+
+    Example:
+        with MockUitestServer() as server:
+            client = UitestRpcClient(port=server.port).start()
+            client.click(10, 20)
+            assert server.calls[-1] == ("Driver.click", [10, 20])
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, responses: Dict[str, Dict] = None):
+        """
+        Args:
+            responses (Dict[str, Dict], optional): canned reply per api, e.g.
+                {"Driver.click": {"exception": "..."}}; None drops the connection
+                without replying. Defaults to None.
+        """
+        self.calls: List[Tuple[str, List[Any]]] = []
+        self.responses = responses or {}
+        mock = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                decoder = json.JSONDecoder()
+                buffer = ""
+                while True:
+                    chunk = self.request.recv(65536)
+                    if not chunk:
+                        return
+                    buffer += chunk.decode("utf-8")
+                    while buffer.strip():
+                        buffer = buffer.lstrip()
+                        try:
+                            message, end = decoder.raw_decode(buffer)
+                        except json.JSONDecodeError:
+                            break
+                        buffer = buffer[end:]
+                        reply = mock.handle_message(message)
+                        if reply is None:
+                            return
+                        self.request.sendall(json.dumps(reply, ensure_ascii=False).encode("utf-8"))
+
+        class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = Server((host, port), Handler)
+        self.host, self.port = self._server.server_address
+
+    def handle_message(self, message: Dict) -> Optional[Dict]:
+        params = message.get("params", {})
+        api, args = params.get("api"), params.get("args", [])
+        self.calls.append((api, args))
+        if api in self.responses:
+            return self.responses[api]
+        if api == "Driver.create":
+            return {"result": "Driver#0"}
+        return {"result": True}
+
+    def start(self) -> "MockUitestServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockUitestServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
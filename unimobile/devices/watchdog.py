@@ -0,0 +1,187 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from unimobile.config.timing import TIMING_CONFIG
+from unimobile.devices.base import ADB_PATH, _execute_command
+from unimobile.devices.executor import DEFAULT_EXECUTOR, ExecResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WatchdogStats:
+    disconnects: int = 0
+    reconnect_attempts: int = 0
+    total_downtime: float = 0.0
+    last_downtime: float = 0.0
+
+    def summary(self) -> str:
+        return (f"disconnects={self.disconnects} reconnect_attempts={self.reconnect_attempts} "
+                f"downtime total={self.total_downtime:.1f}s last={self.last_downtime:.1f}s")
+
+
+class ConnectionWatchdog:
+    """
+    Detects transport loss for one device and reconnects with backoff.
+
+    Loss is noticed from command results (every adb/hdc call naming the
+    device goes through DEFAULT_EXECUTOR) and from a periodic heartbeat
+    (`adb get-state` / `hdc list targets`). While the device is down the
+    watchdog retries `adb connect` / `hdc tconn` with exponential backoff;
+    `wait_connected` lets the Runner pause instead of stepping blind.
+
+    Example:
+        watchdog = device.start_watchdog()
+        if not watchdog.wait_connected(timeout=60):
+            ...
+    """
+    LOSS_MARKERS = ("device offline", "not found", "no devices/emulators found", "connection reset",
+                    "connection refused", "closed", "[fail]connect", "unauthorized")
+
+    def __init__(self, device, heartbeat_interval: float = None, backoff: float = None, max_backoff: float = None):
+        config = TIMING_CONFIG.connection
+        self.device = device
+        self.heartbeat_interval = heartbeat_interval if heartbeat_interval is not None else config.heartbeat_interval
+        self.backoff = backoff if backoff is not None else config.reconnect_backoff
+        self.max_backoff = max_backoff if max_backoff is not None else config.reconnect_max_backoff
+        self.stats = WatchdogStats()
+
+        self._connected = threading.Event()
+        self._connected.set()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._down_since: Optional[float] = None
+        self._subscribers: List[Callable[[bool], None]] = []
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    @property
+    def downtime(self) -> float:
+        """Seconds since the current disconnect (0 while connected)"""
+        return time.monotonic() - self._down_since if self._down_since is not None else 0.0
+
+    def subscribe(self, callback: Callable[[bool], None]):
+        """`callback(connected)` is called on every disconnect / reconnect"""
+        self._subscribers.append(callback)
+
+    def start(self) -> "ConnectionWatchdog":
+        if self._running:
+            return self
+        self._running = True
+        DEFAULT_EXECUTOR.add_listener(self._on_command)
+        self._thread = threading.Thread(target=self._loop, name=f"Watchdog-{self.device.serial}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        DEFAULT_EXECUTOR.remove_listener(self._on_command)
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def wait_connected(self, timeout: float = None) -> bool:
+        return self._connected.wait(timeout)
+
+    def check(self) -> bool:
+        """Heartbeat now, on the caller's thread; on failure the watchdog starts reconnecting"""
+        if self._alive():
+            return True
+        self._mark_down()
+        self._wakeup.set()
+        return False
+
+    def _on_command(self, cmdline: str, result: ExecResult):
+        # Heartbeats and reconnects run on the watchdog thread and are judged there
+        if threading.current_thread() is self._thread or not self.device.serial or self.device.serial not in cmdline:
+            return
+        if result.exit_code != 0 and self._looks_lost(result):
+            logger.warning(f"Watchdog {self.device.serial}: transport error in `{cmdline}`: {result.error.strip()[:200]}")
+            self._wakeup.set()
+
+    def _looks_lost(self, result: ExecResult) -> bool:
+        if result.timed_out:
+            return True
+        output = result.output if isinstance(result.output, str) else ""
+        text = f"{output}\n{result.error}".lower()
+        return any(marker in text for marker in self.LOSS_MARKERS)
+
+    def _loop(self):
+        while self._running:
+            self._wakeup.wait(self.heartbeat_interval)
+            self._wakeup.clear()
+            if not self._running:
+                break
+            if self._alive():
+                if not self.connected:
+                    self._mark_up()
+                continue
+
+            self._mark_down()
+            delay = self.backoff
+            while self._running:
+                self.stats.reconnect_attempts += 1
+                self._reconnect()
+                if self._alive():
+                    self._mark_up()
+                    break
+                logger.warning(f"Watchdog {self.device.serial}: still disconnected after {self.downtime:.0f}s, "
+                               f"retrying in {delay:.0f}s")
+                self._wakeup.wait(delay)
+                self._wakeup.clear()
+                delay = min(delay * 2, self.max_backoff)
+
+    def _alive(self) -> bool:
+        timeout = TIMING_CONFIG.connection.device_scan_timeout
+        if self.device.platform == "harmony":
+            result = _execute_command("hdc list targets", timeout=timeout)
+            return result.exit_code == 0 and self.device.serial in result.output.split()
+        adb = getattr(self.device, "adb", ADB_PATH)
+        result = _execute_command(f"{adb} -s {self.device.serial} get-state", timeout=timeout)
+        return result.exit_code == 0 and result.output.strip() == "device"
+
+    def _reconnect(self):
+        serial = self.device.serial
+        adb = getattr(self.device, "adb", ADB_PATH)
+        timeout = TIMING_CONFIG.connection.device_scan_timeout
+        if self.device.platform == "harmony":
+            if ":" in serial:
+                _execute_command(f"hdc tconn {serial}", timeout=timeout)
+        elif ":" in serial:
+            # ADB over TCP: drop the stale transport first, `adb connect` does not replace an offline one
+            _execute_command(f"{adb} disconnect {serial}", timeout=timeout)
+            _execute_command(f"{adb} connect {serial}", timeout=timeout)
+        else:
+            _execute_command(f"{adb} -s {serial} reconnect", timeout=timeout)
+
+    def _mark_down(self):
+        if not self._connected.is_set():
+            return
+        self._connected.clear()
+        self._down_since = time.monotonic()
+        self.stats.disconnects += 1
+        logger.error(f"Watchdog {self.device.serial}: device disconnected")
+        self._notify(False)
+
+    def _mark_up(self):
+        downtime = self.downtime
+        self.stats.last_downtime = downtime
+        self.stats.total_downtime += downtime
+        self._down_since = None
+        self._connected.set()
+        logger.info(f"Watchdog {self.device.serial}: reconnected after {downtime:.1f}s")
+        self._notify(True)
+
+    def _notify(self, connected: bool):
+        for callback in list(self._subscribers):
+            try:
+                callback(connected)
+            except Exception as e:
+                logger.error(f"Watchdog subscriber failed: {e}")
@@ -17,6 +17,7 @@ from unimobile.utils.plugin_loader import load_user_plugin
 try:
     import unimobile.devices.harmony
     import unimobile.devices.android
+    import unimobile.devices.replay
 
     import unimobile.agents.components.perception.omniparser
     import unimobile.agents.components.perception.grid
@@ -41,6 +42,9 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+# Components without per-task state, safe to share between agents running on different devices
+SHAREABLE_COMPONENTS = ("perception", "reasoning", "planner", "verifier")
+
 class ConfigLoader:
     def __init__(self, config_path: str):
         self.config_path = config_path
@@ -123,7 +127,11 @@ class ConfigLoader:
                 llm_group[key] = self._create_instance(sub_config, get_llm_class, component_type = "llm")
             return llm_group
 
-    def load_device(self) -> BaseDevice:
+    def load_device(self, **overrides) -> BaseDevice:
+        """
+        Args:
+            overrides: extra constructor arguments, e.g. device_id when a pool binds one config to many devices
+        """
         components_cfg = self.config.get("agent", {}).get("components", {})
         action_cfg = components_cfg.get("action")
         
@@ -132,9 +140,15 @@ class ConfigLoader:
             
         logger.info(f"[Config] Loading Device/Action: {action_cfg.get('name')}")
         
-        return self._create_instance(action_cfg, get_device_class, component_type='action')
-
-    def load_agent(self) -> BaseAgent:
+        return self._create_instance(action_cfg, get_device_class, component_type='action', **overrides)
+
+    def load_agent(self, shared: Dict[str, Any] = None) -> BaseAgent:
+        """
+        Args:
+            shared (Dict[str, Any], optional): A cache shared between agents built from this config.
+                Stateless components (SHAREABLE_COMPONENTS) are created once and reused from it,
+                stateful ones (memory) are always created per agent. Defaults to None.
+        """
         global_config = self.config.get("global_config", {})
         verbose = global_config.get("verbose", True)
         
@@ -166,6 +180,11 @@ class ConfigLoader:
                 logger.warning(f"Unknown component type: {comp_key}, skipping")
                 continue
 
+            if shared is not None and comp_key in SHAREABLE_COMPONENTS and comp_key in shared:
+                init_kwargs[key_alias.get(comp_key, comp_key)] = shared[comp_key]
+                logger.info(f"Reusing shared {comp_key}")
+                continue
+
             extra_args = {}
             
             if isinstance(comp_cfg, dict) and "llm" in comp_cfg:
@@ -180,6 +199,9 @@ class ConfigLoader:
                 instance = self._create_instance(comp_cfg, getter, component_type=comp_key, **extra_args)
                 logger.info(f"Loading {comp_key}: {comp_cfg.get('name')}")
 
+            if shared is not None and comp_key in SHAREABLE_COMPONENTS:
+                shared[comp_key] = instance
+
             arg_name = key_alias.get(comp_key, comp_key)
             init_kwargs[arg_name] = instance
 